@@ -0,0 +1 @@
+"""Generator data sintetis & benchmark per tahap pipeline kasbon."""
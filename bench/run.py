@@ -0,0 +1,243 @@
+"""
+Benchmark pipeline kasbon per tahap, dengan waktu & memori puncak.
+
+Contoh:
+    python -m bench.run --sizes 10k,100k,1M --json bench_data/hasil.json
+    python -m bench.run --sizes 100k --baseline bench_data/hasil.json
+    python -m bench.run --sizes 1M --backend arrow --baseline bench_data/hasil.json
+    python -m bench.run --sizes 1M --format csv
+    python -m bench.run --sizes 1M --distinct hll
+
+Tahap: <format>_parse (xlsx / csv / parquet), clean (tanggal + kalender + compact), cells (split
+segmen + sel segmen × bulan × hari × perusahaan), daily (tabel harian rollup),
+partials (parsial per user, hanya --distinct exact), sketches + top (sketch HLL
+dan Top 10 dari data baris, hanya --distinct hll), segment:<nama>
+(metrik + rollup per segmen, setara agregasi di render_segment), charts:<nama>, pdf.
+
+Waktu diambil dari run tanpa tracing. Memori puncak diukur di satu run
+terpisah dengan tracemalloc (alokasi Python + numpy/pandas; buffer internal
+pyarrow tidak ikut), karena tracemalloc sendiri memperlambat beberapa kali
+lipat. --no-memory melewati run memori.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+from bench.synth import generate_workbooks, parse_rows
+from kasbon import analytics, arrow_backend
+from kasbon.analytics import AGG_BACKENDS, DISTINCT_MODES, SEGMENT_ALL, detect_columns
+from kasbon.charts import submit_charts
+from kasbon.ingest import INPUT_TYPES, READERS, clean_dataframe, detect_format
+from kasbon.report import build_report
+from kasbon.sketch import HLL_PRECISION
+
+
+class StageRecorder:
+    """Catat waktu (dan memori puncak) setiap tahap yang dibungkus `stage()`."""
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        yield
+        record = {"stage": name, "seconds": time.perf_counter() - started}
+        if self.trace_memory:
+            record["peak_mb"] = (tracemalloc.get_traced_memory()[1] - base) / 1e6
+        self.records.append(record)
+
+
+def run_pipeline(paths: list, recorder: StageRecorder, backend: str = "pandas",
+                 distinct: str = "exact"):
+    """Satu kali jalan penuh pipeline dashboard + PDF atas workbook `paths`."""
+    engine = arrow_backend if backend == "arrow" else analytics
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+
+    with recorder.stage(f"{detect_format(blobs[0])}_parse"):
+        raw = pd.concat(
+            [READERS[detect_format(data)](data) for data in blobs], ignore_index=True
+        )
+    del blobs
+
+    with recorder.stage("clean"):
+        df = clean_dataframe(raw)
+    del raw
+
+    with recorder.stage("cells"):
+        cols = detect_columns(df.columns)
+        aggregates = {"cells": engine.build_cells(df, cols)}
+    with recorder.stage("daily"):
+        aggregates["daily"] = analytics.build_daily(df, cols)
+    if distinct == "hll":
+        with recorder.stage("sketches"):
+            aggregates["sketches"] = analytics.build_sketches(df, cols, HLL_PRECISION)
+        with recorder.stage("top"):
+            aggregates["top"] = analytics.build_top(analytics.row_measures(df, cols), cols)
+    else:
+        with recorder.stage("partials"):
+            aggregates["partials"] = engine.build_partials(df, cols)
+
+    lazy = analytics.LazyAnalysis(
+        aggregates,
+        cols,
+        periode_start=df["Tanggal Approved"].min(),
+        periode_end=df["Tanggal Approved"].max(),
+        distinct=distinct,
+        precision=HLL_PRECISION,
+        backend=backend,
+    )
+    analysis = {}
+    for seg in lazy:
+        with recorder.stage(f"segment:{seg}"):
+            analysis[seg] = lazy[seg]
+
+    images = {}
+    for seg, results in analysis.items():
+        with recorder.stage(f"charts:{seg}"):
+            charts = submit_charts({seg: results})[seg]
+            pngs = {key: future.result() for key, (_, future) in charts.items()}
+        if seg == SEGMENT_ALL:
+            images = pngs
+
+    with recorder.stage("pdf"):
+        build_report(
+            analysis[SEGMENT_ALL], analysis.get("EWA"), analysis.get("PPOB"), images=images
+        )
+    return len(df)
+
+
+def benchmark(size: str, workdir: str, repeat: int = 1, trace_memory: bool = True,
+              seed: int = 0, backend: str = "pandas", file_format: str = "xlsx",
+              distinct: str = "exact") -> dict:
+    """
+    Benchmark satu ukuran data: waktu = minimum dari `repeat` run tanpa tracing,
+    peak_mb dari satu run tambahan dengan tracemalloc.
+    """
+    rows = parse_rows(size)
+    paths = generate_workbooks(
+        rows, os.path.join(workdir, f"kasbon_{size}.{file_format}"), seed
+    )
+
+    runs = []
+    for _ in range(repeat):
+        recorder = StageRecorder(trace_memory=False)
+        clean_rows = run_pipeline(paths, recorder, backend, distinct)
+        runs.append(recorder.records)
+    stages = [
+        dict(record, seconds=min(run[i]["seconds"] for run in runs))
+        for i, record in enumerate(runs[0])
+    ]
+
+    if trace_memory:
+        recorder = StageRecorder(trace_memory=True)
+        tracemalloc.start()
+        try:
+            run_pipeline(paths, recorder, backend, distinct)
+        finally:
+            tracemalloc.stop()
+        for stage, traced in zip(stages, recorder.records):
+            stage["peak_mb"] = traced["peak_mb"]
+    return {
+        "size": size,
+        "backend": backend,
+        "format": file_format,
+        "distinct": distinct,
+        "rows": rows,
+        "clean_rows": clean_rows,
+        "stages": stages,
+    }
+
+
+def _baseline_seconds(baseline: dict) -> dict:
+    return {
+        (result["size"], stage["stage"]): stage["seconds"]
+        for result in baseline.get("results", [])
+        for stage in result["stages"]
+    }
+
+
+def print_report(results: list, baseline: dict = None):
+    previous = _baseline_seconds(baseline) if baseline else {}
+    for result in results:
+        print(
+            f"\n== {result['size']} ({result['clean_rows']:,} baris bersih, "
+            f"backend {result.get('backend', 'pandas')}, input {result.get('format', 'xlsx')}, "
+            f"distinct {result.get('distinct', 'exact')}) =="
+        )
+        print(f"{'tahap':<34}{'detik':>10}{'peak MB':>10}{'vs baseline':>14}")
+        total = 0.0
+        for stage in result["stages"]:
+            total += stage["seconds"]
+            peak = f"{stage['peak_mb']:.1f}" if "peak_mb" in stage else "-"
+            before = previous.get((result["size"], stage["stage"]))
+            change = f"{(stage['seconds'] / before - 1) * 100:+.1f}%" if before else ""
+            print(f"{stage['stage']:<34}{stage['seconds']:>10.3f}{peak:>10}{change:>14}")
+        print(f"{'total':<34}{total:>10.3f}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.run",
+        description="Benchmark pipeline kasbon per tahap (waktu & memori puncak).",
+    )
+    parser.add_argument("--sizes", default="10k,100k", help="daftar ukuran, mis. 10k,100k,1M,5M")
+    parser.add_argument("--workdir", default="bench_data", help="folder workbook sintetis (di-cache)")
+    parser.add_argument("--repeat", type=int, default=1, help="ulang pipeline, ambil waktu minimum")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=AGG_BACKENDS, default="pandas", help="mesin agregasi")
+    parser.add_argument("--format", choices=INPUT_TYPES, default="xlsx", help="format file input")
+    parser.add_argument("--distinct", choices=DISTINCT_MODES, default="exact", help="user/company unik")
+    parser.add_argument("--no-memory", action="store_true", help="lewati run pengukuran memori")
+    parser.add_argument("--json", default=None, help="simpan hasil ke file JSON")
+    parser.add_argument("--baseline", default=None, help="JSON hasil sebelumnya untuk dibandingkan")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    results = [
+        benchmark(
+            size.strip(), args.workdir, args.repeat, not args.no_memory, args.seed,
+            args.backend, args.format, args.distinct,
+        )
+        for size in args.sizes.split(",") if size.strip()
+    ]
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    # ru_maxrss dalam KB di Linux
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nmax RSS proses: {max_rss_mb:,.0f} MB")
+
+    if args.json:
+        payload = {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "max_rss_mb": max_rss_mb,
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
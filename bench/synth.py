@@ -0,0 +1,157 @@
+"""
+Generator workbook kasbon sintetis dengan kolom yang dipakai app.
+
+Contoh:
+    python -m bench.synth --rows 500k -o bench_data/kasbon_500k.xlsx
+    python -m bench.synth --rows 5M -o bench_data/kasbon_5M.csv
+
+Distribusi dibuat mendekati export asli: aktivitas user condong (sebagian
+kecil user sangat aktif), nominal kelipatan 50rb, campuran EWA/PPOB dengan
+variasi penulisan, beberapa tanggal rusak, dan kolom export lain yang tidak
+dipakai dashboard. Satu sheet Excel maksimal 1.048.575 baris data; ukuran
+lebih besar dipecah jadi beberapa workbook (_part01, _part02, ...).
+Output .csv / .parquet (dipilih dari ekstensi) selalu satu file.
+"""
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def parse_rows(text: str) -> int:
+    """'10k' -> 10000, '5M' -> 5000000."""
+    text = text.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def generate_dataframe(rows: int, seed: int = 0, start: str = "2023-01-01",
+                       months: int = 24) -> pd.DataFrame:
+    """DataFrame dengan layout export (tanggal sudah datetime, satu baris = satu transaksi)."""
+    rng = np.random.default_rng(seed)
+
+    n_users = max(10, rows // 12)
+    n_companies = max(3, n_users // 60)
+    # user aktif berat: bobot Zipf-like
+    weights = 1.0 / np.arange(1, n_users + 1) ** 0.8
+    users = rng.choice(n_users, size=rows, p=weights / weights.sum())
+    company_of_user = rng.integers(0, n_companies, n_users)
+
+    start_ts = pd.Timestamp(start)
+    span = (start_ts + pd.DateOffset(months=months) - start_ts).total_seconds()
+    seconds = rng.integers(0, int(span), rows)
+    dates = start_ts + pd.to_timedelta(np.sort(seconds), unit="s")
+
+    amounts = np.clip(np.round(rng.lognormal(13.5, 0.7, rows) / 50_000), 1, 100) * 50_000
+    jenis = rng.choice(
+        ["EWA", "PPOB", "ppob", "Ewa ", "Lainnya"], size=rows,
+        p=[0.62, 0.28, 0.04, 0.03, 0.03],
+    )
+
+    df = pd.DataFrame({
+        "No": np.arange(1, rows + 1),
+        "Tanggal Approved": dates,
+        "Username/ ID User": pd.Categorical.from_codes(
+            users, [f"USR{u:07d}" for u in range(n_users)]
+        ),
+        "Nama Karyawan": pd.Categorical.from_codes(
+            users, [f"Karyawan {u}" for u in range(n_users)]
+        ),
+        "Nama Perusahaan": pd.Categorical.from_codes(
+            company_of_user[users], [f"PT Sintetis {c}" for c in range(n_companies)]
+        ),
+        "Total Kasbon": amounts.astype(np.int64),
+        "Jenis EWA": jenis,
+        "Status": "APPROVED",
+        "Keterangan": "",
+    })
+    # sedikit baris dengan tanggal rusak (ditulis sebagai "-"), seperti export asli
+    bad = rng.choice(rows, size=max(1, rows // 10_000), replace=False)
+    df.loc[bad, "Tanggal Approved"] = pd.NaT
+    return df
+
+
+def _cell(value):
+    if value is pd.NaT:
+        return "-"
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def write_workbooks(df: pd.DataFrame, path: str, max_rows: int = EXCEL_MAX_ROWS) -> list:
+    """Tulis ke satu atau beberapa .xlsx (write-only/streaming). Return daftar path."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    n_parts = max(1, -(-len(df) // max_rows))
+    base, ext = os.path.splitext(path)
+    paths = []
+    for part in range(n_parts):
+        part_path = path if n_parts == 1 else f"{base}_part{part + 1:02d}{ext}"
+        chunk = df.iloc[part * max_rows:(part + 1) * max_rows]
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Data")
+        ws.append(list(df.columns))
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append([_cell(v) for v in row])
+        wb.save(part_path)
+        paths.append(part_path)
+    return paths
+
+
+def write_dataset(df: pd.DataFrame, path: str) -> list:
+    """Tulis sesuai ekstensi: .csv, .parquet, atau workbook .xlsx. Return daftar path."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".csv", ".parquet"):
+        return write_workbooks(df, path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if ext == ".csv":
+        # tanggal rusak ditulis "-" seperti di workbook
+        out = df.assign(
+            **{"Tanggal Approved": df["Tanggal Approved"].dt.strftime("%Y-%m-%d %H:%M:%S")}
+        )
+        out.to_csv(path, index=False, na_rep="-")
+    else:
+        df.to_parquet(path, index=False)
+    return [path]
+
+
+def generate_workbooks(rows: int, path: str, seed: int = 0) -> list:
+    """Generate + tulis workbook (atau .csv / .parquet); file yang sudah ada dipakai ulang."""
+    base, ext = os.path.splitext(path)
+    n_parts = 1 if ext.lower() in (".csv", ".parquet") else max(1, -(-rows // EXCEL_MAX_ROWS))
+    expected = (
+        [path] if n_parts == 1
+        else [f"{base}_part{i + 1:02d}{ext}" for i in range(n_parts)]
+    )
+    if all(os.path.exists(p) for p in expected):
+        return expected
+    return write_dataset(generate_dataframe(rows, seed), path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.synth",
+        description="Generate data kasbon sintetis (10k - 5M baris; .xlsx, .csv, .parquet).",
+    )
+    parser.add_argument("--rows", default="100k", help="jumlah baris, mis. 10k, 1M, 5M")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None, help="path output .xlsx / .csv / .parquet")
+    args = parser.parse_args(argv)
+
+    rows = parse_rows(args.rows)
+    output = args.output or os.path.join("bench_data", f"kasbon_{args.rows}.xlsx")
+    started = datetime.now()
+    for path in write_dataset(generate_dataframe(rows, args.seed), output):
+        print(path)
+    print(f"{rows:,} baris dalam {(datetime.now() - started).total_seconds():.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
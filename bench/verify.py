@@ -0,0 +1,100 @@
+"""
+Cek kesetaraan backend agregasi: hasil backend "arrow" harus sama dengan
+"pandas" untuk semua segmen dan semua mode distinct.
+
+Contoh:
+    python -m bench.verify --sizes 10k,1M
+    python -m bench.verify --file exports/kasbon_2025.xlsx
+
+Tabel dibandingkan per nilai (categorical vs string dianggap sama, float
+dengan toleransi relatif 1e-9); exit code 1 kalau ada yang beda.
+"""
+import argparse
+import math
+import os
+
+import pandas as pd
+
+from bench.synth import generate_workbooks, parse_rows
+from kasbon.analytics import DISTINCT_MODES, analyze
+from kasbon.ingest import clean_dataframe, read_kasbon_file, read_xlsx_projected
+
+RTOL = 1e-9
+
+
+def _same_value(a, b) -> bool:
+    if isinstance(a, dict) and isinstance(b, dict):
+        # mis. rollups {level: tabel}
+        return not compare_results(a, b)
+    if isinstance(a, pd.DataFrame) or isinstance(b, pd.DataFrame):
+        if a is None or b is None:
+            return a is b
+        try:
+            pd.testing.assert_frame_equal(
+                a.astype({c: object for c in a.columns if a[c].dtype == "category"}),
+                b.astype({c: object for c in b.columns if b[c].dtype == "category"}),
+                check_dtype=False,
+                rtol=RTOL,
+            )
+        except AssertionError:
+            return False
+        return True
+    if isinstance(a, float) and isinstance(b, float):
+        return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=RTOL)
+    return a == b
+
+
+def compare_results(expected: dict, actual: dict) -> list:
+    """Daftar kunci results yang nilainya beda."""
+    keys = sorted(set(expected) | set(actual))
+    return [key for key in keys if not _same_value(expected.get(key), actual.get(key))]
+
+
+def verify_dataframe(df: pd.DataFrame, label: str) -> bool:
+    ok = True
+    for distinct in DISTINCT_MODES:
+        expected = analyze(df, distinct=distinct, backend="pandas")
+        actual = analyze(df, distinct=distinct, backend="arrow")
+        for seg in expected:
+            diff = compare_results(expected[seg], actual.get(seg, {}))
+            status = "OK" if not diff else "BEDA: " + ", ".join(diff)
+            print(f"{label:<24}{distinct:<8}{seg:<24}{status}")
+            ok = ok and not diff
+    return ok
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.verify",
+        description="Bandingkan hasil backend agregasi arrow vs pandas.",
+    )
+    parser.add_argument("--sizes", default="10k", help="data sintetis, mis. 10k,100k,1M")
+    parser.add_argument("--file", action="append", default=[], help="workbook asli (boleh berulang)")
+    parser.add_argument("--workdir", default="bench_data", help="folder workbook sintetis (di-cache)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    ok = True
+    for path in args.file:
+        with open(path, "rb") as f:
+            df = read_kasbon_file(f.read())
+        ok = verify_dataframe(df, os.path.basename(path)) and ok
+    for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        paths = generate_workbooks(
+            parse_rows(size), os.path.join(args.workdir, f"kasbon_{size}.xlsx"), args.seed
+        )
+        raw = []
+        for path in paths:
+            with open(path, "rb") as f:
+                raw.append(read_xlsx_projected(f.read()))
+        df = clean_dataframe(pd.concat(raw, ignore_index=True))
+        ok = verify_dataframe(df, size) and ok
+    print("\nSEMUA SAMA" if ok else "\nADA PERBEDAAN")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1 @@
+"""Komponen inti Dashboard Analitik Kasbon (ingestion, analitik, laporan)."""
@@ -0,0 +1,173 @@
+"""
+Backend chart Altair (Vega-Lite): dirender di browser, bukan di server.
+
+Yang dikirim ke browser hanya tabel agregat kecil (monthly_stats, monthly_uc,
+rollups, top_users_amount, trx_per_day) + spesifikasi chart. Tampilan dibuat mengikuti
+chart matplotlib di kasbon.charts, yang tetap dipakai untuk gambar PDF.
+"""
+import altair as alt
+import pandas as pd
+
+from kasbon.calendar_dim import HARI_ORDER, WEEKEND_START
+from kasbon.formatting import format_int, format_singkat
+
+# urutan data apa adanya (bulan sudah kronologis, top 10 sudah terurut)
+_AS_IS = None
+
+
+def trend_chart(monthly_stats: pd.DataFrame, seg_name: str) -> alt.LayerChart:
+    """Chart 1: total nominal (bar) vs jumlah transaksi (line) per bulan."""
+    data = monthly_stats.assign(
+        Label_Nominal=monthly_stats["sum"].map(format_singkat),
+    )
+    base = alt.Chart(data).encode(
+        x=alt.X("Bulan_Str:N", sort=_AS_IS, title=None, axis=alt.Axis(labelAngle=-45))
+    )
+    bars = base.mark_bar(color="#6baed6", opacity=0.8).encode(
+        y=alt.Y("sum:Q", title="Total Nominal (Rp)", axis=alt.Axis(titleColor="#6baed6")),
+        tooltip=[
+            alt.Tooltip("Bulan_Str:N", title="Bulan"),
+            alt.Tooltip("Label_Nominal:N", title="Nominal"),
+            alt.Tooltip("count:Q", title="Transaksi"),
+        ],
+    )
+    bar_labels = base.mark_text(dy=-6, fontWeight="bold", color="#3182bd").encode(
+        y="sum:Q", text="Label_Nominal:N"
+    )
+    line = base.mark_line(color="#d62728", strokeWidth=2, point=True).encode(
+        y=alt.Y("count:Q", title="Jumlah Transaksi", axis=alt.Axis(titleColor="#d62728"))
+    )
+    line_labels = base.mark_text(dy=-10, color="#d62728").encode(
+        y="count:Q", text="count:Q"
+    )
+    return (
+        alt.layer(bars + bar_labels, line + line_labels)
+        .resolve_scale(y="independent")
+        .properties(
+            title=f"Total Nominal Kasbon vs Jumlah Transaksi per Bulan – {seg_name}",
+            height=380,
+        )
+    )
+
+
+def unique_chart(monthly_uc: pd.DataFrame, seg_name: str) -> alt.LayerChart:
+    """Chart 1.a: tren user & company unik per bulan."""
+    metrics = [c for c in ("User Unik", "Company Unik") if c in monthly_uc.columns]
+    data = monthly_uc.melt(
+        id_vars="Bulan_Str", value_vars=metrics, var_name="Metrik", value_name="Jumlah"
+    )
+    base = alt.Chart(data).encode(
+        x=alt.X(
+            "Bulan_Str:N",
+            sort=list(monthly_uc["Bulan_Str"]),
+            title=None,
+            axis=alt.Axis(labelAngle=-45),
+        ),
+        y=alt.Y("Jumlah:Q", title="Jumlah Unik"),
+        color=alt.Color("Metrik:N", sort=metrics, legend=alt.Legend(title=None)),
+        strokeDash=alt.StrokeDash("Metrik:N", sort=metrics, legend=None),
+    )
+    lines = base.mark_line(strokeWidth=2, point=True).encode(
+        tooltip=["Bulan_Str:N", "Metrik:N", "Jumlah:Q"]
+    )
+    labels = base.mark_text(dy=-10, fontSize=10).encode(text="Jumlah:Q")
+    return (lines + labels).properties(
+        title=f"Tren User & Company Unik per Bulan – {seg_name}", height=260
+    )
+
+
+def rollup_chart(rollup: pd.DataFrame, level: str, seg_name: str) -> alt.LayerChart:
+    """Chart 1.b: nominal (bar) vs transaksi (line) per hari / minggu / bulan."""
+    metrics = [c for c in ("User Unik", "Company Unik") if c in rollup.columns]
+    data = rollup.assign(Label_Nominal=rollup["sum"].map(format_singkat))
+    base = alt.Chart(data).encode(
+        x=alt.X("Mulai:T", title=None),
+        tooltip=[
+            alt.Tooltip("Periode:N", title=level),
+            alt.Tooltip("Label_Nominal:N", title="Nominal"),
+            alt.Tooltip("count:Q", title="Transaksi"),
+        ] + [alt.Tooltip(f"{m}:Q", title=m) for m in metrics],
+    )
+    bars = base.mark_bar(color="#6baed6", opacity=0.8).encode(
+        y=alt.Y("sum:Q", title="Total Nominal (Rp)", axis=alt.Axis(titleColor="#6baed6"))
+    )
+    line = base.mark_line(color="#d62728", strokeWidth=1.5).encode(
+        y=alt.Y("count:Q", title="Jumlah Transaksi", axis=alt.Axis(titleColor="#d62728"))
+    )
+    return (
+        alt.layer(bars, line)
+        .resolve_scale(y="independent")
+        .properties(title=f"Tren {level} – {seg_name}", height=320)
+    )
+
+
+def top_users_chart(top_users_amount: pd.DataFrame, nama_karyawan_col: str,
+                    seg_name: str) -> alt.LayerChart:
+    """Chart 2: Top 10 karyawan berdasarkan nominal."""
+    data = pd.DataFrame({
+        "Nama": top_users_amount[nama_karyawan_col].astype(str),
+        "Total_Kasbon": top_users_amount["Total_Kasbon"].astype(float),
+    })
+    data["Label"] = data["Total_Kasbon"].map(format_singkat)
+    base = alt.Chart(data).encode(
+        y=alt.Y("Nama:N", sort=_AS_IS, title=None),
+        x=alt.X("Total_Kasbon:Q", title="Total Nilai Pinjaman (Rp)"),
+    )
+    bars = base.mark_bar(color="#0ea5e9", opacity=0.9).encode(
+        tooltip=["Nama:N", alt.Tooltip("Label:N", title="Total")]
+    )
+    labels = base.mark_text(align="left", dx=4, fontWeight="bold", color="#111111").encode(
+        text="Label:N"
+    )
+    return (bars + labels).properties(
+        title=f"Top Amount 10 Karyawan (Nominal) – {seg_name}", height=380
+    )
+
+
+def weekday_chart(trx_per_day: pd.DataFrame, seg_name: str) -> alt.LayerChart:
+    """Chart 3: volume transaksi per hari (weekend diberi warna beda)."""
+    data = trx_per_day.assign(
+        Weekend=[i >= WEEKEND_START for i in range(len(trx_per_day))],
+        Label=trx_per_day["Jumlah"].map(format_int),
+    )
+    base = alt.Chart(data).encode(
+        x=alt.X("Hari:N", sort=HARI_ORDER, title=None),
+        y=alt.Y("Jumlah:Q", title=None),
+    )
+    bars = base.mark_bar().encode(
+        color=alt.Color(
+            "Weekend:N",
+            scale=alt.Scale(domain=[False, True], range=["#b3cde3", "#fdb462"]),
+            legend=None,
+        ),
+        tooltip=["Hari:N", alt.Tooltip("Label:N", title="Transaksi")],
+    )
+    labels = base.mark_text(dy=-8).encode(text="Label:N")
+    return (bars + labels).properties(
+        title=f"Volume Transaksi per Hari – {seg_name}", height=320
+    )
+
+
+def segment_chart_specs(results: dict) -> dict:
+    """
+    Chart Altair satu segmen: {key_results: chart}, kunci sama dengan
+    kasbon.charts.segment_chart_jobs (chart3 hanya kalau ada data Top 10).
+    """
+    seg_name = results["name"]
+    if not results["has_data"]:
+        return {}
+    specs = {
+        "chart1": trend_chart(results["monthly_stats"], seg_name),
+        "chart1b": unique_chart(results["monthly_uc"], seg_name),
+        "chart4": weekday_chart(results["trx_per_day"], seg_name),
+    }
+    if not results["top_users_amount"].empty:
+        specs["chart3"] = top_users_chart(
+            results["top_users_amount"], results["nama_karyawan_col"], seg_name
+        )
+    return specs
+
+
+def build_charts(analysis: dict) -> dict:
+    """{nama_segmen: {key_results: chart}} untuk semua segmen."""
+    return {seg: segment_chart_specs(results) for seg, results in analysis.items()}
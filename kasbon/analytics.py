@@ -0,0 +1,691 @@
+"""
+Mesin agregasi segmen (Gabungan, EWA, PPOB).
+
+Data baris hanya di-scan SEKALI (`build_aggregates`): `build_cells`
+mengelompokkan per (segmen, bulan, hari, perusahaan) dan menyimpan
+sum/count/max. Total, tren bulanan, company unik, dan hari/weekend per segmen
+diturunkan dari sel kecil itu; Gabungan adalah gabungan sel EWA + PPOB (+ jenis lain).
+
+User unik dan Top 10 butuh total per user: exact dari parsial per user
+(`build_partials`, opsional), atau dari sketch HLL + tabel Top 10 yang sudah
+dihitung (`build_top`) kalau parsialnya tidak dibangun.
+
+Rollup harian/mingguan/bulanan memakai tabel terpisah yang lebih kecil lagi
+(`build_daily`: per segmen × tanggal), jadi granularitas harian tidak ikut
+memperbesar kunci parsial.
+
+User/company unik bisa dihitung exact (nunique) atau aproksimasi HyperLogLog
+(`distinct="hll"`, lihat kasbon.sketch); sketch-nya dibangun langsung dari
+data baris (`build_sketches`), bukan dari tabel parsial.
+
+Agregasi bisa dijalankan dengan pandas (default) atau pyarrow.compute
+(`backend="arrow"`, lihat kasbon.arrow_backend); hasilnya sama persis.
+"""
+import os
+import sys
+import threading
+from collections.abc import Mapping
+
+import pandas as pd
+
+from kasbon.calendar_dim import (
+    DAY_KEY,
+    HARI_ORDER,
+    MONTH_KEY,
+    WEEKDAY,
+    WEEKEND_START,
+    day_keys,
+    month_labels,
+)
+from kasbon.ingest import (
+    COMPANY_CANDIDATES,
+    JENIS_CANDIDATES,
+    NAME_COLUMN,
+    SEGMENT_COLUMN,
+    SEGMENT_OTHER,
+    SEGMENTS,
+    find_column,
+)
+from kasbon.profiling import stage
+from kasbon.rollups import ROLLUP_PRECISION, build_rollups, monthly_rollup
+from kasbon.sketch import (
+    HLL_PRECISION,
+    SKETCH_PRECISION,
+    estimate,
+    fold,
+    merge_registers,
+    register_table,
+    relative_error,
+)
+from kasbon.topk import RANKINGS, segment_top_users, top_users
+
+SEGMENT_ALL = "Gabungan (EWA+PPOB)"
+
+DISTINCT_MODES = ["exact", "hll"]
+
+AGG_BACKENDS = ["pandas", "arrow"]
+AGG_BACKEND = os.environ.get("KASBON_AGG_BACKEND", "pandas")
+
+USER_COLUMN = "Username/ ID User"
+# kolom ranking (Total_Kasbon / Qty_EWA_PPOB) di tabel build_top
+TOP_RANKING = "Ranking"
+
+
+def detect_columns(columns) -> dict:
+    """Tentukan kolom opsional yang dipakai analitik (jenis, company, nama)."""
+    if "Nama Perusahaan" in columns:
+        nama_perusahaan_col = "Nama Perusahaan"
+    elif "Nama Perushaan" in columns:  # typo safe
+        nama_perusahaan_col = "Nama Perushaan"
+    else:
+        nama_perusahaan_col = None
+
+    return {
+        "jenis_col": find_column(columns, JENIS_CANDIDATES),
+        # kolom company untuk tren 1.a (fleksibel nama kolom)
+        "company_col": find_column(columns, COMPANY_CANDIDATES),
+        # kolom untuk tabel Top 10
+        "nama_perusahaan_col": nama_perusahaan_col,
+        "nama_karyawan_col": NAME_COLUMN if NAME_COLUMN in columns else USER_COLUMN,
+    }
+
+
+def company_column(cols: dict):
+    """Kolom perusahaan klien untuk drill-down per company (None kalau tidak ada)."""
+    return cols["nama_perusahaan_col"] or cols["company_col"]
+
+
+def cell_columns(cols: dict) -> list:
+    """Kolom perusahaan yang ikut jadi kunci sel (company unik exact per sel)."""
+    return [c for c in dict.fromkeys([cols["company_col"], cols["nama_perusahaan_col"]]) if c]
+
+
+def _detail_columns(cols: dict) -> list:
+    """Kolom user-level yang ikut jadi kunci parsial (tanpa duplikat)."""
+    candidates = [
+        USER_COLUMN,
+        cols["nama_karyawan_col"],
+        cols["company_col"],
+        cols["nama_perusahaan_col"],
+    ]
+    return [c for c in dict.fromkeys(candidates) if c]
+
+
+def _segments(df: pd.DataFrame, cols: dict) -> pd.Series:
+    """Kolom Segmen per baris (SEGMENT_OTHER semua kalau tidak ada kolom jenis)."""
+    if cols["jenis_col"] is not None and SEGMENT_COLUMN in df.columns:
+        return df[SEGMENT_COLUMN]
+    return pd.Series(SEGMENT_OTHER, index=df.index, name=SEGMENT_COLUMN)
+
+
+def _group_rows(df: pd.DataFrame, cols: dict, columns: list) -> pd.DataFrame:
+    """
+    Satu kali groupby atas data baris untuk semua segmen sekaligus.
+    Kolom hasil: Segmen, Bulan_Key, Hari_Idx, `columns`, sum, count, max, rows.
+    (`count` = nominal tidak kosong, `rows` = jumlah baris/transaksi)
+    """
+    keys = [
+        _segments(df, cols),
+        df[MONTH_KEY],
+        df[WEEKDAY],
+    ] + [df[c] for c in columns]
+
+    return (
+        df.groupby(keys, dropna=False, observed=True, sort=False)["Total Kasbon"]
+        .agg(sum="sum", count="count", max="max", rows="size")
+        .reset_index()
+    )
+
+
+def build_cells(df: pd.DataFrame, cols: dict) -> pd.DataFrame:
+    """
+    Sel agregat segmen × bulan × hari × perusahaan (kolom cell_columns).
+    Tanpa kunci user: ukurannya mengikuti jumlah company, bukan jumlah user.
+    """
+    return _group_rows(df, cols, cell_columns(cols))
+
+
+def build_partials(df: pd.DataFrame, cols: dict) -> pd.DataFrame:
+    """
+    Parsial per user: sel yang kuncinya ditambah kolom detail user (ID, nama,
+    perusahaan). Hanya dibutuhkan untuk user unik exact, Top 10 dari parsial,
+    dan paket laporan per company.
+    """
+    return _group_rows(df, cols, _detail_columns(cols))
+
+
+def build_daily(df: pd.DataFrame, cols: dict, precision: int = ROLLUP_PRECISION) -> dict:
+    """
+    Tabel harian untuk rollup (kasbon.rollups), terpisah dari parsial:
+    - "table"   : Segmen, Tanggal_Key, sum, count
+    - "sketches": sketch HLL user & company per (segmen, tanggal), presisi `precision`
+    """
+    keys = [
+        _segments(df, cols),
+        pd.Series(day_keys(df["Tanggal Approved"]), index=df.index, name=DAY_KEY),
+    ]
+    table = (
+        df.groupby(keys, observed=True, sort=False)["Total Kasbon"]
+        .agg(sum="sum", count="count")
+        .reset_index()
+    )
+    return {"table": table, "sketches": _distinct_sketches(df, cols, keys, precision)}
+
+
+def merge_daily(dailies: list) -> dict:
+    """Gabungkan beberapa tabel harian (build_daily) berpresisi sama."""
+    keys = [SEGMENT_COLUMN, DAY_KEY]
+    table = (
+        pd.concat([daily["table"] for daily in dailies], ignore_index=True)
+        .groupby(keys, observed=True, sort=False)[["sum", "count"]]
+        .sum()
+        .reset_index()
+    )
+    table[SEGMENT_COLUMN] = table[SEGMENT_COLUMN].astype("category")
+    sketches = merge_sketches([daily["sketches"] for daily in dailies], keys)
+    return {"table": table, "sketches": sketches}
+
+
+def build_top(frame: pd.DataFrame, cols: dict) -> pd.DataFrame:
+    """
+    Tabel Top 10 karyawan semua segmen (Gabungan + per segmen), satu pass atas
+    parsial atau data baris (`row_measures`): Segmen, Ranking, kolom grup,
+    Qty_EWA_PPOB, Total_Kasbon.
+    """
+    group_cols = top_group_columns(cols)
+    frames = []
+    for seg, tops in segment_top_users(frame, group_cols, USER_COLUMN, SEGMENT_COLUMN).items():
+        for ranking, table in zip(RANKINGS, tops):
+            frames.append(table.assign(**{
+                SEGMENT_COLUMN: SEGMENT_ALL if seg is None else seg,
+                TOP_RANKING: ranking,
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def row_measures(df: pd.DataFrame, cols: dict) -> pd.DataFrame:
+    """Data baris dalam bentuk parsial (Segmen, kolom grup Top 10, sum, count) untuk build_top."""
+    nominal = df["Total Kasbon"]
+    return pd.DataFrame({col: df[col] for col in top_group_columns(cols)}).assign(**{
+        SEGMENT_COLUMN: _segments(df, cols),
+        "sum": nominal,
+        "count": nominal.notna().astype("int64"),
+    })
+
+
+def segment_top(top: pd.DataFrame, seg: str):
+    """(top_by_amount, top_by_qty) satu segmen dari tabel build_top."""
+    rows = top[top[SEGMENT_COLUMN] == seg]
+    return tuple(
+        rows[rows[TOP_RANKING] == ranking]
+        .drop(columns=[SEGMENT_COLUMN, TOP_RANKING])
+        .reset_index(drop=True)
+        for ranking in RANKINGS
+    )
+
+
+def daily_rollups(daily: dict, seg: str, cols: dict) -> dict:
+    """
+    Rollup harian/mingguan/bulanan satu segmen dari tabel harian (build_daily).
+    User & company unik selalu estimasi sketch harian, apa pun mode distinct-nya.
+    """
+    table, sketches = daily["table"], daily["sketches"]
+    if seg != SEGMENT_ALL:
+        table = table[table[SEGMENT_COLUMN] == seg]
+        sketches = segment_sketches(sketches, seg)
+    per_day = table.groupby(DAY_KEY, sort=False)[["sum", "count"]].sum().reset_index()
+    distinct = {"User Unik": "user"}
+    if cols["company_col"]:
+        distinct["Company Unik"] = "company"
+    return {
+        "rollups": build_rollups(per_day, distinct, sketches),
+        "rollup_error": relative_error(sketches["precision"]),
+    }
+
+
+def top_group_columns(cols: dict) -> list:
+    """Kunci grup leaderboard Top 10: nama karyawan, user, nama perusahaan."""
+    group_cols = [cols["nama_karyawan_col"]]
+    if USER_COLUMN not in group_cols:
+        group_cols.append(USER_COLUMN)
+    if cols["nama_perusahaan_col"] and cols["nama_perusahaan_col"] not in group_cols:
+        group_cols.append(cols["nama_perusahaan_col"])
+    return group_cols
+
+
+def empty_results(seg_name: str) -> dict:
+    return {
+        "name": seg_name,
+        "has_data": False,
+        "total_kasbon": 0.0,
+        "total_trx": 0,
+        "total_user": 0,
+        # None = exact; selain itu standard error relatif sketch HLL
+        "distinct_error": None,
+        "avg_ticket": 0.0,
+        "max_ticket": 0.0,
+        "monthly_stats": None,
+        "monthly_uc": None,
+        # {ROLLUP_LEVELS: tabel Periode/Mulai/sum/count/unik}, lihat kasbon.rollups
+        "rollups": None,
+        # standard error relatif user/company unik di rollup (None = exact)
+        "rollup_error": None,
+        "top_users_amount": None,
+        "top_users_qty": None,
+        "trx_per_day": None,
+        "weekend_amount": 0.0,
+        "weekend_trx": 0,
+        "weekend_amount_pct": 0.0,
+        "weekend_trx_pct": 0.0,
+    }
+
+
+def _distinct_sketches(frame: pd.DataFrame, cols: dict, keys: list, precision: int) -> dict:
+    """{"precision", "user", "company"}: sketch HLL kolom user & company per kombinasi `keys`."""
+    sketches = {
+        "precision": precision,
+        "user": register_table(frame[USER_COLUMN], keys, precision),
+        "company": None,
+    }
+    if cols["company_col"]:
+        sketches["company"] = register_table(frame[cols["company_col"]], keys, precision)
+    return sketches
+
+
+def build_sketches(df: pd.DataFrame, cols: dict, precision: int = SKETCH_PRECISION) -> dict:
+    """
+    Sketch HLL user & company per (segmen, bulan) langsung dari data baris
+    (per potongan, tanpa tabel per user). Disimpan di cube & histori pada
+    SKETCH_PRECISION; presisi yang lebih rendah diturunkan dengan fold_sketches.
+    """
+    return _distinct_sketches(df, cols, [_segments(df, cols), df[MONTH_KEY]], precision)
+
+
+def partial_sketches(partials: pd.DataFrame, cols: dict, precision: int = HLL_PRECISION) -> dict:
+    """Sketch per (segmen, bulan) dari tabel parsial, untuk agregat tanpa sketch tersimpan."""
+    keys = [partials[SEGMENT_COLUMN], partials[MONTH_KEY]]
+    return _distinct_sketches(partials, cols, keys, precision)
+
+
+def merge_sketches(sketches: list, keys: list = None) -> dict:
+    """Gabungkan beberapa set sketch berpresisi sama (default kunci: segmen, bulan)."""
+    keys = keys or [SEGMENT_COLUMN, MONTH_KEY]
+    merged = {"precision": sketches[0]["precision"]}
+    for name in ("user", "company"):
+        frames = [s[name] for s in sketches]
+        merged[name] = None
+        if frames[0] is not None:
+            merged[name] = merge_registers(frames, keys)
+            merged[name][SEGMENT_COLUMN] = merged[name][SEGMENT_COLUMN].astype("category")
+    return merged
+
+
+def fold_sketches(sketches: dict, precision: int) -> dict:
+    """
+    Sketch (segmen, bulan) di presisi `precision`. Presisi di atas presisi
+    tersimpan tidak bisa dibuat tanpa data baris: dipakai presisi tersimpan.
+    """
+    if precision >= sketches["precision"]:
+        return sketches
+    keys = [SEGMENT_COLUMN, MONTH_KEY]
+    folded = {"precision": precision}
+    for name in ("user", "company"):
+        table = sketches[name]
+        folded[name] = None if table is None else fold(table, keys, sketches["precision"], precision)
+    return folded
+
+
+def segment_sketches(sketches: dict, seg: str) -> dict:
+    """Sketch milik satu segmen saja."""
+    return {
+        name: (
+            table[table[SEGMENT_COLUMN] == seg]
+            if isinstance(table, pd.DataFrame) else table
+        )
+        for name, table in sketches.items()
+    }
+
+
+def segment_results(cells: pd.DataFrame, seg_name: str, cols: dict, partials=None,
+                    sketches=None, top=None) -> dict:
+    """
+    Turunkan semua metrik satu segmen dari sel-nya (build_cells, sudah difilter
+    ke segmen ini):
+    - user unik: estimasi `sketches` kalau diberikan, selain itu nunique `partials`
+    - company unik: estimasi sketch company kalau ada, selain itu exact dari sel
+    - Top 10: `top` (hasil segment_top) kalau diberikan, selain itu dari `partials`
+    """
+    results = empty_results(seg_name)
+    results.update(
+        nama_karyawan_col=cols["nama_karyawan_col"],
+        nama_perusahaan_col=cols["nama_perusahaan_col"],
+    )
+    total_trx = int(cells["rows"].sum()) if not cells.empty else 0
+    if total_trx == 0:
+        return results
+
+    # ---- METRIK UTAMA ----
+    total_kasbon = float(cells["sum"].sum())
+    total_count = int(cells["count"].sum())
+    results.update(
+        total_kasbon=total_kasbon,
+        total_trx=total_trx,
+        total_user=(
+            int(estimate(sketches["user"], precision=sketches["precision"]))
+            if sketches else int(partials[USER_COLUMN].nunique())
+        ),
+        avg_ticket=total_kasbon / total_count if total_count else float("nan"),
+        max_ticket=float(cells["max"].max()),
+        has_data=True,
+    )
+
+    # ---- 1. Tren bulanan (urut kronologis) ----
+    with stage("tren_bulanan", rows=len(cells)):
+        by_month = cells.groupby(MONTH_KEY, sort=True)
+        monthly_stats = by_month[["sum", "count"]].sum()
+        months = monthly_stats.index
+        labels = month_labels(months)
+        monthly_stats = monthly_stats.reset_index(drop=True)
+        monthly_stats.insert(0, "Bulan_Str", labels)
+        results["monthly_stats"] = monthly_stats
+
+    # ---- 1.a User & company unik per bulan ----
+    with stage("user_unik", rows=len(cells)):
+        monthly_uc = pd.DataFrame({"Bulan_Str": labels})
+        if sketches:
+            precision = sketches["precision"]
+            results["distinct_error"] = relative_error(precision)
+
+        def _estimate(table):
+            per_month = estimate(table, by=MONTH_KEY, precision=precision)
+            return per_month.reindex(months, fill_value=0).to_numpy()
+
+        if sketches:
+            monthly_uc["User Unik"] = _estimate(sketches["user"])
+        else:
+            per_month = partials.groupby(MONTH_KEY, sort=True)[USER_COLUMN].nunique()
+            monthly_uc["User Unik"] = per_month.reindex(months, fill_value=0).to_numpy()
+        if cols["company_col"]:
+            if sketches and sketches["company"] is not None:
+                monthly_uc["Company Unik"] = _estimate(sketches["company"])
+            else:
+                monthly_uc["Company Unik"] = by_month[cols["company_col"]].nunique().to_numpy()
+        results["monthly_uc"] = monthly_uc
+
+    # ---- 1.b Rollup bulanan (level harian/mingguan: daily_rollups) ----
+    results.update(
+        rollups=monthly_rollup(monthly_stats, monthly_uc, months),
+        rollup_error=results["distinct_error"],
+    )
+
+    # ---- 2. Top 10 karyawan ----
+    with stage("top10", rows=0 if partials is None else len(partials)):
+        if top is None:
+            # leaderboard via top-K terbatas, tanpa sort penuh tabel per user
+            top = top_users(partials, top_group_columns(cols), USER_COLUMN)
+        results["top_users_amount"], results["top_users_qty"] = top
+
+    # ---- 3. Hari & weekend ----
+    with stage("hari_weekend", rows=len(cells)):
+        per_day = (
+            cells.groupby(WEEKDAY)["rows"].sum()
+            .reindex(range(len(HARI_ORDER)), fill_value=0)
+            .astype(int)
+        )
+        results["trx_per_day"] = pd.DataFrame(
+            {"Hari": HARI_ORDER, "Jumlah": per_day.to_numpy()}
+        )
+
+        weekend = cells[cells[WEEKDAY] >= WEEKEND_START]
+        weekend_amount = float(weekend["sum"].sum())
+        weekend_trx = int(weekend["rows"].sum())
+        results.update(
+            weekend_amount=weekend_amount,
+            weekend_trx=weekend_trx,
+            weekend_amount_pct=(
+                weekend_amount / total_kasbon * 100 if total_kasbon > 0 else 0.0
+            ),
+            weekend_trx_pct=weekend_trx / total_trx * 100,
+        )
+    return results
+
+
+def segment_table(table: pd.DataFrame, seg: str) -> pd.DataFrame:
+    """Baris sel / parsial milik satu segmen."""
+    return table[table[SEGMENT_COLUMN] == seg]
+
+
+def _regroup(frames: list, keys: list, labels: list) -> pd.DataFrame:
+    """
+    Gabungkan beberapa tabel sel / parsial ke kunci `keys`: sum/count/rows
+    dijumlahkan, max diambil maksimumnya. `labels` = kunci string (dijadikan categorical).
+    """
+    combined = pd.concat(frames, ignore_index=True)
+    merged = (
+        combined.groupby(keys, dropna=False, observed=True, sort=False)
+        .agg(
+            sum=("sum", "sum"),
+            count=("count", "sum"),
+            max=("max", "max"),
+            rows=("rows", "sum"),
+        )
+        .reset_index()
+    )
+    # kategori antar frame bisa beda (jadi object saat concat) -> compact lagi
+    for col in labels:
+        merged[col] = merged[col].astype("category")
+    return merged
+
+
+def merge_partials(frames: list, cols: dict) -> pd.DataFrame:
+    """Gabungkan beberapa tabel parsial (mis. histori + delta harian) menjadi satu."""
+    labels = [SEGMENT_COLUMN] + _detail_columns(cols)
+    return _regroup(frames, [SEGMENT_COLUMN, MONTH_KEY, WEEKDAY] + labels[1:], labels)
+
+
+def merge_cells(frames: list, cols: dict) -> pd.DataFrame:
+    """Gabungkan beberapa tabel sel (build_cells) menjadi satu."""
+    labels = [SEGMENT_COLUMN] + cell_columns(cols)
+    return _regroup(frames, [SEGMENT_COLUMN, MONTH_KEY, WEEKDAY] + labels[1:], labels)
+
+
+def cells_from_partials(partials: pd.DataFrame, cols: dict) -> pd.DataFrame:
+    """Sel (build_cells) hasil roll-up parsial, untuk cube / histori yang hanya menyimpan parsial."""
+    return merge_cells([partials], cols)
+
+
+# backend pandas = fungsi build_* / segment_table / segment_results di modul ini
+_PANDAS = sys.modules[__name__]
+
+
+def _arrow_backend(backend: str):
+    """Modul kasbon.arrow_backend untuk backend "arrow", None untuk pandas."""
+    if backend not in AGG_BACKENDS:
+        raise ValueError(f"backend harus salah satu dari {AGG_BACKENDS}")
+    if backend != "arrow":
+        return None
+    # import di sini: kasbon.arrow_backend sendiri memakai modul ini
+    from kasbon import arrow_backend
+    return arrow_backend
+
+
+def build_aggregates(df: pd.DataFrame, cols: dict, backend: str = AGG_BACKEND,
+                     partials: bool = True, sketches: bool = True,
+                     precision: int = SKETCH_PRECISION) -> dict:
+    """
+    Satu pass agregasi atas data baris untuk LazyAnalysis / cube:
+    - "cells"   : sel segmen × bulan × hari × perusahaan (build_cells)
+    - "daily"   : tabel harian rollup (build_daily)
+    - "sketches": sketch HLL user & company presisi `precision` (build_sketches)
+    - "partials": parsial per user (build_partials), hanya kalau `partials`;
+      tanpa itu "top" (Top 10 semua segmen, build_top) dihitung sekarang
+    """
+    engine = _arrow_backend(backend) or _PANDAS
+    aggregates = {}
+    with stage("cells", rows=len(df)):
+        aggregates["cells"] = engine.build_cells(df, cols)
+    with stage("daily", rows=len(df)):
+        aggregates["daily"] = build_daily(df, cols)
+    if sketches:
+        with stage("sketches", rows=len(df)):
+            aggregates["sketches"] = build_sketches(df, cols, precision)
+    if partials:
+        with stage("partials", rows=len(df)):
+            aggregates["partials"] = engine.build_partials(df, cols)
+    else:
+        with stage("top", rows=len(df)):
+            aggregates["top"] = build_top(row_measures(df, cols), cols)
+    return aggregates
+
+
+class LazyAnalysis(Mapping):
+    """
+    Dict-like {nama_segmen: results}: results satu segmen baru dihitung saat
+    pertama diminta, lalu disimpan. Daftar segmen (iterasi, `in`) tersedia
+    tanpa menghitung apa pun. Aman dipakai dari beberapa thread.
+
+    aggregates: dict hasil build_aggregates (atau cube / histori), wajib "cells":
+    - "partials": parsial per user; tanpa itu user unik exact diestimasi dari
+      sketch presisi tersimpan (distinct_error diisi) dan Top 10 dari "top"
+    - "daily": tabel harian untuk rollup harian/mingguan; tanpa itu rollup
+      hanya level bulanan
+    - "sketches": sketch tersimpan untuk distinct "hll", diturunkan ke
+      `precision` (maksimal presisi tersimpan); tanpa itu dibangun dari parsial
+    - "top": tabel Top 10 (build_top); tanpa itu dihitung dari parsial
+
+    backend "arrow": sel & parsial (DataFrame atau tabel Arrow) dihitung dengan
+    kasbon.arrow_backend.
+
+    cache + cache_key: results per segmen juga disimpan di cache bersama
+    (kasbon.shared_cache) dengan kunci ("results", cache_key, segmen), jadi
+    analisis lain dengan kunci yang sama tidak menghitung ulang. cache_key
+    harus mewakili dataset + opsi analisis; results dari cache jangan diubah.
+    """
+
+    def __init__(self, aggregates: dict, cols: dict,
+                 periode_start=None, periode_end=None,
+                 distinct: str = "exact", precision: int = HLL_PRECISION,
+                 backend: str = AGG_BACKEND, cache=None, cache_key=None):
+        if distinct not in DISTINCT_MODES:
+            raise ValueError(f"distinct harus salah satu dari {DISTINCT_MODES}")
+        self._arrow = _arrow_backend(backend)
+        self.cells = self._table(aggregates["cells"])
+        self.partials = self._table(aggregates.get("partials"))
+        self.daily = aggregates.get("daily")
+        self.sketches = aggregates.get("sketches")
+        self.top = aggregates.get("top")
+        self.cols = cols
+        self.periode_start = periode_start
+        self.periode_end = periode_end
+        self.distinct = distinct
+        self.precision = precision
+        self.backend = backend
+        self.cache = cache
+        self.cache_key = cache_key
+        self._names = [SEGMENT_ALL]
+        if cols["jenis_col"] is not None:
+            self._names += SEGMENTS
+        self._results = {}
+        self._sketches = None
+        self._lock = threading.RLock()
+
+    def _table(self, table):
+        if self._arrow is not None and isinstance(table, pd.DataFrame):
+            return self._arrow.to_table(table)
+        return table
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, seg) -> bool:
+        # default Mapping memanggil __getitem__ (= menghitung segmen)
+        return seg in self._names
+
+    def __getitem__(self, seg: str) -> dict:
+        if seg not in self._names:
+            raise KeyError(seg)
+        with self._lock:
+            if seg not in self._results:
+                if self.cache is None:
+                    self._results[seg] = self._compute(seg)
+                else:
+                    self._results[seg] = self.cache.get_or_compute(
+                        ("results", self.cache_key, seg), lambda: self._compute(seg)
+                    )
+            return self._results[seg]
+
+    def computed(self) -> list:
+        """Segmen yang results-nya sudah dihitung."""
+        with self._lock:
+            return [seg for seg in self._names if seg in self._results]
+
+    def _distinct_sketches(self):
+        """Sketch untuk user/company unik, None kalau exact dari parsial."""
+        if self.distinct == "exact":
+            if self.partials is not None:
+                return None
+            # tanpa parsial: user unik estimasi sketch, company unik tetap exact dari sel
+            return dict(self.sketches, company=None)
+        if self.sketches is not None:
+            return fold_sketches(self.sketches, self.precision)
+        build = self._arrow.partial_sketches if self._arrow else partial_sketches
+        return build(self.partials, self.cols, self.precision)
+
+    def _segment_sketches(self, seg: str):
+        if self._sketches is None:
+            # Gabungan = sketch semua segmen (register di-merge saat estimasi);
+            # None (exact dari parsial) murah, dicek ulang tiap segmen
+            self._sketches = self._distinct_sketches()
+        if self._sketches is None or seg == SEGMENT_ALL:
+            return self._sketches
+        return segment_sketches(self._sketches, seg)
+
+    def _compute(self, seg: str) -> dict:
+        engine = self._arrow or _PANDAS
+
+        def _rows(table):
+            return table if seg == SEGMENT_ALL else engine.segment_table(table, seg)
+
+        cells = _rows(self.cells)
+        sketches = self._segment_sketches(seg)
+        top = segment_top(self.top, seg) if self.top is not None else None
+        partials = None
+        if self.partials is not None and (sketches is None or top is None):
+            partials = _rows(self.partials)
+        with stage(f"segment:{seg}", rows=len(cells)):
+            results = engine.segment_results(cells, seg, self.cols, partials, sketches, top)
+            if self.daily is not None and results["has_data"]:
+                with stage("rollup"):
+                    results.update(daily_rollups(self.daily, seg, self.cols))
+        if seg == SEGMENT_ALL:
+            # Periode data (dipakai ringkasan eksekutif PDF)
+            results.update(periode_start=self.periode_start, periode_end=self.periode_end)
+        return results
+
+
+def analyze_lazy(df: pd.DataFrame, distinct: str = "exact",
+                 precision: int = HLL_PRECISION, backend: str = AGG_BACKEND) -> LazyAnalysis:
+    """Satu pass agregasi sekarang; metrik per segmen dihitung saat diminta."""
+    cols = detect_columns(df.columns)
+    exact = distinct == "exact"
+    aggregates = build_aggregates(
+        df, cols, backend, partials=exact, sketches=not exact, precision=precision
+    )
+    return LazyAnalysis(
+        aggregates,
+        cols,
+        periode_start=df["Tanggal Approved"].min(),
+        periode_end=df["Tanggal Approved"].max(),
+        distinct=distinct,
+        precision=precision,
+        backend=backend,
+    )
+
+
+def analyze(df: pd.DataFrame, distinct: str = "exact", precision: int = HLL_PRECISION,
+            backend: str = AGG_BACKEND) -> dict:
+    """Hitung hasil semua segmen dari data baris (satu pass agregasi)."""
+    return dict(analyze_lazy(df, distinct, precision, backend))
@@ -0,0 +1,249 @@
+"""
+Backend agregasi pyarrow.compute: metrik yang sama dengan kasbon.analytics,
+dihitung di atas tabel Arrow (dipilih dengan `backend="arrow"`).
+
+Kolom categorical pandas masuk sebagai dictionary array (string tidak
+di-materialisasi ulang) dan group_by Arrow (Acero) berjalan multi-thread
+per batch. Output `segment_results` berbentuk sama dengan versi pandas
+(DataFrame kecil), jadi UI, chart, dan PDF tidak perlu tahu backend-nya.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from kasbon.analytics import (
+    USER_COLUMN,
+    _detail_columns,
+    cell_columns,
+    partial_sketches as _partial_sketches,
+    empty_results,
+    top_group_columns,
+)
+from kasbon.calendar_dim import HARI_ORDER, MONTH_KEY, WEEKDAY, WEEKEND_START, month_labels
+from kasbon.ingest import SEGMENT_COLUMN, SEGMENT_OTHER
+from kasbon.profiling import stage
+from kasbon.rollups import monthly_rollup
+from kasbon.sketch import HLL_PRECISION, estimate, relative_error
+from kasbon.topk import AMOUNT, QTY, TOP_K
+
+# ukuran batch tabel Arrow; group_by membagi kerja ke thread per batch
+BATCH_ROWS = 64 * 1024
+
+# grup tanpa nilai -> 0, sama seperti sum pandas
+_SUM = pc.ScalarAggregateOptions(min_count=0)
+
+
+def to_table(df: pd.DataFrame, columns: list = None) -> pa.Table:
+    """DataFrame -> tabel Arrow (categorical -> dictionary), dipotong per BATCH_ROWS."""
+    table = pa.Table.from_pandas(
+        df if columns is None else df[columns], preserve_index=False
+    ).replace_schema_metadata(None)
+    return pa.Table.from_batches(table.to_batches(max_chunksize=BATCH_ROWS), table.schema)
+
+
+def _aggregate(table: pa.Table, keys: list, aggregations: list, names: list) -> pa.Table:
+    """group_by + aggregate, kolom hasil = keys + names (urutan kolom Arrow tidak dijamin)."""
+    grouped = table.group_by(keys, use_threads=True).aggregate(aggregations)
+    renamed = {
+        f"{column}_{func}" if column else func: name
+        for (column, func, *_), name in zip(aggregations, names)
+    }
+    grouped = grouped.rename_columns([renamed.get(c, c) for c in grouped.column_names])
+    return grouped.select(keys + names)
+
+
+def _group_rows(df: pd.DataFrame, cols: dict, columns: list) -> pa.Table:
+    """Versi Arrow dari kasbon.analytics._group_rows (kolom & isi sama)."""
+    table = to_table(df, [MONTH_KEY, WEEKDAY] + columns + ["Total Kasbon"])
+    if cols["jenis_col"] is not None and SEGMENT_COLUMN in df.columns:
+        segment = pa.array(df[SEGMENT_COLUMN])
+    else:
+        segment = pa.DictionaryArray.from_arrays(
+            np.zeros(len(df), dtype=np.int8), pa.array([SEGMENT_OTHER])
+        )
+    table = table.append_column(SEGMENT_COLUMN, segment)
+
+    keys = [SEGMENT_COLUMN, MONTH_KEY, WEEKDAY] + columns
+    return _aggregate(
+        table,
+        keys,
+        [
+            ("Total Kasbon", "sum", _SUM),
+            ("Total Kasbon", "count"),
+            ("Total Kasbon", "max"),
+            ([], "count_all"),
+        ],
+        ["sum", "count", "max", "rows"],
+    )
+
+
+def build_cells(df: pd.DataFrame, cols: dict) -> pa.Table:
+    """Versi Arrow dari kasbon.analytics.build_cells."""
+    return _group_rows(df, cols, cell_columns(cols))
+
+
+def build_partials(df: pd.DataFrame, cols: dict) -> pa.Table:
+    """Versi Arrow dari kasbon.analytics.build_partials."""
+    return _group_rows(df, cols, _detail_columns(cols))
+
+
+def segment_table(table: pa.Table, seg: str) -> pa.Table:
+    """Baris sel / parsial milik satu segmen."""
+    return table.filter(pc.field(SEGMENT_COLUMN) == seg)
+
+
+def partial_sketches(partials: pa.Table, cols: dict, precision: int = HLL_PRECISION) -> dict:
+    """Versi Arrow dari analytics.partial_sketches (hanya kolom kunci sketch yang dikonversi)."""
+    columns = [SEGMENT_COLUMN, MONTH_KEY, USER_COLUMN]
+    if cols["company_col"] and cols["company_col"] not in columns:
+        columns.append(cols["company_col"])
+    return _partial_sketches(partials.select(columns).to_pandas(), cols, precision)
+
+
+def _scalar(value, default=0):
+    value = value.as_py()
+    return default if value is None else value
+
+
+def _count_distinct(column: pa.ChunkedArray) -> int:
+    """Jumlah nilai unik (tanpa null); dictionary dihitung dari kodenya, tanpa decode."""
+    if pa.types.is_dictionary(column.type):
+        column = column.unify_dictionaries()
+        column = pa.chunked_array(
+            [chunk.indices for chunk in column.chunks], type=column.type.index_type
+        )
+    return int(_scalar(pc.count_distinct(column)))
+
+
+def _distinct_per_month(table: pa.Table, column: str, months) -> np.ndarray:
+    """Jumlah nilai unik `column` per bulan, urut `months` (bulan tanpa nilai -> 0)."""
+    per_month = _aggregate(table, [MONTH_KEY], [(column, "count_distinct")], ["n"])
+    counts = pd.Series(per_month["n"].to_numpy(), index=per_month[MONTH_KEY].to_numpy())
+    return counts.reindex(months, fill_value=0).to_numpy()
+
+
+def top_users(part: pa.Table, group_cols: list, k: int = TOP_K):
+    """
+    Top-K user (nominal & qty) dari parsial Arrow, urutan seri sama dengan
+    kasbon.topk: nilai turun, lalu kunci grup naik.
+    """
+    users = _aggregate(
+        part, group_cols, [("count", "sum", _SUM), ("sum", "sum", _SUM)], [QTY, AMOUNT]
+    )
+    # pandas groupby membuang kunci kosong
+    for col in group_cols:
+        users = users.filter(pc.is_valid(users[col]))
+    users = users.select(group_cols + [QTY, AMOUNT])
+
+    def _top(ranking: str) -> pd.DataFrame:
+        if users.num_rows == 0:
+            return pd.DataFrame(columns=group_cols + [QTY, AMOUNT])
+        candidates = users
+        if users.num_rows > k:
+            # nilai ke-k sebagai ambang, lalu sort penuh hanya kandidat >= ambang
+            top_idx = pc.select_k_unstable(users, k, [(ranking, "descending")])
+            kth = pc.min(users.take(top_idx)[ranking])
+            candidates = users.filter(pc.field(ranking) >= kth)
+        # kunci dictionary -> string agar seri diurutkan leksikal seperti pandas
+        for i, col in enumerate(group_cols):
+            candidates = candidates.set_column(i, col, candidates[col].cast(pa.string()))
+        sort_keys = [(ranking, "descending")] + [(col, "ascending") for col in group_cols]
+        return candidates.sort_by(sort_keys).slice(0, k).to_pandas()
+
+    return _top(AMOUNT), _top(QTY)
+
+
+def segment_results(cells: pa.Table, seg_name: str, cols: dict, partials: pa.Table = None,
+                    sketches=None, top=None) -> dict:
+    """Versi Arrow dari kasbon.analytics.segment_results (dict results yang sama)."""
+    results = empty_results(seg_name)
+    results.update(
+        nama_karyawan_col=cols["nama_karyawan_col"],
+        nama_perusahaan_col=cols["nama_perusahaan_col"],
+    )
+    total_trx = int(_scalar(pc.sum(cells["rows"])))
+    if total_trx == 0:
+        return results
+
+    # ---- METRIK UTAMA ----
+    total_kasbon = float(_scalar(pc.sum(cells["sum"])))
+    total_count = int(_scalar(pc.sum(cells["count"])))
+    results.update(
+        total_kasbon=total_kasbon,
+        total_trx=total_trx,
+        total_user=(
+            int(estimate(sketches["user"], precision=sketches["precision"]))
+            if sketches else _count_distinct(partials[USER_COLUMN])
+        ),
+        avg_ticket=total_kasbon / total_count if total_count else float("nan"),
+        max_ticket=float(_scalar(pc.max(cells["max"]), math.nan)),
+        has_data=True,
+    )
+
+    # ---- 1. Tren bulanan (urut kronologis) ----
+    with stage("tren_bulanan", rows=cells.num_rows):
+        by_month = _aggregate(
+            cells, [MONTH_KEY], [("sum", "sum", _SUM), ("count", "sum", _SUM)], ["sum", "count"]
+        ).sort_by(MONTH_KEY)
+        months = by_month[MONTH_KEY].to_numpy()
+        labels = month_labels(months)
+        monthly_stats = by_month.select(["sum", "count"]).to_pandas()
+        monthly_stats.insert(0, "Bulan_Str", labels)
+        results["monthly_stats"] = monthly_stats
+
+    # ---- 1.a User & company unik per bulan ----
+    with stage("user_unik", rows=cells.num_rows):
+        monthly_uc = pd.DataFrame({"Bulan_Str": labels})
+        if sketches:
+            precision = sketches["precision"]
+            results["distinct_error"] = relative_error(precision)
+
+        def _estimate(table):
+            per_month = estimate(table, by=MONTH_KEY, precision=precision)
+            return per_month.reindex(months, fill_value=0).to_numpy()
+
+        if sketches:
+            monthly_uc["User Unik"] = _estimate(sketches["user"])
+        else:
+            monthly_uc["User Unik"] = _distinct_per_month(partials, USER_COLUMN, months)
+        if cols["company_col"]:
+            if sketches and sketches["company"] is not None:
+                monthly_uc["Company Unik"] = _estimate(sketches["company"])
+            else:
+                monthly_uc["Company Unik"] = _distinct_per_month(cells, cols["company_col"], months)
+        results["monthly_uc"] = monthly_uc
+
+    # ---- 1.b Rollup bulanan (level harian/mingguan: analytics.daily_rollups) ----
+    results.update(
+        rollups=monthly_rollup(monthly_stats, monthly_uc, months),
+        rollup_error=results["distinct_error"],
+    )
+
+    # ---- 2. Top 10 karyawan ----
+    with stage("top10", rows=0 if partials is None else partials.num_rows):
+        if top is None:
+            top = top_users(partials, top_group_columns(cols))
+        results["top_users_amount"], results["top_users_qty"] = top
+
+    # ---- 3. Hari & weekend ----
+    with stage("hari_weekend", rows=cells.num_rows):
+        by_day = _aggregate(cells, [WEEKDAY], [("rows", "sum", _SUM)], ["rows"])
+        per_day = np.zeros(len(HARI_ORDER), dtype=int)
+        per_day[by_day[WEEKDAY].to_numpy()] = by_day["rows"].to_numpy()
+        results["trx_per_day"] = pd.DataFrame({"Hari": HARI_ORDER, "Jumlah": per_day})
+
+        weekend = cells.filter(pc.field(WEEKDAY) >= WEEKEND_START)
+        weekend_amount = float(_scalar(pc.sum(weekend["sum"])))
+        weekend_trx = int(_scalar(pc.sum(weekend["rows"])))
+        results.update(
+            weekend_amount=weekend_amount,
+            weekend_trx=weekend_trx,
+            weekend_amount_pct=(
+                weekend_amount / total_kasbon * 100 if total_kasbon > 0 else 0.0
+            ),
+            weekend_trx_pct=weekend_trx / total_trx * 100,
+        )
+    return results
@@ -0,0 +1,123 @@
+"""
+Penyimpanan artefak (PNG chart, PDF) per session.
+
+Artefak disimpan sebagai bytes di memori session, bukan di folder bersama,
+sehingga beberapa user yang memakai app bersamaan tidak saling menimpa file.
+Kalau total melebihi `max_memory_bytes`, artefak paling lama di-spill ke
+temp dir milik session (dibatasi `max_spill_bytes`, 0 = tanpa spill).
+"""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+
+class ArtifactStore:
+    def __init__(self, max_memory_bytes: int = 64 * 1024 * 1024,
+                 max_spill_bytes: int = 256 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self._mem = OrderedDict()      # nama -> bytes
+        self._spilled = OrderedDict()  # nama -> (path, size)
+        self._mem_bytes = 0
+        self._spill_bytes = 0
+        self._spill_dir = None
+        self._lock = threading.Lock()
+
+    def put(self, name: str, data: bytes) -> str:
+        """Simpan artefak (menimpa yang lama dengan nama sama), return namanya."""
+        data = bytes(data)
+        with self._lock:
+            self._discard(name)
+            self._mem[name] = data
+            self._mem_bytes += len(data)
+            self._enforce_limits()
+        return name
+
+    def get(self, name: str):
+        """Bytes artefak, atau None kalau tidak ada / sudah tereviksi."""
+        with self._lock:
+            if name in self._mem:
+                self._mem.move_to_end(name)
+                return self._mem[name]
+            entry = self._spilled.get(name)
+        if entry is None:
+            return None
+        try:
+            with open(entry[0], "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def open(self, name: str):
+        """File-like (BytesIO) untuk artefak, misalnya untuk FPDF.image()."""
+        data = self.get(name)
+        return io.BytesIO(data) if data is not None else None
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._mem or name in self._spilled
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._spilled.clear()
+            self._mem_bytes = self._spill_bytes = 0
+            if self._spill_dir:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+
+    def _discard(self, name: str):
+        data = self._mem.pop(name, None)
+        if data is not None:
+            self._mem_bytes -= len(data)
+        entry = self._spilled.pop(name, None)
+        if entry is not None:
+            self._spill_bytes -= entry[1]
+            _remove_quietly(entry[0])
+
+    def _enforce_limits(self):
+        # artefak terbaru selalu tetap di memori
+        while self._mem_bytes > self.max_memory_bytes and len(self._mem) > 1:
+            name, data = self._mem.popitem(last=False)
+            self._mem_bytes -= len(data)
+            if self.max_spill_bytes > 0:
+                self._spill(name, data)
+
+        while self._spill_bytes > self.max_spill_bytes and self._spilled:
+            _, (path, size) = self._spilled.popitem(last=False)
+            self._spill_bytes -= size
+            _remove_quietly(path)
+
+    def _spill(self, name: str, data: bytes):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="kasbon_artifacts_")
+            # hapus temp dir saat store (session) dibuang
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        fd, path = tempfile.mkstemp(dir=self._spill_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        except OSError:
+            _remove_quietly(path)
+            return
+        self._spilled[name] = (path, len(data))
+        self._spill_bytes += len(data)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def session_store_limits() -> dict:
+    """Batas store dari env (MB): KASBON_ARTIFACT_MEM_MB, KASBON_ARTIFACT_SPILL_MB."""
+    return {
+        "max_memory_bytes": int(os.environ.get("KASBON_ARTIFACT_MEM_MB", "64")) * 1024 * 1024,
+        "max_spill_bytes": int(os.environ.get("KASBON_ARTIFACT_SPILL_MB", "256")) * 1024 * 1024,
+    }
@@ -0,0 +1,164 @@
+"""
+Paket laporan per company: satu PDF per perusahaan klien dalam satu ZIP.
+
+Tabel parsial per user dataset dipartisi SEKALI per kolom company (groupby
+atas parsial, bukan data baris); analisis tanpa parsial exact (cube tanpa
+file .partials.arrow, mode HyperLogLog) tidak bisa membuat paket ini.
+Tiap partisi -> results segmen + chart + PDF dikerjakan utuh di satu worker
+process pool (`company_report`), jadi ratusan company diproses paralel tanpa
+membebani thread script Streamlit. PDF yang
+selesai langsung ditulis ke ZIP (urutan selesai), ditambah ringkasan CSV.
+"""
+import contextvars
+import io
+import zipfile
+from concurrent.futures import Executor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from kasbon.analytics import SEGMENT_ALL, LazyAnalysis, cells_from_partials, company_column
+from kasbon.calendar_dim import MONTH_KEY
+from kasbon.charts import _run_inline
+from kasbon.report import ReportJob, _no_progress, build_report, report_images
+from kasbon.store import dataset_name
+
+BUNDLE_FILE_NAME = "Laporan_Per_Company.zip"
+SUMMARY_FILE_NAME = "ringkasan_per_company.csv"
+
+
+def company_partitions(analysis: LazyAnalysis):
+    """(nama company, parsial company) untuk semua company, urut nama."""
+    company = company_column(analysis.cols)
+    if company is None:
+        raise ValueError("Dataset tidak punya kolom Nama Perusahaan / company.")
+    partials = analysis.partials
+    if partials is None:
+        raise ValueError("Analisis ini tidak membawa parsial exact per user.")
+    if isinstance(partials, pa.Table):
+        partials = partials.to_pandas()
+    categorical = [c for c in partials.columns if isinstance(partials[c].dtype, pd.CategoricalDtype)]
+    for name, part in partials.groupby(company, observed=True, sort=True):
+        # kategori milik company lain tidak ikut dikirim ke worker
+        yield str(name), part.assign(
+            **{c: part[c].cat.remove_unused_categories() for c in categorical}
+        )
+
+
+def _month_period(part: pd.DataFrame):
+    """Periode dari kunci bulan (awal bulan pertama - akhir bulan terakhir)."""
+    months = part[MONTH_KEY]
+    start = pd.Timestamp(np.datetime64(int(months.min()), "M"))
+    end = pd.Timestamp(np.datetime64(int(months.max()) + 1, "M")) - pd.Timedelta(days=1)
+    return start, end
+
+
+def company_report(company: str, part: pd.DataFrame, cols: dict, period) -> tuple:
+    """
+    Worker: PDF satu company dari parsialnya. Chart dirender serial di worker
+    ini (paralelnya antar company). Return (bytes PDF, baris ringkasan).
+    """
+    start, end = period if period else _month_period(part)
+    aggregates = {"cells": cells_from_partials(part, cols), "partials": part}
+    analysis = LazyAnalysis(
+        aggregates, cols, periode_start=start, periode_end=end, backend="pandas"
+    )
+    results_all = analysis[SEGMENT_ALL]
+    pdf_bytes = build_report(
+        results_all,
+        analysis.get("EWA"),
+        analysis.get("PPOB"),
+        report_images(results_all),
+        company=company,
+    )
+    summary = {
+        "Perusahaan": company,
+        "Total Kasbon": results_all["total_kasbon"],
+        "Transaksi": results_all["total_trx"],
+        "User Unik": results_all["total_user"],
+        "Periode Mulai": start.date() if start is not None else None,
+        "Periode Akhir": end.date() if end is not None else None,
+    }
+    return pdf_bytes, summary
+
+
+def _unique_file_name(company: str, used: set) -> str:
+    stem = dataset_name(company)
+    name, n = f"{stem}.pdf", 1
+    while name in used:
+        n += 1
+        name = f"{stem}_{n}.pdf"
+    used.add(name)
+    return name
+
+
+def _company_periods(periods: dict):
+    """Periode per company dari metadata cube (ISO string) -> Timestamp."""
+    return {
+        name: tuple(pd.Timestamp(value) if value else None for value in span)
+        for name, span in (periods or {}).items()
+    }
+
+
+def _run_reports(partitions: list, cols: dict, periods: dict, executor: Executor = None):
+    """(company, Future) dalam urutan selesai; tanpa executor dikerjakan serial."""
+    if executor is None:
+        for company, part in partitions:
+            yield company, _run_inline(company_report, company, part, cols, periods.get(company))
+        return
+    futures = {
+        executor.submit(company_report, company, part, cols, periods.get(company)): company
+        for company, part in partitions
+    }
+    for future in as_completed(futures):
+        yield futures[future], future
+
+
+def build_company_bundle(analysis: LazyAnalysis, periods: dict = None,
+                         executor: Executor = None, progress=_no_progress) -> bytes:
+    """
+    ZIP berisi PDF per company + ringkasan CSV.
+    - periods: {company: [iso_start, iso_end]} (Cube.meta["company_periods"]);
+      company tanpa entri memakai periode dari kunci bulan parsialnya
+    - executor: process pool (None = serial di thread ini)
+    Company yang gagal dicatat di kolom "Error" ringkasan, sisanya tetap jalan.
+    """
+    partitions = list(company_partitions(analysis))
+    total = len(partitions)
+    progress(0.0, f"Membuat laporan {total} company...")
+
+    rows = []
+    used = set()
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        completed = _run_reports(partitions, analysis.cols, _company_periods(periods), executor)
+        for done, (company, future) in enumerate(completed, start=1):
+            try:
+                pdf_bytes, summary = future.result()
+            except Exception as e:
+                rows.append({"Perusahaan": company, "Error": str(e)})
+            else:
+                summary["File"] = _unique_file_name(company, used)
+                zf.writestr(summary["File"], pdf_bytes)
+                rows.append(summary)
+            progress(done / (total + 1), f"{done}/{total} company selesai ({company})")
+
+        summary_df = pd.DataFrame(rows)
+        if "Total Kasbon" in summary_df.columns:
+            summary_df = summary_df.sort_values("Total Kasbon", ascending=False, kind="stable")
+        zf.writestr(SUMMARY_FILE_NAME, summary_df.to_csv(index=False))
+    progress(1.0, f"Paket {total} company selesai")
+    return buf.getvalue()
+
+
+def start_bundle_job(executor: Executor, analysis: LazyAnalysis, periods: dict = None,
+                     process_pool: Executor = None) -> ReportJob:
+    """Jalankan build_company_bundle di executor; progress via ReportJob."""
+    job = ReportJob()
+
+    def _run():
+        return build_company_bundle(analysis, periods, process_pool, job.update)
+
+    job.future = executor.submit(contextvars.copy_context().run, _run)
+    return job
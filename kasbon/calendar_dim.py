@@ -0,0 +1,73 @@
+"""
+Dimensi kalender berbasis integer, dihitung sekali per dataset.
+
+- Bulan_Key : ordinal periode bulanan (bulan sejak Jan-1970), urut kronologis
+- Hari_Idx  : 0 = Monday ... 6 = Sunday (weekend = Hari_Idx >= WEEKEND_START)
+
+Kunci harian (Tanggal_Key, hari sejak 1970-01-01) hanya dipakai di tabel
+harian rollup; minggu ISO (Minggu_Key = Tanggal_Key hari Senin-nya) dan bulan
+diturunkan dari kunci harian tanpa membaca tanggal lagi.
+
+Label teks ("Jan-25", "Monday") hanya dipasang di tabel agregat akhir.
+"""
+import numpy as np
+import pandas as pd
+
+MONTH_KEY = "Bulan_Key"
+WEEKDAY = "Hari_Idx"
+DAY_KEY = "Tanggal_Key"
+WEEK_KEY = "Minggu_Key"
+
+HARI_ORDER = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+# Hari_Idx >= 5 -> Sabtu / Minggu
+WEEKEND_START = 5
+
+
+def add_calendar_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Tambahkan kolom Bulan_Key & Hari_Idx dari 'Tanggal Approved'."""
+    dates = df["Tanggal Approved"]
+    # datetime64[M] -> jumlah bulan sejak epoch == ordinal Period("M")
+    df[MONTH_KEY] = dates.to_numpy().astype("datetime64[M]").astype(np.int32)
+    df[WEEKDAY] = dates.dt.dayofweek.astype(np.int8)
+    return df
+
+
+def month_labels(keys) -> pd.Index:
+    """Label 'Jan-25' untuk sekumpulan Bulan_Key."""
+    ordinals = np.asarray(keys, dtype=np.int64)
+    return pd.PeriodIndex.from_ordinals(ordinals, freq="M").strftime("%b-%y")
+
+
+def day_keys(dates: pd.Series) -> np.ndarray:
+    """Tanggal_Key (hari sejak 1970-01-01) per baris."""
+    return dates.to_numpy().astype("datetime64[D]").astype(np.int32)
+
+
+def week_of(days) -> np.ndarray:
+    """Minggu_Key (Tanggal_Key hari Senin minggu ISO) dari Tanggal_Key."""
+    days = np.asarray(days, dtype=np.int64)
+    # 1970-01-01 = Kamis (Hari_Idx 3)
+    return days - (days + 3) % 7
+
+
+def month_of(days) -> np.ndarray:
+    """Bulan_Key dari Tanggal_Key."""
+    return np.asarray(days, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def day_labels(keys) -> pd.Index:
+    """Label '03 Feb 25' untuk sekumpulan Tanggal_Key."""
+    return pd.DatetimeIndex(np.asarray(keys, dtype="datetime64[D]")).strftime("%d %b %y")
+
+
+def week_labels(keys) -> pd.Index:
+    """Label minggu ISO '2025-W06' untuk sekumpulan Minggu_Key."""
+    return pd.DatetimeIndex(np.asarray(keys, dtype="datetime64[D]")).strftime("%G-W%V")
@@ -0,0 +1,327 @@
+"""
+Render chart matplotlib sebagai fungsi murni: tabel agregat kecil -> bytes PNG.
+
+Fungsi di modul ini tidak menyentuh Streamlit sehingga bisa dijalankan di
+process pool (semua chart semua segmen dirender paralel) maupun di CLI.
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import matplotlib.ticker as mtick  # noqa: E402
+
+from kasbon.formatting import format_int, format_singkat  # noqa: E402
+from kasbon.profiling import stage  # noqa: E402
+
+
+def figure_to_png(fig) -> bytes:
+    """Simpan figure ke PNG (bytes) lalu tutup figure-nya."""
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def trend_chart(monthly_stats, seg_name: str) -> bytes:
+    """Chart 1: total nominal (bar) vs jumlah transaksi (line) per bulan."""
+    fig1, ax1 = plt.subplots(figsize=(11, 6))
+
+    bars = ax1.bar(
+        monthly_stats["Bulan_Str"],
+        monthly_stats["sum"],
+        color="#6baed6",
+        alpha=0.8,
+        label="Nominal (Rp)",
+    )
+    ax1.set_ylabel("Total Nominal (Rp)", color="#6baed6", fontweight="bold")
+    ax1.tick_params(axis="y", labelcolor="#6baed6")
+
+    for bar in bars:
+        height = bar.get_height()
+        ax1.text(
+            bar.get_x() + bar.get_width() / 2.0,
+            height,
+            format_singkat(height),
+            ha="center",
+            va="bottom",
+            fontsize=9,
+            fontweight="bold",
+            color="#3182bd",
+        )
+
+    ax2 = ax1.twinx()
+    ax2.plot(
+        monthly_stats["Bulan_Str"],
+        monthly_stats["count"],
+        color="#d62728",
+        marker="o",
+        linewidth=2,
+        label="Jumlah Transaksi",
+    )
+    ax2.set_ylabel("Jumlah Transaksi", color="#d62728", fontweight="bold")
+    ax2.tick_params(axis="y", labelcolor="#d62728")
+
+    for i, txt in enumerate(monthly_stats["count"]):
+        ax2.text(
+            i,
+            txt,
+            str(txt),
+            ha="center",
+            va="bottom",
+            fontsize=9,
+            color="white",
+            bbox=dict(
+                facecolor="#d62728", edgecolor="none", boxstyle="round,pad=0.2"
+            ),
+        )
+
+    plt.xticks(rotation=45)
+    plt.title(f"Total Nominal Kasbon vs Jumlah Transaksi per Bulan – {seg_name}", pad=20)
+    return figure_to_png(fig1)
+
+
+def unique_chart(monthly_uc, seg_name: str) -> bytes:
+    """Chart 1.a: tren user & company unik per bulan."""
+    # Pakai index numerik untuk X agar mudah ditambah label
+    x = list(range(len(monthly_uc)))
+
+    fig1b, axu = plt.subplots(figsize=(11, 4))
+    axu.plot(
+        x,
+        monthly_uc["User Unik"],
+        marker="o",
+        linewidth=2,
+        label="User Unik",
+    )
+
+    if "Company Unik" in monthly_uc.columns:
+        axu.plot(
+            x,
+            monthly_uc["Company Unik"],
+            marker="s",
+            linestyle="--",
+            linewidth=2,
+            label="Company Unik",
+        )
+
+    # Label sumbu X pakai nama bulan
+    axu.set_xticks(x)
+    axu.set_xticklabels(monthly_uc["Bulan_Str"], rotation=45)
+
+    axu.set_ylabel("Jumlah Unik")
+    axu.set_title(f"Tren User & Company Unik per Bulan – {seg_name}")
+    axu.grid(axis="y", linestyle="--", alpha=0.3)
+    axu.legend()
+
+    # === Tambah value label di atas titik User Unik ===
+    max_user = monthly_uc["User Unik"].max() if len(monthly_uc) > 0 else 0
+    offset_user = max_user * 0.05 if max_user > 0 else 0.3
+    for i, val in enumerate(monthly_uc["User Unik"]):
+        axu.text(
+            x[i],
+            val + offset_user,
+            str(int(val)),
+            ha="center",
+            va="bottom",
+            fontsize=9,
+        )
+
+    # === Tambah value label untuk Company Unik (kalau ada) ===
+    if "Company Unik" in monthly_uc.columns:
+        max_comp = monthly_uc["Company Unik"].max()
+        offset_comp = max_comp * 0.05 if max_comp > 0 else 0.3
+        for i, val in enumerate(monthly_uc["Company Unik"]):
+            axu.text(
+                x[i] + 0.1,        # geser dikit supaya nggak numpuk
+                val + offset_comp,
+                str(int(val)),
+                ha="left",
+                va="bottom",
+                fontsize=9,
+            )
+
+    return figure_to_png(fig1b)
+
+
+def top_users_chart(top_users_amount, nama_karyawan_col: str, seg_name: str) -> bytes:
+    """Chart 2: Top 10 karyawan berdasarkan nominal."""
+    fig3, ax3 = plt.subplots(figsize=(12, 7))
+    y_pos = range(len(top_users_amount))
+    bars_h = ax3.barh(
+        y_pos,
+        top_users_amount["Total_Kasbon"],
+        color="#0ea5e9",
+        alpha=0.9,
+    )
+
+    ax3.set_yticks(y_pos)
+    ax3.set_yticklabels(top_users_amount[nama_karyawan_col], fontsize=10)
+    ax3.invert_yaxis()
+
+    ax3.set_xlabel("Total Nilai Pinjaman (Rp)", fontsize=11)
+    ax3.set_title(
+        f"Top Amount 10 Karyawan (Nominal) – {seg_name}",
+        fontsize=14,
+        pad=15,
+    )
+
+    ax3.xaxis.set_major_formatter(
+        mtick.FuncFormatter(lambda x, pos: format_singkat(x))
+    )
+    ax3.grid(axis="x", linestyle="--", alpha=0.3)
+
+    max_val_amt = float(top_users_amount["Total_Kasbon"].max())
+    for bar in bars_h:
+        width = bar.get_width()
+        label_x = width + (max_val_amt * 0.01 if max_val_amt > 0 else 0)
+        ax3.text(
+            label_x,
+            bar.get_y() + bar.get_height() / 2,
+            format_singkat(width),
+            va="center",
+            fontsize=10,
+            fontweight="bold",
+            color="#111111",
+        )
+
+    plt.tight_layout()
+    return figure_to_png(fig3)
+
+
+def weekday_chart(trx_per_day, seg_name: str) -> bytes:
+    """Chart 3: volume transaksi per hari."""
+    fig4, ax4 = plt.subplots(figsize=(10, 5))
+    colors = [
+        "#b3cde3" if x < 5 else "#fdb462"
+        for x in range(len(trx_per_day))
+    ]
+    bars_d = ax4.bar(trx_per_day["Hari"], trx_per_day["Jumlah"], color=colors)
+
+    max_trx = trx_per_day["Jumlah"].max()
+    for bar in bars_d:
+        height = bar.get_height()
+        ax4.text(
+            bar.get_x() + bar.get_width() / 2.0,
+            height + (max_trx * 0.03 if max_trx > 0 else 0.1),
+            format_int(height),
+            ha="center",
+            va="bottom",
+            fontsize=10,
+        )
+
+    ax4.set_title(f"Volume Transaksi per Hari – {seg_name}")
+    if max_trx > 0:
+        ax4.set_ylim(top=max_trx * 1.25)
+
+    return figure_to_png(fig4)
+
+
+def segment_chart_jobs(results: dict) -> dict:
+    """
+    Daftar chart untuk satu segmen: {key_results: (nama_artefak, fungsi, args)}.
+    Chart Top 10 hanya dibuat kalau ada datanya.
+    """
+    seg_name = results["name"]
+    if not results["has_data"]:
+        return {}
+    jobs = {
+        "chart1": (
+            f"trend_keuangan_{seg_name}.png",
+            trend_chart,
+            (results["monthly_stats"], seg_name),
+        ),
+        "chart1b": (
+            f"trend_user_company_{seg_name}.png",
+            unique_chart,
+            (results["monthly_uc"], seg_name),
+        ),
+        "chart4": (
+            f"daily_trx_{seg_name}.png",
+            weekday_chart,
+            (results["trx_per_day"], seg_name),
+        ),
+    }
+    if not results["top_users_amount"].empty:
+        jobs["chart3"] = (
+            f"top_users_{seg_name}.png",
+            top_users_chart,
+            (results["top_users_amount"], results["nama_karyawan_col"], seg_name),
+        )
+    return jobs
+
+
+def _run_inline(fn, *args) -> Future:
+    """Jalankan langsung di proses ini, bungkus hasilnya sebagai Future."""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _cache_result(cache, key):
+    """Callback Future: simpan PNG ke cache kalau render berhasil."""
+    def _done(future):
+        if future.exception() is None:
+            cache.put(key, future.result())
+    return _done
+
+
+def chart_cache_key(cache_key, seg_name: str, key: str) -> tuple:
+    """Kunci PNG chart di cache bersama (kasbon.shared_cache)."""
+    return ("chart", cache_key, seg_name, key)
+
+
+def submit_charts(analysis: dict, executor=None, cache=None, cache_key=None) -> dict:
+    """
+    Kirim semua chart semua segmen sekaligus.
+    Return {nama_segmen: {key_results: (nama_artefak, Future[bytes])}}.
+    Tanpa executor, chart dirender serial di proses ini.
+    Dengan cache (+ cache_key dataset/opsi), PNG yang sudah pernah dirender
+    dipakai ulang dan PNG baru disimpan ke cache begitu selesai.
+    """
+    submitted = {}
+    for seg_name, results in analysis.items():
+        submitted[seg_name] = {}
+        for key, (artifact_name, fn, args) in segment_chart_jobs(results).items():
+            shared_key = chart_cache_key(cache_key, seg_name, key)
+            png = cache.get(shared_key) if cache is not None else None
+            if png is not None:
+                future = Future()
+                future.set_result(png)
+            elif executor is None:
+                with stage(f"chart:{artifact_name}"):
+                    future = _run_inline(fn, *args)
+            else:
+                future = executor.submit(fn, *args)
+            if cache is not None and png is None:
+                future.add_done_callback(_cache_result(cache, shared_key))
+            submitted[seg_name][key] = (artifact_name, future)
+    return submitted
+
+
+def chart_workers() -> int:
+    """Jumlah worker process chart (env KASBON_CHART_WORKERS, default jumlah CPU, max 8)."""
+    default = min(8, os.cpu_count() or 1)
+    return int(os.environ.get("KASBON_CHART_WORKERS", default))
+
+
+def create_chart_pool(workers: int = None):
+    """
+    Process pool untuk render chart; None kalau cukup 1 worker (serial).
+    Pakai konteks 'spawn' karena server Streamlit multi-thread (fork tidak aman).
+    """
+    workers = chart_workers() if workers is None else workers
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
@@ -0,0 +1,257 @@
+"""
+CLI batch tanpa Streamlit: ingestion -> analitik segmen -> PDF, per file.
+
+Contoh:
+    python -m kasbon.cli exports/ "arsip/2025-*.xlsx" -o laporan/ -j 8
+    python -m kasbon.cli "exports/*.csv" "exports/*.parquet" -o laporan/
+
+Setiap file menghasilkan <nama_file>.pdf di folder output, plus satu
+summary.json berisi metrik `results` semua segmen untuk semua file. File
+dengan nama sama (mis. x.xlsx & x.csv, atau x.xlsx di dua folder) diberi
+akhiran -2, -3, … sesuai urutan path.
+Dengan --cubes, cube agregat tiap file (<nama_file>.cube.arrow) ikut ditulis;
+--cube-partials menambahkan parsial exact per user-nya (<nama_file>.partials.arrow).
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from kasbon.analytics import AGG_BACKEND, AGG_BACKENDS, SEGMENT_ALL
+from kasbon.charts import submit_charts
+from kasbon.cube import CUBE_EXT, PARTIALS_EXT, Cube
+from kasbon.ingest import INPUT_TYPES, IngestError, read_kasbon_file
+from kasbon.profiling import Profiler, activate, configure_logging
+from kasbon.report import build_report
+
+# metrik skalar dari dict results yang ikut ke summary
+SUMMARY_METRICS = [
+    "total_kasbon",
+    "total_trx",
+    "total_user",
+    "avg_ticket",
+    "max_ticket",
+    "weekend_amount",
+    "weekend_trx",
+    "weekend_amount_pct",
+    "weekend_trx_pct",
+]
+SUMMARY_TABLES = ["monthly_stats", "monthly_uc", "top_users_amount", "top_users_qty", "trx_per_day"]
+
+
+def expand_inputs(inputs: list) -> list:
+    """Folder -> semua file .xlsx / .csv / .parquet di dalamnya; selain itu diperlakukan sebagai glob."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = [
+                path
+                for ext in INPUT_TYPES
+                for path in glob.glob(os.path.join(item, f"*.{ext}"))
+            ]
+        else:
+            matches = glob.glob(item)
+        # lewati file lock Excel (~$nama.xlsx)
+        paths += [p for p in matches if not os.path.basename(p).startswith("~$")]
+    return sorted(dict.fromkeys(paths))
+
+
+def output_stems(paths: list, output_dir: str) -> dict:
+    """
+    Path input -> prefix path output (nama file tanpa ekstensi). Nama yang
+    bentrok diberi akhiran -2, -3, … sesuai urutan `paths`.
+    """
+    stems, used = {}, set()
+    for path in paths:
+        name = base = os.path.splitext(os.path.basename(path))[0]
+        suffix = 1
+        while name.lower() in used:
+            suffix += 1
+            name = f"{base}-{suffix}"
+        used.add(name.lower())
+        stems[path] = os.path.join(output_dir, name)
+    return stems
+
+
+def _to_json(value):
+    """Konversi nilai numpy/pandas ke tipe JSON biasa (NaN -> null)."""
+    if isinstance(value, pd.DataFrame):
+        return [
+            {str(k): _to_json(v) for k, v in row.items()}
+            for row in value.to_dict(orient="records")
+        ]
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def summarize_results(results: dict) -> dict:
+    """Versi JSON dari satu dict results segmen."""
+    summary = {"has_data": bool(results["has_data"])}
+    for key in SUMMARY_METRICS:
+        summary[key] = _to_json(results[key])
+    for key in SUMMARY_TABLES:
+        table = results.get(key)
+        summary[key] = _to_json(table) if table is not None else None
+    return summary
+
+
+def process_file(path: str, stem: str, backend: str = AGG_BACKEND,
+                 export_cube: bool = False, export_partials: bool = False) -> dict:
+    """
+    Proses satu workbook: tulis <stem>.pdf (dan cube), kembalikan ringkasan
+    metrik (aman di-pickle).
+    """
+    started = time.perf_counter()
+    entry = {"file": path, "report": None, "status": "ok", "error": None}
+    configure_logging()
+    profiler = Profiler(run_id=os.path.basename(path))
+    try:
+        with activate(profiler):
+            entry.update(
+                _build_file_report(path, stem, backend, export_cube, export_partials)
+            )
+    except IngestError as e:
+        entry.update(status="skipped" if e.level == "warning" else "error", error=str(e))
+    except Exception as e:
+        entry.update(status="error", error=f"{type(e).__name__}: {e}")
+    entry["seconds"] = round(time.perf_counter() - started, 3)
+    entry["stages"] = profiler.snapshot()
+    return entry
+
+
+def _build_file_report(path: str, stem: str, backend: str, export_cube: bool,
+                       export_partials: bool) -> dict:
+    with open(path, "rb") as f:
+        df = read_kasbon_file(f.read())
+    cube = Cube.build(df, backend=backend, source=os.path.basename(path))
+    del df
+    analysis = dict(cube.analysis(backend=backend))
+
+    # chart dirender serial di worker ini (paralelisme ada di level file)
+    charts = submit_charts(analysis)
+    images = {
+        key: future.result() for key, (_, future) in charts[SEGMENT_ALL].items()
+    }
+    pdf_bytes = build_report(
+        analysis[SEGMENT_ALL],
+        analysis.get("EWA"),
+        analysis.get("PPOB"),
+        images=images,
+    )
+
+    report_path = stem + ".pdf"
+    with open(report_path, "wb") as f:
+        f.write(pdf_bytes)
+    cube_path = partials_path = None
+    if export_cube:
+        cube_path = stem + CUBE_EXT
+        with open(cube_path, "wb") as f:
+            f.write(cube.to_bytes())
+    if export_partials:
+        partials_path = stem + PARTIALS_EXT
+        with open(partials_path, "wb") as f:
+            f.write(cube.partials_bytes())
+
+    return {
+        "report": report_path,
+        "cube": cube_path,
+        "partials": partials_path,
+        "periode_start": _to_json(analysis[SEGMENT_ALL]["periode_start"]),
+        "periode_end": _to_json(analysis[SEGMENT_ALL]["periode_end"]),
+        "segments": {
+            name: summarize_results(results) for name, results in analysis.items()
+        },
+    }
+
+
+def run_batch(paths: list, output_dir: str, workers: int, log=print,
+              backend: str = AGG_BACKEND, export_cube: bool = False,
+              export_partials: bool = False) -> list:
+    """Proses banyak file paralel di process pool, urutan hasil mengikuti `paths`."""
+    os.makedirs(output_dir, exist_ok=True)
+    # nama output ditetapkan sebelum job dikirim: dua worker tidak menulis file yang sama
+    stems = output_stems(paths, output_dir)
+    if workers <= 1:
+        entries = []
+        for path in paths:
+            entries.append(process_file(path, stems[path], backend, export_cube, export_partials))
+            log(f"[{entries[-1]['status']}] {path} ({entries[-1]['seconds']}s)")
+        return entries
+
+    entries = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_file, p, stems[p], backend, export_cube, export_partials): p
+            for p in paths
+        }
+        for future in as_completed(futures):
+            entry = future.result()
+            entries[futures[future]] = entry
+            log(f"[{entry['status']}] {entry['file']} ({entry['seconds']}s)")
+    return [entries[p] for p in paths]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m kasbon.cli",
+        description="Generate laporan PDF kasbon untuk banyak file xlsx / csv / parquet tanpa Streamlit.",
+    )
+    parser.add_argument("inputs", nargs="+", help="folder atau glob file .xlsx / .csv / .parquet")
+    parser.add_argument("-o", "--output-dir", default="reports", help="folder output PDF")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count() or 1,
+        help="jumlah worker process (default: jumlah CPU)",
+    )
+    parser.add_argument(
+        "--backend", choices=AGG_BACKENDS, default=AGG_BACKEND,
+        help="mesin agregasi: pandas atau arrow (pyarrow.compute)",
+    )
+    parser.add_argument(
+        "--cubes", action="store_true",
+        help="tulis juga cube agregat per file (<nama>.cube.arrow)",
+    )
+    parser.add_argument(
+        "--cube-partials", action="store_true",
+        help="tulis juga parsial exact per user tiap cube (<nama>.partials.arrow)",
+    )
+    parser.add_argument(
+        "--summary", default=None,
+        help="path summary JSON (default: <output-dir>/summary.json)",
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("Tidak ada file .xlsx / .csv / .parquet yang cocok.", file=sys.stderr)
+        return 2
+
+    entries = run_batch(
+        paths, args.output_dir, args.workers, backend=args.backend,
+        export_cube=args.cubes, export_partials=args.cube_partials,
+    )
+
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({"files": entries}, f, ensure_ascii=False, indent=2)
+    print(f"Summary: {summary_path}")
+
+    failed = sum(entry["status"] == "error" for entry in entries)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""
+Cube agregat (materialized) per dataset.
+
+Isinya sel segmen × bulan × hari × perusahaan dengan sum/count/max/rows (lihat
+kasbon.analytics.build_cells), tabel harian segmen × tanggal untuk rollup
+(kasbon.analytics.build_daily), sketch HLL user & company per segmen × bulan
+(kasbon.analytics.build_sketches), tabel Top 10 semua segmen
+(kasbon.analytics.build_top) + metadata dataset (kolom terdeteksi, periode
+total & per company, jumlah transaksi). Semua section dashboard dan PDF
+dijawab dari cube lewat LazyAnalysis, jadi data baris hanya dibaca sekali
+saat cube dibangun, apa pun opsi analisis (distinct, backend) yang dipilih.
+
+Cube tidak menyimpan baris per user: user unik dari sketch (state yang bisa
+di-merge antar sel), bukan dari daftar user. Parsial exact per user
+(kasbon.analytics.build_partials) adalah artefak terpisah yang opsional: untuk
+user unik exact dan paket laporan per company. Di dalam session cube ikut
+membawanya kalau sudah dibangun; ekspornya file sendiri (<nama>.partials.arrow)
+yang hanya bisa dibuka bersama cube asalnya.
+
+Cube bisa diekspor ke satu file Arrow IPC dan dibuka lagi tanpa data baris:
+satu baris per tabel (nama, bytes Arrow IPC tabel itu), metadata JSON di schema.
+"""
+import io
+import json
+import threading
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from kasbon.analytics import (
+    AGG_BACKEND,
+    LazyAnalysis,
+    _arrow_backend,
+    build_aggregates,
+    build_top,
+    company_column,
+    detect_columns,
+)
+from kasbon.profiling import stage
+from kasbon.sketch import HLL_PRECISION
+
+CUBE_EXT = ".cube.arrow"
+PARTIALS_EXT = ".partials.arrow"
+# naikkan kalau bentuk tabel / metadata berubah
+CUBE_FORMAT_VERSION = 1
+
+_META_KEY = b"kasbon.cube"
+_PARTIALS_KEY = b"kasbon.partials"
+# tabel yang disimpan sebagai DataFrame (sel & parsial: representasi backend)
+_FRAMES = ("cells", "partials")
+
+
+class CubeError(Exception):
+    """File cube tidak valid atau formatnya tidak dikenal."""
+
+
+def _iso(value):
+    return None if value is None or pd.isna(value) else pd.Timestamp(value).isoformat()
+
+
+def _ipc_bytes(table: pa.Table, metadata: dict = None) -> bytes:
+    buf = io.BytesIO()
+    feather.write_feather(table.replace_schema_metadata(metadata), buf, compression="zstd")
+    return buf.getvalue()
+
+
+def _read_ipc(data) -> pa.Table:
+    try:
+        return feather.read_table(pa.BufferReader(data))
+    except (pa.ArrowInvalid, OSError) as e:
+        raise CubeError(f"Bukan file cube Arrow: {e}") from e
+
+
+def _arrow(frame) -> pa.Table:
+    if isinstance(frame, pa.Table):
+        return frame
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def _sketch_tables(prefix: str, sketches: dict) -> dict:
+    """{"<prefix>_user": tabel Arrow, "<prefix>_company": ...} untuk file cube."""
+    return {
+        f"{prefix}_{name}": _arrow(sketches[name])
+        for name in ("user", "company") if sketches[name] is not None
+    }
+
+
+def _read_sketches(tables: dict, prefix: str, precision: int) -> dict:
+    sketches = {"precision": precision}
+    for name in ("user", "company"):
+        table = tables.get(f"{prefix}_{name}")
+        sketches[name] = None if table is None else table.to_pandas()
+    return sketches
+
+
+def _read_partials(data: bytes, meta: dict) -> pa.Table:
+    """Parsial exact hasil Cube.partials_bytes; harus milik cube `meta`."""
+    table = _read_ipc(data)
+    raw = (table.schema.metadata or {}).get(_PARTIALS_KEY)
+    if raw is None:
+        raise CubeError("File ini bukan parsial exact cube kasbon.")
+    if json.loads(raw).get("cube") != meta.get("id"):
+        raise CubeError("File parsial exact ini bukan milik cube yang dibuka.")
+    return table.replace_schema_metadata(None)
+
+
+class Cube:
+    """
+    Sel + tabel harian + sketch + Top 10 + metadata, opsional parsial exact
+    per user (dict seperti kasbon.analytics.build_aggregates). Sel & parsial
+    disimpan dalam representasi backend yang membangunnya; representasi lain
+    (DataFrame / tabel Arrow) dibuat saat pertama diminta.
+    """
+
+    def __init__(self, aggregates: dict, meta: dict):
+        self.meta = meta
+        self._lock = threading.Lock()
+        self.daily = aggregates["daily"]
+        self.sketches = aggregates["sketches"]
+        self.top = aggregates.get("top")
+        self._frames = {
+            name: {"arrow" if isinstance(table, pa.Table) else "pandas": table}
+            for name, table in aggregates.items()
+            if name in _FRAMES and table is not None
+        }
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, backend: str = AGG_BACKEND, source: str = None,
+              partials: bool = True) -> "Cube":
+        """
+        Satu pass agregasi atas data baris bersih. partials=False: tanpa parsial
+        exact per user (user unik dari sketch, Top 10 dihitung sekarang).
+        """
+        cols = detect_columns(df.columns)
+        with stage("cube", rows=len(df)):
+            # presisi tersimpan; pilihan presisi yang lebih rendah diturunkan saat analisis
+            aggregates = build_aggregates(df, cols, backend, partials=partials)
+            dates = df["Tanggal Approved"]
+            company_periods = {}
+            company = company_column(cols)
+            if company:
+                # periode per company untuk paket laporan per company (kasbon.bundle)
+                spans = dates.groupby(df[company], observed=True).agg(["min", "max"])
+                company_periods = {
+                    str(name): [_iso(row["min"]), _iso(row["max"])]
+                    for name, row in spans.iterrows()
+                }
+        meta = {
+            "format": CUBE_FORMAT_VERSION,
+            # pasangan cube <-> file parsial exact-nya
+            "id": uuid.uuid4().hex,
+            "cols": cols,
+            "periode_start": _iso(dates.min()),
+            "periode_end": _iso(dates.max()),
+            "company_periods": company_periods,
+            "total_rows": int(len(df)),
+            "source": source,
+            "created": datetime.now().isoformat(timespec="seconds"),
+        }
+        return cls(aggregates, meta)
+
+    @property
+    def cols(self) -> dict:
+        return self.meta["cols"]
+
+    @property
+    def num_cells(self) -> int:
+        return len(next(iter(self._frames["cells"].values())))
+
+    @property
+    def has_partials(self) -> bool:
+        return "partials" in self._frames
+
+    @property
+    def nbytes(self) -> int:
+        """Memori sel & parsial (semua representasi yang sudah dibuat), harian, sketch & Top 10."""
+        with self._lock:
+            tables = [t for reps in self._frames.values() for t in reps.values()]
+        for sketches in (self.daily["sketches"], self.sketches):
+            tables += [sketches["user"], sketches["company"]]
+        tables += [self.daily["table"], self.top]
+        return sum(
+            table.nbytes if isinstance(table, pa.Table)
+            else int(table.memory_usage(deep=True).sum())
+            for table in tables if table is not None
+        )
+
+    def _frame(self, name: str, backend: str):
+        reps = self._frames.get(name)
+        if reps is None:
+            return None
+        if backend not in reps:
+            if backend == "arrow":
+                reps["arrow"] = _arrow_backend("arrow").to_table(reps["pandas"])
+            else:
+                reps["pandas"] = reps["arrow"].to_pandas()
+        return reps[backend]
+
+    def cells(self, backend: str = "pandas"):
+        """Tabel sel sebagai DataFrame ("pandas") atau tabel Arrow ("arrow")."""
+        with self._lock:
+            return self._frame("cells", backend)
+
+    def partials(self, backend: str = "pandas"):
+        """Parsial exact per user (DataFrame / tabel Arrow), None kalau cube tanpa parsial."""
+        with self._lock:
+            return self._frame("partials", backend)
+
+    def analysis(self, distinct: str = "exact", precision: int = HLL_PRECISION,
+                 backend: str = AGG_BACKEND, cache=None, cache_key=None) -> LazyAnalysis:
+        """
+        Hasil semua segmen (dihitung per segmen saat diminta) dari cube ini.
+        cache / cache_key: cache results bersama, lihat LazyAnalysis.
+        """
+        start, end = self.meta["periode_start"], self.meta["periode_end"]
+        aggregates = {
+            "cells": self.cells(backend),
+            "partials": self.partials(backend),
+            "daily": self.daily,
+            "sketches": self.sketches,
+            "top": self.top,
+        }
+        return LazyAnalysis(
+            aggregates,
+            self.cols,
+            periode_start=pd.Timestamp(start) if start else None,
+            periode_end=pd.Timestamp(end) if end else None,
+            distinct=distinct,
+            precision=precision,
+            backend=backend,
+            cache=cache,
+            cache_key=cache_key,
+        )
+
+    def _top(self):
+        """Tabel Top 10 untuk file cube; cube yang membawa parsial menghitungnya dari parsial."""
+        with self._lock:
+            if self.top is None:
+                self.top = build_top(self._frame("partials", "pandas"), self.cols)
+            return self.top
+
+    def _tables(self) -> dict:
+        """{nama: tabel Arrow} untuk file cube (tanpa parsial exact)."""
+        return {
+            "cells": self.cells("arrow"),
+            "daily": _arrow(self.daily["table"]),
+            **_sketch_tables("daily", self.daily["sketches"]),
+            **_sketch_tables("sketch", self.sketches),
+            "top": _arrow(self._top()),
+        }
+
+    def to_bytes(self) -> bytes:
+        """Ekspor ke Arrow IPC: satu baris per tabel (bytes IPC zstd), metadata di schema."""
+        tables = self._tables()
+        meta = dict(
+            self.meta,
+            sketch_precision=self.sketches["precision"],
+            rollup_precision=self.daily["sketches"]["precision"],
+        )
+        outer = pa.table(
+            {"table": list(tables), "ipc": [_ipc_bytes(t) for t in tables.values()]},
+            schema=pa.schema(
+                [("table", pa.string()), ("ipc", pa.large_binary())],
+                metadata={_META_KEY: json.dumps(meta, ensure_ascii=False).encode()},
+            ),
+        )
+        buf = io.BytesIO()
+        feather.write_feather(outer, buf, compression="uncompressed")
+        return buf.getvalue()
+
+    def partials_bytes(self) -> bytes:
+        """Ekspor parsial exact (file <nama>.partials.arrow), hanya untuk cube yang punya parsial."""
+        if not self.has_partials:
+            raise CubeError("Cube ini tidak membawa parsial exact per user.")
+        link = json.dumps({"cube": self.meta.get("id")}).encode()
+        return _ipc_bytes(self.partials("arrow"), {_PARTIALS_KEY: link})
+
+    @classmethod
+    def from_bytes(cls, data: bytes, partials: bytes = None) -> "Cube":
+        """
+        Buka cube hasil `to_bytes`, opsional bersama file parsial exact-nya
+        (`partials_bytes`); raise CubeError kalau bukan file cube / pasangannya.
+        """
+        table = _read_ipc(data)
+        raw = (table.schema.metadata or {}).get(_META_KEY)
+        if raw is None:
+            raise CubeError("File Arrow ini tidak berisi metadata cube kasbon.")
+        meta = json.loads(raw)
+        version = meta.get("format")
+        if version != CUBE_FORMAT_VERSION:
+            raise CubeError(
+                f"Format cube {version} tidak didukung "
+                f"(versi sekarang {CUBE_FORMAT_VERSION})."
+            )
+
+        tables = {
+            name: _read_ipc(blob.as_buffer())
+            for name, blob in zip(table["table"].to_pylist(), table["ipc"])
+        }
+        aggregates = {
+            "cells": tables["cells"],
+            "daily": {
+                "table": tables["daily"].to_pandas(),
+                "sketches": _read_sketches(tables, "daily", meta["rollup_precision"]),
+            },
+            "sketches": _read_sketches(tables, "sketch", meta["sketch_precision"]),
+            "top": tables["top"].to_pandas(),
+        }
+        if partials is not None:
+            aggregates["partials"] = _read_partials(partials, meta)
+        return cls(aggregates, meta)
@@ -0,0 +1,128 @@
+"""
+Filter dashboard (rentang tanggal, company, jenis) berbasis index.
+
+`FilterIndex` dibangun sekali per dataset:
+- baris terurut 'Tanggal Approved' -> rentang tanggal = searchsorted (slice)
+- posisi baris per company / per jenis (array terurut naik) + kode per baris
+
+Menerapkan filter hanya menyentuh posisi baris yang terpilih; tidak ada
+scan boolean atas seluruh DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+from kasbon.analytics import detect_columns
+from kasbon.ingest import SEGMENT_COLUMN
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+class _Dimension:
+    """Posisi baris per nilai satu kolom + kode integer per baris."""
+
+    def __init__(self, values: pd.Series):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, labels = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, labels = pd.factorize(values)
+        # stable -> posisi dalam satu grup tetap urut naik
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        self.codes = codes
+        # nilai kosong (kode -1) tidak masuk index
+        self.positions = {
+            labels[i]: order[bounds[i]:bounds[i + 1]]
+            for i in range(len(labels))
+            if bounds[i + 1] > bounds[i]
+        }
+        self.code_of = {label: i for i, label in enumerate(labels)}
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def size(self, values) -> int:
+        return sum(len(self.positions.get(v, _EMPTY)) for v in values)
+
+    def select(self, values, lo: int, hi: int) -> np.ndarray:
+        """Posisi baris (terurut) bernilai salah satu `values` di [lo, hi)."""
+        parts = [_between(self.positions.get(v, _EMPTY), lo, hi) for v in values]
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def keep(self, selected: np.ndarray, values) -> np.ndarray:
+        """Saring posisi terpilih lewat kode barisnya (hanya baris terpilih yang dibaca)."""
+        codes = [self.code_of[v] for v in values if v in self.code_of]
+        return selected[np.isin(self.codes[selected], codes)]
+
+
+def _between(positions: np.ndarray, lo: int, hi: int) -> np.ndarray:
+    """Bagian array posisi (terurut) yang ada di [lo, hi)."""
+    return positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)]
+
+
+class FilterIndex:
+    """Index filter untuk satu DataFrame bersih (lihat kasbon.ingest.clean_dataframe)."""
+
+    def __init__(self, df: pd.DataFrame):
+        if not df["Tanggal Approved"].is_monotonic_increasing:
+            # dataset lama (sebelum ingest mengurutkan tanggal): urutkan sekali di sini
+            df = df.sort_values("Tanggal Approved", kind="stable", ignore_index=True)
+        self.frame = df
+        self.dates = df["Tanggal Approved"].to_numpy()
+        self.company_col = detect_columns(df.columns)["nama_perusahaan_col"]
+        self.companies = _Dimension(df[self.company_col]) if self.company_col else None
+        self.jenis = _Dimension(df[SEGMENT_COLUMN]) if SEGMENT_COLUMN in df.columns else None
+
+    @property
+    def date_range(self):
+        """(tanggal pertama, tanggal terakhir) sebagai datetime.date."""
+        return pd.Timestamp(self.dates[0]).date(), pd.Timestamp(self.dates[-1]).date()
+
+    def _date_bounds(self, start=None, end=None):
+        """Rentang posisi [lo, hi) untuk tanggal start..end (inklusif, per hari)."""
+        lo = 0
+        hi = len(self.dates)
+        if start is not None:
+            lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), side="left")
+        if end is not None:
+            next_day = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+            hi = np.searchsorted(self.dates, np.datetime64(next_day), side="left")
+        return int(lo), int(hi)
+
+    def positions(self, start=None, end=None, companies=None, jenis=None):
+        """
+        Posisi baris yang lolos filter (array terurut), atau slice kalau
+        hanya rentang tanggal yang dipakai.
+        """
+        lo, hi = self._date_bounds(start, end)
+        active = [
+            (dimension, values)
+            for dimension, values in ((self.companies, companies), (self.jenis, jenis))
+            if values and dimension is not None
+        ]
+        if not active:
+            return slice(lo, hi)
+        # mulai dari dimensi paling selektif, dimensi lain cukup cek kode baris terpilih
+        active.sort(key=lambda item: item[0].size(item[1]))
+        (dimension, values), rest = active[0], active[1:]
+        selected = dimension.select(values, lo, hi)
+        for dimension, values in rest:
+            selected = dimension.keep(selected, values)
+        return selected
+
+    def apply(self, start=None, end=None, companies=None, jenis=None) -> pd.DataFrame:
+        """DataFrame hasil filter (rentang tanggal saja = slice tanpa copy)."""
+        selected = self.positions(start, end, companies, jenis)
+        if isinstance(selected, slice):
+            return self.frame.iloc[selected]
+        return self.frame.take(selected)
+
+
+def filter_key(filters: dict) -> str:
+    """Kunci cache stabil untuk kombinasi filter aktif."""
+    return "|".join(
+        f"{name}={','.join(map(str, value)) if isinstance(value, (list, tuple)) else value}"
+        for name, value in sorted(filters.items())
+    )
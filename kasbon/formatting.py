@@ -0,0 +1,29 @@
+"""Fungsi helper formatting angka (dipakai dashboard, chart, dan PDF)."""
+
+
+def format_rupiah(value: float) -> str:
+    try:
+        return f"Rp {value:,.0f}".replace(",", ".")
+    except Exception:
+        return "Rp 0"
+
+def format_int(num) -> str:
+    """Format integer dengan pemisah ribuan '.' (contoh: 50.579)"""
+    try:
+        return f"{int(num):,}".replace(",", ".")
+    except Exception:
+        return "0"
+
+def format_singkat(num: float) -> str:
+    """Mengubah angka besar menjadi format pendek (2M, 500jt, 10k)"""
+    try:
+        n = float(num)
+    except Exception:
+        return "0"
+    if n >= 1_000_000_000:
+        return f"{n/1_000_000_000:.1f}M"
+    elif n >= 1_000_000:
+        return f"{n/1_000_000:.0f}jt"
+    elif n >= 1000:
+        return f"{n/1000:.0f}k"
+    return f"{n:,.0f}".replace(",", ".")
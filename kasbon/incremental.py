@@ -0,0 +1,384 @@
+"""
+Mode append: data kasbon dikirim sebagai extract harian (delta).
+
+Histori per nama disimpan di <DATA_DIR>/<nama>.history/, dipartisi per bulan
+Tanggal Approved di months/<YYYY-MM>.<revisi>/:
+- index.npy      : hash transaksi (user, timestamp, nominal) bulan itu, terurut, untuk dedup
+- cells.arrow    : sel segmen × bulan × hari × perusahaan (kasbon.analytics.build_cells)
+- partials.arrow : parsial per user (kasbon.analytics.build_partials), untuk user unik
+                   exact, Top 10, dan paket laporan per company
+- daily*.arrow   : tabel harian + sketch harian untuk rollup (kasbon.analytics.build_daily)
+- sketch_*.arrow : sketch HLL user & company per segmen × bulan (kasbon.analytics.build_sketches)
+meta.json berisi kolom terdeteksi, periode, jumlah transaksi, file yang sudah
+diproses, presisi sketch, dan direktori aktif tiap bulan ("months").
+
+Delta hanya di-hash dan diagregasi untuk baris barunya, lalu digabung ke
+partisi bulan yang disentuhnya saja; bulan lain tidak dibaca ulang maupun
+ditulis ulang. Partisi yang berubah ditulis ke direktori revisi baru dan
+meta.json yang menunjuknya ditulis terakhir sebagai penanda commit. Semua
+kunci agregat memuat bulan, jadi saat dibaca partisi cukup disambung.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pandas.api.types import union_categoricals
+
+from kasbon.analytics import (
+    USER_COLUMN,
+    LazyAnalysis,
+    _detail_columns,
+    build_aggregates,
+    build_cells,
+    build_daily,
+    build_partials,
+    build_sketches,
+    detect_columns,
+    merge_cells,
+    merge_daily,
+    merge_partials,
+    merge_sketches,
+)
+from kasbon.calendar_dim import MONTH_KEY, add_calendar_columns
+from kasbon.ingest import SEGMENT_COLUMN, SEGMENT_OTHER, SEGMENTS, match_columns
+from kasbon.rollups import ROLLUP_PRECISION
+from kasbon.sketch import SKETCH_PRECISION
+from kasbon.store import DATA_DIR, dataset_name
+
+HISTORY_EXT = ".history"
+MONTHS_DIR = "months"
+
+_locks = {}
+_locks_guard = threading.Lock()
+# state yang sudah dimuat, dipakai ulang selama meta.json tidak berubah
+_loaded = {}
+
+
+def _lock_for(path: str) -> threading.RLock:
+    with _locks_guard:
+        return _locks.setdefault(path, threading.RLock())
+
+
+def history_dir(name: str, data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, dataset_name(name) + HISTORY_EXT)
+
+
+def list_histories(data_dir: str = DATA_DIR) -> list:
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(
+        f[: -len(HISTORY_EXT)] for f in os.listdir(data_dir) if f.endswith(HISTORY_EXT)
+    )
+
+
+def history_exists(name: str, data_dir: str = DATA_DIR) -> bool:
+    return os.path.exists(os.path.join(history_dir(name, data_dir), "meta.json"))
+
+
+def transaction_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash uint64 per transaksi dari (user, timestamp, nominal)."""
+    key = pd.DataFrame({
+        "user": df[USER_COLUMN],
+        "ts": df["Tanggal Approved"],
+        # nominal int32 vs float64 harus menghasilkan hash yang sama
+        "amount": df["Total Kasbon"].astype("float64"),
+    })
+    return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+
+def _month_name(month_key) -> str:
+    """Bulan_Key -> nama partisi 'YYYY-MM'."""
+    return str(np.datetime64(int(month_key), "M"))
+
+
+def _read_table(path: str, file_name: str):
+    file_path = os.path.join(path, file_name)
+    return feather.read_table(file_path).to_pandas() if os.path.exists(file_path) else None
+
+
+def _write_table(path: str, file_name: str, frame: pd.DataFrame):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    tmp = os.path.join(path, file_name + ".tmp")
+    feather.write_feather(table, tmp, compression="zstd")
+    os.replace(tmp, os.path.join(path, file_name))
+
+
+def _read_sketches(path: str, prefix: str, precision: int) -> dict:
+    sketches = {"precision": precision}
+    for name in ("user", "company"):
+        sketches[name] = _read_table(path, f"{prefix}_{name}.arrow")
+    return sketches
+
+
+def _write_sketches(path: str, prefix: str, sketches: dict):
+    for name in ("user", "company"):
+        if sketches[name] is not None:
+            _write_table(path, f"{prefix}_{name}.arrow", sketches[name])
+
+
+def _read_part(path: str, meta: dict) -> dict:
+    """Satu partisi bulan {"index", "cells", "partials", "daily", "sketches"}."""
+    return {
+        "index": np.load(os.path.join(path, "index.npy")),
+        "cells": _read_table(path, "cells.arrow"),
+        "partials": _read_table(path, "partials.arrow"),
+        "daily": {
+            "table": _read_table(path, "daily.arrow"),
+            "sketches": _read_sketches(path, "daily", meta["rollup_precision"]),
+        },
+        "sketches": _read_sketches(path, "sketch", meta["sketch_precision"]),
+    }
+
+
+def _write_part(path: str, part: dict):
+    # tulis ke file sementara lalu replace
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "index.tmp.npy"), part["index"])
+    os.replace(os.path.join(path, "index.tmp.npy"), os.path.join(path, "index.npy"))
+    _write_table(path, "cells.arrow", part["cells"])
+    _write_table(path, "partials.arrow", part["partials"])
+    _write_table(path, "daily.arrow", part["daily"]["table"])
+    _write_sketches(path, "daily", part["daily"]["sketches"])
+    _write_sketches(path, "sketch", part["sketches"])
+
+
+def load_history(name: str, data_dir: str = DATA_DIR):
+    """
+    State histori {"meta", "months"} dengan "months" = {"YYYY-MM": partisi},
+    atau None kalau belum ada. State yang sudah dimuat tidak pernah diubah:
+    append membuat state baru.
+    """
+    path = history_dir(name, data_dir)
+    meta_path = os.path.join(path, "meta.json")
+    with _lock_for(path):
+        try:
+            mtime = os.path.getmtime(meta_path)
+        except OSError:
+            return None
+
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        state = {
+            "meta": meta,
+            "months": {
+                month: _read_part(os.path.join(path, MONTHS_DIR, directory), meta)
+                for month, directory in meta["months"].items()
+            },
+        }
+        _loaded[path] = (mtime, state)
+        return state
+
+
+def _seen(index: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """Mask hash yang sudah ada di index terurut."""
+    if not len(index):
+        return np.zeros(len(hashes), dtype=bool)
+    pos = np.searchsorted(index, hashes).clip(max=len(index) - 1)
+    return index[pos] == hashes
+
+
+def _build_part(rows: pd.DataFrame, hashes: np.ndarray, meta: dict) -> dict:
+    cols = meta["cols"]
+    return {
+        "index": np.sort(hashes),
+        "cells": build_cells(rows, cols),
+        "partials": build_partials(rows, cols),
+        "daily": build_daily(rows, cols, meta["rollup_precision"]),
+        "sketches": build_sketches(rows, cols, meta["sketch_precision"]),
+    }
+
+
+def _merge_part(part: dict, delta: dict, cols: dict) -> dict:
+    index = part["index"]
+    return {
+        "index": np.insert(index, np.searchsorted(index, delta["index"]), delta["index"]),
+        "cells": merge_cells([part["cells"], delta["cells"]], cols),
+        "partials": merge_partials([part["partials"], delta["partials"]], cols),
+        "daily": merge_daily([part["daily"], delta["daily"]]),
+        "sketches": merge_sketches([part["sketches"], delta["sketches"]]),
+    }
+
+
+def _save_history(path: str, meta: dict, months: dict):
+    """
+    Tulis partisi bulan yang berubah (`months`, ke direktori di meta["months"]),
+    lalu meta.json terakhir sebagai penanda commit.
+    """
+    os.makedirs(path, exist_ok=True)
+    for month, part in months.items():
+        _write_part(os.path.join(path, MONTHS_DIR, meta["months"][month]), part)
+
+    with open(os.path.join(path, "meta.tmp"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(os.path.join(path, "meta.tmp"), os.path.join(path, "meta.json"))
+
+
+def append_delta(name: str, df: pd.DataFrame, file_key: str, data_dir: str = DATA_DIR):
+    """
+    Gabungkan delta (DataFrame bersih hasil ingestion) ke histori `name`.
+    Return (state, laporan) dengan laporan berisi jumlah baris baru & duplikat.
+    File yang sama (file_key) tidak diproses dua kali.
+    """
+    path = history_dir(name, data_dir)
+    with _lock_for(path):
+        state = load_history(name, data_dir)
+        if state is not None and file_key in state["meta"]["files"]:
+            return state, {"new_rows": 0, "duplicate_rows": 0, "already_applied": True}
+
+        if state is None:
+            old_meta = {
+                "cols": detect_columns(df.columns),
+                "total_rows": 0,
+                "periode_start": None,
+                "periode_end": None,
+                "files": [],
+                "months": {},
+                "revision": 0,
+                "rollup_precision": ROLLUP_PRECISION,
+                "sketch_precision": SKETCH_PRECISION,
+            }
+            months = {}
+        else:
+            old_meta, months = state["meta"], state["months"]
+            # delta bisa memakai varian nama kolom lain (jenis, typo perusahaan)
+            cols = old_meta["cols"]
+            df = match_columns(df, _detail_columns(cols) + [cols["jenis_col"]])
+
+        # salinan meta: state yang sudah dimuat tetap utuh sampai histori tersimpan
+        revision = old_meta["revision"] + 1
+        meta = dict(
+            old_meta,
+            files=old_meta["files"] + [file_key],
+            months=dict(old_meta["months"]),
+            revision=revision,
+            updated=datetime.now().isoformat(timespec="seconds"),
+        )
+        cols = meta["cols"]
+
+        # dedup: di dalam delta sendiri, lalu terhadap index bulan transaksinya
+        # (timestamp ikut di-hash -> transaksi yang sama selalu di bulan yang sama)
+        hashes = transaction_hashes(df)
+        month_keys = df[MONTH_KEY].to_numpy()
+        fresh = ~pd.Series(hashes).duplicated().to_numpy()
+        for key in np.unique(month_keys):
+            part = months.get(_month_name(key))
+            if part is not None:
+                rows = month_keys == key
+                fresh[rows] &= ~_seen(part["index"], hashes[rows])
+        new_rows = df[fresh]
+
+        touched = {}
+        if len(new_rows):
+            # kolom detail yang tidak ada di delta diisi kosong
+            missing = {c: None for c in _detail_columns(cols) if c not in new_rows.columns}
+            new_rows = new_rows.assign(**missing)
+            new_hashes, new_months = hashes[fresh], month_keys[fresh]
+            for key in np.unique(new_months):
+                rows = new_months == key
+                delta = _build_part(new_rows[rows], new_hashes[rows], meta)
+                month = _month_name(key)
+                touched[month] = delta if month not in months else _merge_part(months[month], delta, cols)
+                meta["months"][month] = f"{month}.{revision}"
+
+            dates = new_rows["Tanggal Approved"]
+            starts = [d for d in (meta["periode_start"], dates.min().isoformat()) if d]
+            ends = [d for d in (meta["periode_end"], dates.max().isoformat()) if d]
+            meta["periode_start"], meta["periode_end"] = min(starts), max(ends)
+            meta["total_rows"] += int(len(new_rows))
+
+        # delta tanpa baris baru (termasuk delta pertama) hanya mencatat file di meta.json
+        _save_history(path, meta, touched)
+        state = {"meta": meta, "months": {**months, **touched}}
+        _loaded[path] = (os.path.getmtime(os.path.join(path, "meta.json")), state)
+
+        # revisi lama bulan yang diganti tidak ditunjuk meta.json lagi
+        for month in touched:
+            if month in old_meta["months"]:
+                directory = os.path.join(path, MONTHS_DIR, old_meta["months"][month])
+                shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        "new_rows": int(len(new_rows)),
+        "duplicate_rows": int(len(df) - len(new_rows)),
+        "already_applied": False,
+    }
+    return state, report
+
+
+def _concat(frames: list) -> pd.DataFrame:
+    """Sambung tabel partisi; kolom categorical tetap categorical (kategori digabung)."""
+    if len(frames) == 1:
+        return frames[0]
+    combined = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            combined[col] = union_categoricals([f[col] for f in frames])
+    return combined
+
+
+def _concat_sketches(sketches: list) -> dict:
+    return {
+        "precision": sketches[0]["precision"],
+        "user": _concat([s["user"] for s in sketches]),
+        "company": (
+            None if any(s["company"] is None for s in sketches)
+            else _concat([s["company"] for s in sketches])
+        ),
+    }
+
+
+def _empty_rows(cols: dict) -> pd.DataFrame:
+    """Data baris kosong berkolom seperti hasil ingestion, untuk histori tanpa transaksi."""
+    df = pd.DataFrame({c: pd.Series(dtype="category") for c in _detail_columns(cols)})
+    df["Tanggal Approved"] = pd.Series(dtype="datetime64[ns]")
+    df["Total Kasbon"] = pd.Series(dtype="int32")
+    if cols["jenis_col"] is not None:
+        df[SEGMENT_COLUMN] = pd.Categorical([], categories=SEGMENTS + [SEGMENT_OTHER])
+    return add_calendar_columns(df)
+
+
+def history_aggregates(state: dict) -> dict:
+    """
+    Agregat seluruh histori {"cells", "partials", "daily", "sketches"}: partisi
+    bulan disambung tanpa regroup (kunci berbeda bulan tidak bertabrakan).
+    """
+    meta = state["meta"]
+    parts = [state["months"][month] for month in sorted(state["months"])]
+    if not parts:
+        return build_aggregates(
+            _empty_rows(meta["cols"]), meta["cols"], precision=meta["sketch_precision"]
+        )
+    return {
+        "cells": _concat([p["cells"] for p in parts]),
+        "partials": _concat([p["partials"] for p in parts]),
+        "daily": {
+            "table": _concat([p["daily"]["table"] for p in parts]),
+            "sketches": _concat_sketches([p["daily"]["sketches"] for p in parts]),
+        },
+        "sketches": _concat_sketches([p["sketches"] for p in parts]),
+    }
+
+
+def analyze_history(state: dict, **options) -> LazyAnalysis:
+    """
+    Hasil semua segmen langsung dari agregat histori, dihitung per segmen saat
+    diminta (options -> LazyAnalysis: distinct, precision, backend).
+    """
+    meta = state["meta"]
+    return LazyAnalysis(
+        history_aggregates(state),
+        meta["cols"],
+        periode_start=pd.Timestamp(meta["periode_start"]) if meta["periode_start"] else None,
+        periode_end=pd.Timestamp(meta["periode_end"]) if meta["periode_end"] else None,
+        **options,
+    )
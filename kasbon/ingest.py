@@ -0,0 +1,603 @@
+"""
+Lapisan ingestion data kasbon.
+
+File upload di-hash (SHA-256) lalu hasil bacaan yang sudah dibersihkan
+disimpan di cache dua tingkat (memori + disk) dengan eviksi LRU, sehingga
+rerun Streamlit tidak perlu mem-parsing ulang workbook yang sama.
+
+Beberapa workbook (mis. satu export per company per bulan) bisa diparsing
+paralel di process pool lalu digabung jadi satu dataset (`load_datasets`,
+`combine_datasets`), dengan nama kolom varian diseragamkan.
+
+Selain .xlsx, export CSV (pyarrow.csv multi-thread) dan Parquet (hanya kolom
+yang dipakai yang dibaca) diterima; format dikenali dari isi file dan semua
+format lewat deteksi kolom & cleaning tanggal yang sama.
+"""
+import csv
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from kasbon.calendar_dim import add_calendar_columns
+from kasbon.profiling import stage
+
+REQUIRED_COLUMNS = ["Tanggal Approved", "Username/ ID User", "Total Kasbon"]
+
+JENIS_CANDIDATES = [
+    "Jenis EWA",
+    "JENIS EWA",
+    "Jenis",
+    "JENIS",
+    "Jenis Transaksi",
+    "Jenis_Kasbon",
+]
+
+# termasuk typo 'Nama Perushaan' yang sering muncul di export
+COMPANY_CANDIDATES = ["Nama Perushaan", "Nama Perusahaan", "Company", "Nama Company"]
+
+NAME_COLUMN = "Nama Karyawan"
+
+# Nama kolom seragam saat beberapa file digabung
+JENIS_COLUMN = JENIS_CANDIDATES[0]
+COMPANY_RENAMES = {"Nama Perushaan": "Nama Perusahaan"}
+# kelompok nama kolom yang isinya sama
+COLUMN_VARIANTS = [set(JENIS_CANDIDATES), {"Nama Perushaan", "Nama Perusahaan"}]
+
+# Jumlah baris per chunk saat streaming xlsx
+READ_CHUNK_ROWS = 50_000
+
+# Format input yang diterima (ekstensi file upload)
+INPUT_TYPES = ["xlsx", "csv", "parquet"]
+# Ukuran blok CSV; tiap blok di-parse di thread terpisah
+CSV_BLOCK_BYTES = 4 * 1024 * 1024
+CSV_DELIMITERS = ",;\t|"
+# format tanggal teks hari-dulu (lokal) yang dicoba kalau bukan ISO 8601
+DAYFIRST_FORMATS = [
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
+    "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d-%m-%Y",
+]
+
+# Kolom segmen hasil split EWA / PPOB (disimpan di cache bersama data)
+SEGMENT_COLUMN = "Segmen"
+SEGMENTS = ["EWA", "PPOB"]
+# jenis selain EWA/PPOB tetap ikut dihitung di Gabungan
+SEGMENT_OTHER = "LAIN"
+
+# Kolom teks berulang yang disimpan sebagai categorical (kode integer)
+CATEGORY_COLUMNS = (
+    ["Username/ ID User", NAME_COLUMN, SEGMENT_COLUMN]
+    + COMPANY_CANDIDATES
+    + JENIS_CANDIDATES
+)
+
+# Naikkan kalau bentuk DataFrame hasil ingestion berubah (invalidasi cache disk)
+CACHE_FORMAT_VERSION = 5
+
+
+class IngestError(Exception):
+    """
+    Error saat membaca / membersihkan file.
+    - level: "error" atau "warning" (menentukan st.error / st.warning di UI)
+    """
+
+    def __init__(self, message: str, level: str = "error"):
+        super().__init__(message)
+        self.level = level
+
+
+def file_hash(data: bytes) -> str:
+    """Hash konten file (SHA-256 hex) sebagai kunci cache."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_column(columns, candidates):
+    """Kembalikan kandidat pertama yang ada di `columns`, atau None."""
+    for c in candidates:
+        if c in columns:
+            return c
+    return None
+
+
+def check_required_columns(columns):
+    """Raise IngestError kalau salah satu kolom wajib tidak ada."""
+    if not all(col in columns for col in REQUIRED_COLUMNS):
+        raise IngestError(
+            "Kolom wajib tidak ditemukan! "
+            f"Pastikan ada kolom: {', '.join(REQUIRED_COLUMNS)}"
+        )
+
+
+def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Validasi kolom wajib, bersihkan tanggal (baris diurutkan menurut tanggal),
+    tambahkan dimensi kalender & Segmen.
+    Raise IngestError kalau data tidak bisa dianalisis.
+    """
+    check_required_columns(df.columns)
+    if df.empty:
+        raise IngestError("File terbaca, tapi tidak ada data di dalamnya.", "warning")
+
+    # Cleaning tanggal
+    df["Tanggal Approved"] = pd.to_datetime(df["Tanggal Approved"], errors="coerce")
+    # urut tanggal: filter rentang tanggal cukup searchsorted (kasbon.filters)
+    df = df[df["Tanggal Approved"].notna()].sort_values(
+        "Tanggal Approved", kind="stable", ignore_index=True
+    )
+
+    if df.empty:
+        raise IngestError(
+            "Semua baris memiliki 'Tanggal Approved' yang tidak valid. "
+            "Cek format tanggal di file Excel.",
+            "warning",
+        )
+
+    add_calendar_columns(df)
+
+    # Split segmen sekali di sini supaya ikut ter-cache
+    jenis_col = find_column(df.columns, JENIS_CANDIDATES)
+    if jenis_col is not None:
+        jenis_upper = df[jenis_col].astype(str).str.upper()
+        df[SEGMENT_COLUMN] = pd.Categorical(
+            jenis_upper.where(jenis_upper.isin(SEGMENTS), SEGMENT_OTHER),
+            categories=SEGMENTS + [SEGMENT_OTHER],
+        )
+
+    return compact_dataframe(df)
+
+
+def compact_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ubah kolom teks berulang jadi categorical dan downcast kolom nominal.
+    Footprint memori sebelum/sesudah dicatat di df.attrs["memory_report"].
+    """
+    before = int(df.memory_usage(deep=True).sum())
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    amount = df["Total Kasbon"]
+    if pd.api.types.is_numeric_dtype(amount) and amount.notna().all():
+        values = amount.to_numpy()
+        # nominal rupiah biasanya bulat; int32 cukup per transaksi (sum tetap int64)
+        if (
+            (values == np.round(values)).all()
+            and values.min() >= np.iinfo(np.int32).min
+            and values.max() <= np.iinfo(np.int32).max
+        ):
+            df["Total Kasbon"] = values.astype(np.int32)
+
+    after = int(df.memory_usage(deep=True).sum())
+    df.attrs["memory_report"] = {"before_bytes": before, "after_bytes": after}
+    return df
+
+
+def resolve_columns(header) -> list:
+    """
+    Dari baris header, tentukan kolom yang benar-benar dipakai dashboard:
+    kolom wajib, kolom jenis, varian nama perusahaan, dan Nama Karyawan.
+    """
+    check_required_columns(header)
+    columns = list(REQUIRED_COLUMNS)
+    jenis_col = find_column(header, JENIS_CANDIDATES)
+    if jenis_col is not None:
+        columns.append(jenis_col)
+    columns += [c for c in COMPANY_CANDIDATES if c in header]
+    if NAME_COLUMN in header:
+        columns.append(NAME_COLUMN)
+    return columns
+
+
+def _coerce_chunk(rows: list, columns: list) -> pd.DataFrame:
+    """Ubah satu chunk baris mentah jadi DataFrame dengan dtype yang sudah rapi."""
+    chunk = pd.DataFrame.from_records(rows, columns=columns)
+    for col in columns:
+        if col == "Tanggal Approved":
+            chunk[col] = pd.to_datetime(chunk[col], errors="coerce")
+        elif col == "Total Kasbon":
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+        else:
+            # ID / nama bisa campuran angka & teks di Excel -> samakan jadi teks
+            values = chunk[col]
+            chunk[col] = values.astype(str).where(values.notna(), None)
+    return chunk
+
+
+def read_xlsx_projected(data: bytes, chunk_size: int = READ_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Baca sheet pertama workbook secara streaming (openpyxl read-only),
+    hanya untuk kolom hasil `resolve_columns`. Konversi dtype per chunk
+    supaya memori puncak mengikuti jumlah kolom yang dipakai, bukan lebar export.
+    """
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        header = next(ws.iter_rows(max_row=1, values_only=True), None)
+        header = list(header) if header else []
+        columns = resolve_columns(header)
+
+        positions = [header.index(c) for c in columns]
+        min_col, max_col = min(positions), max(positions)
+        pick = itemgetter(*[p - min_col for p in positions])
+        width = max_col - min_col + 1
+
+        chunks = []
+        buffer = []
+        for row in ws.iter_rows(
+            min_row=2, min_col=min_col + 1, max_col=max_col + 1, values_only=True
+        ):
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            values = pick(row)
+            if all(v is None for v in values):
+                continue
+            buffer.append(values)
+            if len(buffer) >= chunk_size:
+                chunks.append(_coerce_chunk(buffer, columns))
+                buffer = []
+        if buffer or not chunks:
+            chunks.append(_coerce_chunk(buffer, columns))
+    finally:
+        wb.close()
+
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def detect_format(data: bytes) -> str:
+    """Format file dari magic bytes: "xlsx" (zip), "parquet", selain itu "csv"."""
+    if data[:4] == b"PAR1":
+        return "parquet"
+    if data[:4] == b"PK\x03\x04":
+        return "xlsx"
+    return "csv"
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Tanggal dari teks: ISO 8601 dulu; yang gagal dicoba lagi dengan
+    DAYFIRST_FORMATS (dd/mm/yyyy, format lokal export). Sisanya NaT.
+    """
+    if not pd.api.types.is_object_dtype(values) and not pd.api.types.is_string_dtype(values):
+        dates = pd.to_datetime(values, errors="coerce")
+    else:
+        dates = pd.to_datetime(values, errors="coerce", format="ISO8601")
+        for date_format in DAYFIRST_FORMATS:
+            retry = dates.isna() & values.notna()
+            if not retry.any():
+                break
+            dates[retry] = pd.to_datetime(values[retry], errors="coerce", format=date_format)
+    if getattr(dates.dt, "tz", None) is not None:
+        # samakan dengan xlsx: jam lokal tanpa zona waktu
+        dates = dates.dt.tz_localize(None)
+    return dates
+
+
+def _arrow_to_frame(table: pa.Table, columns: list) -> pd.DataFrame:
+    """Tabel Arrow (CSV / Parquet) -> DataFrame mentah berdtype sama dengan jalur xlsx."""
+    for col in columns:
+        if col in ("Tanggal Approved", "Total Kasbon"):
+            continue
+        values = table[col]
+        if not pa.types.is_string(values.type) and not pa.types.is_large_string(values.type):
+            # ID / nama numerik -> teks, seperti jalur xlsx
+            table = table.set_column(
+                table.schema.get_field_index(col), col, values.cast(pa.string())
+            )
+    df = table.select(columns).to_pandas(date_as_object=False)
+    df["Tanggal Approved"] = _parse_dates(df["Tanggal Approved"])
+    df["Total Kasbon"] = pd.to_numeric(df["Total Kasbon"], errors="coerce")
+    return df
+
+
+def read_csv_projected(data: bytes) -> pd.DataFrame:
+    """
+    Baca CSV dengan pyarrow.csv (multi-thread per blok), hanya kolom hasil
+    `resolve_columns`. Delimiter (koma / titik koma / tab / pipe) ditebak dari header.
+    """
+    first_line = data[:64 * 1024].split(b"\n", 1)[0].decode("utf-8-sig", errors="replace")
+    first_line = first_line.rstrip("\r")
+    delimiter = max(CSV_DELIMITERS, key=first_line.count)
+    header = next(csv.reader([first_line], delimiter=delimiter), [])
+    columns = resolve_columns(header)
+
+    def _read(encoding: str) -> pa.Table:
+        return pa_csv.read_csv(
+            pa.BufferReader(data),
+            read_options=pa_csv.ReadOptions(
+                use_threads=True, block_size=CSV_BLOCK_BYTES, encoding=encoding
+            ),
+            parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=columns,
+                # teks tetap teks (ID ber-nol di depan); nominal ditebak, dibersihkan nanti
+                column_types={c: pa.string() for c in columns if c != "Total Kasbon"},
+                null_values=[""],
+                strings_can_be_null=True,
+            ),
+        )
+
+    try:
+        table = _read("utf8")
+    except pa.ArrowInvalid as e:
+        if "UTF8" not in str(e):
+            raise
+        # CSV hasil "Save as" Excel lama biasanya cp1252/latin-1
+        table = _read("latin-1")
+    return _arrow_to_frame(table, columns)
+
+
+def read_parquet_projected(data: bytes) -> pd.DataFrame:
+    """Baca Parquet, hanya kolom hasil `resolve_columns` (column projection)."""
+    parquet_file = pq.ParquetFile(pa.BufferReader(data))
+    columns = resolve_columns(parquet_file.schema_arrow.names)
+    return _arrow_to_frame(parquet_file.read(columns=columns, use_threads=True), columns)
+
+
+READERS = {
+    "xlsx": read_xlsx_projected,
+    "csv": read_csv_projected,
+    "parquet": read_parquet_projected,
+}
+
+
+def read_kasbon_file(data: bytes) -> pd.DataFrame:
+    """Parsing file (xlsx / csv / parquet) dari bytes (hanya kolom yang dipakai) lalu bersihkan."""
+    file_format = detect_format(data)
+    with stage(f"{file_format}_parse") as record:
+        df = READERS[file_format](data)
+        record["rows"] = len(df)
+    with stage("clean") as record:
+        df = clean_dataframe(df)
+        record["rows"] = len(df)
+    return df
+
+
+class DatasetCache:
+    """
+    Cache DataFrame bersih dengan kunci hash file.
+    - Tingkat memori: OrderedDict LRU, maksimal `max_entries` dataset.
+    - Tingkat disk: file pickle di `cache_dir`, total maksimal `max_disk_bytes`
+      (LRU berdasarkan mtime, di-touch setiap kali dibaca).
+    """
+
+    def __init__(self, max_entries: int = 4, cache_dir: str | None = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.v{CACHE_FORMAT_VERSION}.pkl")
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return self._mem[key]
+
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            df = pd.read_pickle(path)
+            os.utime(path)
+        except (OSError, ValueError, EOFError):
+            return None
+
+        self._put_memory(key, df)
+        return df
+
+    def put(self, key: str, df: pd.DataFrame):
+        self._put_memory(key, df)
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._disk_path(key) + ".tmp"
+            df.to_pickle(tmp_path)
+            os.replace(tmp_path, self._disk_path(key))
+            self._evict_disk()
+        except OSError:
+            # cache disk hanya optimasi, jangan gagalkan analisis
+            pass
+
+    def _put_memory(self, key: str, df: pd.DataFrame):
+        with self._lock:
+            self._mem[key] = df
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            st_ = os.stat(path)
+            entries.append((st_.st_mtime, st_.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+# Cache level proses (dipakai bersama oleh semua rerun / session)
+dataset_cache = DatasetCache(
+    max_entries=int(os.environ.get("KASBON_CACHE_ENTRIES", "4")),
+    cache_dir=os.environ.get(
+        "KASBON_CACHE_DIR", os.path.join(tempfile.gettempdir(), "kasbon_cache")
+    ),
+    max_disk_bytes=int(os.environ.get("KASBON_CACHE_MAX_MB", "512")) * 1024 * 1024,
+)
+
+
+def load_dataset(data: bytes, cache: DatasetCache = dataset_cache):
+    """
+    Entry point ingestion: kembalikan (key, df_bersih).
+    Hanya upload pertama untuk konten yang sama yang membayar biaya parsing.
+    """
+    key = file_hash(data)
+    df = cache.get(key)
+    if df is None:
+        df = read_kasbon_file(data)
+        cache.put(key, df)
+    return key, df
+
+
+def _timed_read(data: bytes):
+    """Worker process: parsing + cleaning satu file, return (df, detik)."""
+    started = time.perf_counter()
+    df = read_kasbon_file(data)
+    return df, time.perf_counter() - started
+
+
+def ingest_workers() -> int:
+    """Jumlah worker parsing multi-file (env KASBON_INGEST_WORKERS, default jumlah CPU, max 4)."""
+    default = min(4, os.cpu_count() or 1)
+    return int(os.environ.get("KASBON_INGEST_WORKERS", default))
+
+
+def create_ingest_pool(workers: int = None):
+    """
+    Process pool parsing workbook (openpyxl terikat GIL, jadi thread tidak cukup);
+    None kalau cukup 1 worker. Konteks 'spawn' seperti pool chart.
+    """
+    workers = ingest_workers() if workers is None else workers
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def load_datasets(files: list, executor=None, cache: DatasetCache = dataset_cache) -> list:
+    """
+    Ingestion banyak file sekaligus. files: [(nama, bytes)].
+    File yang belum ada di cache diparsing paralel di `executor` (serial kalau None).
+    Return list entri {name, key, df, rows, seconds, cached, error}, urut sesuai input;
+    file yang gagal dibaca punya df None dan `error` berisi IngestError.
+    """
+    entries = []
+    pending = {}
+    for name, data in files:
+        key = file_hash(data)
+        entry = {"name": name, "key": key, "df": cache.get(key), "rows": 0,
+                 "seconds": 0.0, "cached": False, "error": None}
+        entries.append(entry)
+        if entry["df"] is not None:
+            entry["cached"] = True
+        elif executor is not None:
+            pending[len(entries) - 1] = executor.submit(_timed_read, data)
+        else:
+            pending[len(entries) - 1] = data
+
+    for i, job in pending.items():
+        entry = entries[i]
+        try:
+            if isinstance(job, bytes):
+                entry["df"], entry["seconds"] = _timed_read(job)
+            else:
+                entry["df"], entry["seconds"] = job.result()
+        except IngestError as e:
+            entry["error"] = e
+            continue
+        except Exception as e:
+            # file rusak / format tidak dikenal: lewati file ini saja
+            entry["error"] = IngestError(f"File tidak bisa dibaca ({type(e).__name__}: {e})")
+            continue
+        cache.put(entry["key"], entry["df"])
+
+    for entry in entries:
+        if entry["df"] is not None:
+            entry["rows"] = len(entry["df"])
+    return entries
+
+
+def reconcile_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Seragamkan nama kolom varian: kandidat jenis -> JENIS_COLUMN, typo
+    'Nama Perushaan' -> 'Nama Perusahaan'. Varian yang tidak terpakai
+    (jenis kedua, typo padahal nama benar juga ada) dibuang.
+    """
+    jenis_col = find_column(df.columns, JENIS_CANDIDATES)
+    renames = dict(COMPANY_RENAMES)
+    if jenis_col is not None:
+        renames[jenis_col] = JENIS_COLUMN
+    drop = [c for c in JENIS_CANDIDATES if c in df.columns and c != jenis_col]
+    drop += [old for old, new in COMPANY_RENAMES.items() if old in df.columns and new in df.columns]
+    df = df.drop(columns=drop)
+    return df.rename(columns={old: new for old, new in renames.items() if old in df.columns})
+
+
+def match_columns(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Ganti nama kolom varian di `df` supaya cocok dengan `columns` (mis. skema histori)."""
+    renames = {}
+    for family in COLUMN_VARIANTS:
+        wanted = [c for c in columns if c in family and c not in df.columns]
+        present = [c for c in df.columns if c in family and c not in columns]
+        if wanted and present:
+            renames[present[0]] = wanted[0]
+    return df.rename(columns=renames)
+
+
+def combine_datasets(entries: list, cache: DatasetCache = dataset_cache):
+    """
+    Gabungkan entri `load_datasets` yang berhasil jadi satu dataset bersih:
+    kolom diseragamkan, baris diurutkan ulang menurut tanggal, lalu di-compact
+    lagi (kategori antar file bisa beda). Hasil ikut di-cache. Return (key, df).
+    """
+    loaded = [entry for entry in entries if entry["df"] is not None]
+    if not loaded:
+        raise IngestError("Tidak ada file yang berhasil dibaca.")
+    if len(loaded) == 1:
+        return loaded[0]["key"], loaded[0]["df"]
+
+    # kunci dataset gabungan: tidak bergantung urutan upload
+    key = file_hash("\n".join(sorted(entry["key"] for entry in loaded)).encode())
+    df = cache.get(key)
+    if df is not None:
+        return key, df
+
+    frames = [reconcile_columns(entry["df"]) for entry in loaded]
+    df = pd.concat(frames, ignore_index=True).sort_values(
+        "Tanggal Approved", kind="stable", ignore_index=True
+    )
+    if SEGMENT_COLUMN in df.columns:
+        # file tanpa kolom jenis -> segmen LAIN (tetap ikut Gabungan)
+        df[SEGMENT_COLUMN] = pd.Categorical(
+            df[SEGMENT_COLUMN].astype(object).fillna(SEGMENT_OTHER),
+            categories=SEGMENTS + [SEGMENT_OTHER],
+        )
+    df = compact_dataframe(df)
+    df.attrs["memory_report"] = {
+        "before_bytes": sum(
+            entry["df"].attrs.get("memory_report", {}).get("before_bytes", 0)
+            for entry in loaded
+        ),
+        "after_bytes": df.attrs["memory_report"]["after_bytes"],
+    }
+    cache.put(key, df)
+    return key, df
@@ -0,0 +1,116 @@
+"""
+Instrumentasi per tahap: wall time, delta peak RSS, jumlah baris.
+
+Kode library cukup membungkus tahapnya dengan `stage()`; kalau tidak ada
+Profiler aktif (lihat `activate`), `stage()` tidak melakukan apa-apa selain
+log. Setiap tahap yang selesai juga ditulis sebagai satu baris JSON ke logger
+"kasbon.perf" (stderr), supaya bisa di-scrape.
+
+Stage bersarang diberi nama berjenjang, mis. "ingest/clean".
+Peak RSS berasal dari getrusage (high-water mark level proses), jadi delta
+hanya > 0 kalau tahap itu menaikkan puncak memori proses.
+"""
+import contextvars
+import json
+import logging
+import os
+import resource
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger("kasbon.perf")
+
+_profiler = contextvars.ContextVar("kasbon_profiler", default=None)
+_path = contextvars.ContextVar("kasbon_stage_path", default=())
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss dalam KB di Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Profiler:
+    """Kumpulan record tahap untuk satu run (satu rerun Streamlit, satu file CLI)."""
+
+    def __init__(self, run_id: str = None):
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, record: dict):
+        with self._lock:
+            self.records.append(record)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return list(self.records)
+
+
+@contextmanager
+def activate(profiler: Profiler):
+    """Jadikan `profiler` tujuan semua stage() di context ini."""
+    token = _profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _profiler.reset(token)
+
+
+def current_profiler():
+    return _profiler.get()
+
+
+@contextmanager
+def stage(name: str, rows: int = None):
+    """
+    Ukur satu tahap. Yield dict record; `rows` bisa diisi belakangan:
+        with stage("clean") as rec:
+            df = ...
+            rec["rows"] = len(df)
+    """
+    path = _path.get() + (name,)
+    token = _path.set(path)
+    record = {"stage": "/".join(path), "rows": rows}
+    rss_before = _peak_rss_mb()
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        _path.reset(token)
+        record["seconds"] = round(time.perf_counter() - started, 4)
+        record["rss_peak_delta_mb"] = round(_peak_rss_mb() - rss_before, 1)
+        profiler = _profiler.get()
+        if profiler is not None:
+            profiler.add(record)
+        _log(record, profiler)
+
+
+def _log(record: dict, profiler):
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    line = {
+        "event": "kasbon.stage",
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "run_id": profiler.run_id if profiler is not None else None,
+        **record,
+    }
+    logger.info(json.dumps(line, ensure_ascii=False, default=str))
+
+
+def configure_logging():
+    """
+    Pasang handler stderr (satu baris JSON per record) untuk logger kasbon.perf.
+    Dimatikan dengan env KASBON_PERF_LOG=0.
+    """
+    if os.environ.get("KASBON_PERF_LOG", "1") == "0":
+        logger.setLevel(logging.WARNING)
+        return
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
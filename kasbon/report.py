@@ -0,0 +1,316 @@
+"""
+Builder laporan PDF (FPDF) dari hasil agregasi segmen.
+
+Tidak bergantung pada Streamlit: input berupa dict `results` per segmen dan
+bytes PNG chart, sehingga bisa dijalankan sebagai background job di app
+maupun dari CLI.
+"""
+import contextvars
+import io
+import threading
+from concurrent.futures import Executor
+
+import pandas as pd
+from fpdf import FPDF
+
+from kasbon.formatting import format_rupiah
+from kasbon.profiling import stage
+
+REPORT_FILE_NAME = "Laporan_Analitik_Lengkap.pdf"
+
+# chart segmen Gabungan yang dimuat di PDF
+REPORT_CHART_KEYS = ("chart1", "chart1b", "chart3")
+
+
+# Sanitize text agar aman untuk FPDF (latin-1)
+def pdf_safe(text: str) -> str:
+    if not isinstance(text, str):
+        text = str(text)
+    # ganti karakter "aneh" yang sering bikin error
+    text = (
+        text.replace("–", "-")
+            .replace("—", "-")
+            .replace("•", "-")
+    )
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+
+class PDF(FPDF):
+    def header(self):
+        self.set_font("Arial", "B", 16)
+        self.cell(
+            0,
+            10,
+            pdf_safe("Laporan Analitik Kasbon"),
+            0,
+            1,
+            "C",
+        )
+        self.set_font("Arial", "I", 10)
+        self.cell(
+            0,
+            10,
+            pdf_safe("Generated by Dashboard Analitik Kasbon"),
+            0,
+            1,
+            "C",
+        )
+        self.line(10, 30, 200, 30)
+        self.ln(10)
+
+    def chapter_title(self, title: str):
+        self.set_font("Arial", "B", 14)
+        self.set_fill_color(230, 230, 230)
+        self.cell(0, 10, pdf_safe(title), 0, 1, "L", 1)
+        self.ln(4)
+
+    def chapter_body(self, body: str):
+        self.set_font("Arial", "", 11)
+        self.multi_cell(0, 6, pdf_safe(body))
+        self.ln()
+
+
+def _image(images: dict, key: str):
+    data = images.get(key)
+    return io.BytesIO(data) if data else None
+
+
+def _no_progress(fraction: float, message: str):
+    pass
+
+
+def build_report(results_all: dict, results_ewa: dict = None, results_ppob: dict = None,
+                 images: dict = None, progress=_no_progress, company: str = None) -> bytes:
+    """
+    Susun laporan PDF (berbasis gabungan + ringkasan per jenis).
+    - images: {"chart1": png, "chart1b": png, "chart3": png} segmen Gabungan
+    - progress: callback(fraction 0..1, pesan)
+    - company: nama perusahaan kalau laporan ini khusus satu company
+    Return bytes PDF.
+    """
+    with stage("pdf") as record:
+        pdf_bytes = _render_report(
+            results_all, results_ewa, results_ppob, images, progress, company
+        )
+        record["rows"] = results_all.get("total_trx")
+    return pdf_bytes
+
+
+def _render_report(results_all: dict, results_ewa, results_ppob, images, progress,
+                   company=None) -> bytes:
+    images = images or {}
+    pdf = PDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    # -----------------------------
+    # Ambil data utama (Gabungan)
+    # -----------------------------
+    total_kasbon = results_all["total_kasbon"]
+    total_trx = results_all["total_trx"]
+    total_user = results_all["total_user"]
+    avg_ticket = results_all["avg_ticket"]
+    max_ticket = results_all["max_ticket"]
+    monthly_stats = results_all["monthly_stats"]
+    chart1_all = _image(images, "chart1")
+    chart1b_all = _image(images, "chart1b")
+    chart3_all = _image(images, "chart3")
+    weekend_amount_all = results_all["weekend_amount"]
+    weekend_amount_pct_all = results_all["weekend_amount_pct"]
+    weekend_trx_pct_all = results_all["weekend_trx_pct"]
+
+    # Periode data
+    periode_start = results_all.get("periode_start")
+    periode_end = results_all.get("periode_end")
+    if pd.notna(periode_start) and pd.notna(periode_end):
+        periode_str = f"{periode_start:%d %b %Y} - {periode_end:%d %b %Y}"
+    else:
+        periode_str = "Tidak diketahui"
+
+    # -----------------------------
+    # 1. RINGKASAN EKSEKUTIF
+    # -----------------------------
+    progress(0.1, "Menyusun ringkasan eksekutif...")
+    if monthly_stats is not None and not monthly_stats.empty:
+        bulan_max = monthly_stats.loc[monthly_stats["sum"].idxmax()]
+    else:
+        bulan_max = None
+
+    # MoM growth (kalau minimal ada 2 bulan)
+    mom_text = ""
+    if monthly_stats is not None and len(monthly_stats) >= 2:
+        last = monthly_stats.iloc[-2]
+        current = monthly_stats.iloc[-1]
+        if last["sum"] > 0:
+            mom_pct = (current["sum"] - last["sum"]) / last["sum"] * 100
+            arah = "naik" if mom_pct >= 0 else "turun"
+            mom_text = (
+                f"Dibanding bulan sebelumnya, total kasbon {arah} "
+                f"{abs(mom_pct):.1f}%."
+            )
+
+    ringkasan_lines = [f"Perusahaan: {company}."] if company else []
+    ringkasan_lines += [
+        f"Periode data: {periode_str}.",
+        f"Total kasbon (gabungan EWA+PPOB): {format_rupiah(total_kasbon)} "
+        f"dari {total_trx} transaksi oleh {total_user} user unik.",
+        f"Rata-rata ticket size: {format_rupiah(avg_ticket)} | "
+        f"Ticket terbesar: {format_rupiah(max_ticket)}.",
+    ]
+    if bulan_max is not None:
+        ringkasan_lines.append(
+            f"Bulan dengan pencairan tertinggi: {bulan_max['Bulan_Str']} "
+            f"sebesar {format_rupiah(bulan_max['sum'])} "
+            f"dari {bulan_max['count']} transaksi."
+        )
+    if mom_text:
+        ringkasan_lines.append(mom_text)
+    ringkasan_lines.append(
+        "Kontribusi akhir pekan (Sabtu-Minggu, gabungan): "
+        f"{format_rupiah(weekend_amount_all)} "
+        f"({weekend_amount_pct_all:.1f}% dari nominal, "
+        f"{weekend_trx_pct_all:.1f}% dari jumlah transaksi)."
+    )
+
+    # Ringkasan per jenis (Gabungan, EWA, PPOB)
+    jenis_lines = []
+    for res in [results_all, results_ewa, results_ppob]:
+        if not res:
+            continue
+        if not res.get("has_data", False):
+            continue
+        name = res["name"]
+        tot = format_rupiah(res["total_kasbon"])
+        trx = res["total_trx"]
+        wu = res["weekend_amount_pct"]
+        wt = res["weekend_trx_pct"]
+        jenis_lines.append(
+            f"- {name}: {tot} ({trx} trx, weekend {wu:.1f}% nominal / {wt:.1f}% trx)"
+        )
+    if jenis_lines:
+        ringkasan_lines.append(
+            "Ringkasan per jenis (Gabungan, EWA, PPOB):\n"
+            + "\n".join(jenis_lines)
+        )
+
+    pdf.chapter_title("1. Ringkasan Eksekutif & Perbandingan Jenis")
+    pdf.chapter_body("\n".join(ringkasan_lines))
+
+    # -----------------------------
+    # 2. TREN BULANAN (GABUNGAN)
+    # -----------------------------
+    progress(0.35, "Menambahkan grafik tren bulanan...")
+    pdf.chapter_title("2. Tren Keuangan Bulanan - Gabungan (EWA+PPOB)")
+    if chart1_all is not None:
+        pdf.image(chart1_all, w=180)
+        pdf.ln(5)
+    pdf.chapter_body(
+        "Grafik di atas menunjukkan perkembangan total nominal kasbon "
+        "dan jumlah transaksi per bulan untuk gabungan EWA+PPOB. "
+        "Pimpinan dapat memonitor pertumbuhan penggunaan kasbon dan "
+        "mengidentifikasi bulan dengan lonjakan signifikan."
+    )
+    # --- 2.a Tren User & Company Unik per Bulan (Gabungan) ---
+    progress(0.55, "Menambahkan grafik user & company unik...")
+    pdf.chapter_title("2.a Tren User & Company Unik per Bulan - Gabungan")
+    if chart1b_all is not None:
+        pdf.image(chart1b_all, w=180)
+        pdf.ln(5)
+
+    pdf.chapter_body(
+        "Grafik ini menunjukkan perkembangan jumlah user unik dan company unik "
+        "yang aktif menggunakan kasbon per bulan. Tren kenaikan mengindikasikan "
+        "adopsi yang semakin luas, baik dari sisi karyawan maupun perusahaan."
+    )
+
+    # -----------------------------
+    # 3. TOP 10 PALING BOROS
+    # -----------------------------
+    progress(0.75, "Menambahkan Top 10 karyawan...")
+    pdf.chapter_title("3. Top Amount 10 Karyawan - Gabungan")
+    if chart3_all is not None:
+        pdf.image(chart3_all, w=180)
+        pdf.ln(5)
+    pdf.chapter_body(
+        "Grafik di atas menunjukkan 10 karyawan dengan total "
+        "pencairan kasbon tertinggi. Informasi ini membantu manajemen "
+        "mengidentifikasi pengguna kasbon terbesar dan potensi risiko."
+    )
+
+
+    progress(0.9, "Menulis file PDF...")
+    pdf_bytes = bytes(pdf.output())
+    progress(1.0, "PDF selesai.")
+    return pdf_bytes
+
+
+class ReportJob:
+    """Status satu job pembuatan PDF yang berjalan di background."""
+
+    def __init__(self):
+        self.progress = 0.0
+        self.message = "Menunggu antrian..."
+        self.future = None
+        self._lock = threading.Lock()
+
+    def update(self, fraction: float, message: str):
+        with self._lock:
+            self.progress = fraction
+            self.message = message
+
+    def status(self):
+        with self._lock:
+            return self.progress, self.message
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def result(self) -> bytes:
+        return self.future.result()
+
+
+def report_images(results_all: dict, images: dict = None, chart_executor=None) -> dict:
+    """
+    PNG chart untuk PDF. Chart yang belum ada (mis. dashboard memakai backend
+    Altair di browser) dirender dengan matplotlib sekarang.
+    """
+    # import di sini: matplotlib hanya dimuat kalau PDF memang butuh gambar
+    from kasbon.charts import segment_chart_jobs
+
+    images = {key: png for key, png in (images or {}).items() if png}
+    jobs = {
+        key: job for key, job in segment_chart_jobs(results_all).items()
+        if key in REPORT_CHART_KEYS and key not in images
+    }
+    if not jobs:
+        return images
+
+    with stage("pdf_charts"):
+        if chart_executor is None:
+            images.update({key: fn(*args) for key, (_, fn, args) in jobs.items()})
+        else:
+            futures = {
+                key: chart_executor.submit(fn, *args) for key, (_, fn, args) in jobs.items()
+            }
+            images.update({key: future.result() for key, future in futures.items()})
+    return images
+
+
+def start_report_job(executor: Executor, results_all: dict, results_ewa: dict = None,
+                     results_ppob: dict = None, images: dict = None,
+                     chart_executor=None) -> ReportJob:
+    """
+    Jalankan build_report di executor; progress bisa dipantau dari ReportJob.
+    Chart PDF yang tidak ada di `images` dirender dulu di dalam job
+    (di `chart_executor` kalau ada).
+    """
+    job = ReportJob()
+
+    def _run():
+        job.update(0.0, "Menyiapkan gambar chart...")
+        pngs = report_images(results_all, images, chart_executor)
+        return build_report(results_all, results_ewa, results_ppob, pngs, job.update)
+
+    # salin context supaya stage() di thread job tercatat ke profiler pemanggil
+    job.future = executor.submit(contextvars.copy_context().run, _run)
+    return job
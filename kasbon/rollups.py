@@ -0,0 +1,98 @@
+"""
+Rollup waktu harian, mingguan (ISO), dan bulanan per segmen.
+
+Sumbernya tabel harian kecil per (segmen, tanggal) yang dibangun terpisah dari
+parsial (kasbon.analytics.build_daily). Level yang lebih kasar diturunkan dari
+level harian:
+- sum / count : tabel harian dijumlahkan per minggu / bulan
+- unik        : register sketch HLL per hari di-merge (max) per minggu / bulan;
+                presisinya ROLLUP_PRECISION, terpisah dari pilihan distinct dashboard
+
+Ketiga level dihitung sekaligus, jadi pilihan granularitas di dashboard
+hanya memilih tabel yang sudah ada.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from kasbon.calendar_dim import (
+    DAY_KEY,
+    MONTH_KEY,
+    WEEK_KEY,
+    day_labels,
+    month_labels,
+    month_of,
+    week_labels,
+    week_of,
+)
+from kasbon.sketch import HLL_PRECISION, estimate
+
+ROLLUP_DAY = "Harian"
+ROLLUP_WEEK = "Mingguan"
+ROLLUP_MONTH = "Bulanan"
+ROLLUP_LEVELS = [ROLLUP_DAY, ROLLUP_WEEK, ROLLUP_MONTH]
+
+# presisi sketch harian (satu sketch per segmen × tanggal); tabel register jarang,
+# jadi hari sepi tetap kecil berapa pun presisinya
+ROLLUP_PRECISION = int(os.environ.get("KASBON_ROLLUP_PRECISION", str(HLL_PRECISION)))
+
+# level -> (kolom kunci, fungsi kunci dari Tanggal_Key, label, awal periode)
+_LEVELS = {
+    ROLLUP_DAY: (DAY_KEY, None, day_labels, lambda keys: np.asarray(keys, dtype="datetime64[D]")),
+    ROLLUP_WEEK: (WEEK_KEY, week_of, week_labels, lambda keys: np.asarray(keys, dtype="datetime64[D]")),
+    ROLLUP_MONTH: (MONTH_KEY, month_of, month_labels, lambda keys: np.asarray(keys, dtype="datetime64[M]")),
+}
+
+
+def _with_level(frame: pd.DataFrame, level: str) -> pd.DataFrame:
+    """Tambahkan kolom kunci level (dari Tanggal_Key) ke tabel berkunci harian."""
+    key, derive, _, _ = _LEVELS[level]
+    return frame if derive is None else frame.assign(**{key: derive(frame[DAY_KEY].to_numpy())})
+
+
+def build_rollups(daily: pd.DataFrame, distinct: dict, sketches: dict) -> dict:
+    """
+    {level: tabel} untuk ROLLUP_LEVELS; tiap tabel: Periode, Mulai, sum, count,
+    lalu satu kolom per entri `distinct`, urut kronologis.
+    - daily: kolom Tanggal_Key, sum, count (satu baris per hari)
+    - distinct: {nama kolom hasil: nama sketch di `sketches`} (tabel sketch
+      berkolom Tanggal_Key)
+    """
+    rollups = {}
+    for level in ROLLUP_LEVELS:
+        key, _, labels, starts = _LEVELS[level]
+        stats = (
+            _with_level(daily, level)
+            .groupby(key, sort=True)[["sum", "count"]]
+            .sum()
+        )
+        keys = stats.index.to_numpy()
+        table = pd.DataFrame({
+            "Periode": labels(keys),
+            "Mulai": pd.DatetimeIndex(starts(keys).astype("datetime64[ns]")),
+            "sum": stats["sum"].to_numpy(),
+            "count": stats["count"].to_numpy(),
+        })
+        for name, source in distinct.items():
+            sketch = _with_level(sketches[source], level)
+            counts = estimate(sketch, by=key, precision=sketches["precision"])
+            table[name] = counts.reindex(keys, fill_value=0).to_numpy()
+        rollups[level] = table
+    return rollups
+
+
+def monthly_rollup(monthly_stats: pd.DataFrame, monthly_uc: pd.DataFrame, months) -> dict:
+    """Rollup level bulanan saja, dari tren bulanan yang sudah ada (tanpa tabel harian)."""
+    table = pd.DataFrame({
+        "Periode": monthly_stats["Bulan_Str"].to_numpy(),
+        "Mulai": pd.DatetimeIndex(
+            np.asarray(months, dtype="datetime64[M]").astype("datetime64[ns]")
+        ),
+        "sum": monthly_stats["sum"].to_numpy(),
+        "count": monthly_stats["count"].to_numpy(),
+    })
+    for name in monthly_uc.columns.drop("Bulan_Str"):
+        table[name] = monthly_uc[name].to_numpy()
+    return {ROLLUP_MONTH: table}
+
@@ -0,0 +1,157 @@
+"""
+Cache komputasi bersama satu proses server (semua session Streamlit).
+
+Beberapa user sering membuka export yang sama; cube agregat, results per
+segmen, dan PNG chart untuk dataset + opsi analisis yang sama cukup dihitung
+sekali per server. Kunci = tuple (jenis, hash dataset / view key, ...).
+
+- Batas memori: ukuran tiap nilai diestimasi saat disimpan; kalau total
+  melebihi `max_bytes`, entri paling lama tidak dipakai (LRU) dibuang.
+- TTL: entri lebih tua dari `ttl_seconds` sejak disimpan dianggap kedaluwarsa.
+- `get_or_compute`: miss bersamaan untuk kunci yang sama dihitung sekali,
+  pemanggil lain menunggu hasilnya.
+- Counter hit/miss/eviksi per jenis kunci (`stats()`).
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+import pyarrow as pa
+
+_MISSING = object()
+
+
+def estimate_size(value) -> int:
+    """Estimasi ukuran (bytes) nilai cache: bytes, tabel, dict results, cube."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, pa.Table):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+
+def _kind(key) -> str:
+    return key[0] if isinstance(key, tuple) and key else "other"
+
+
+class SharedCache:
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # kunci -> (nilai, ukuran, waktu simpan)
+        self._bytes = 0
+        self._pending = {}             # kunci -> Future (sedang dihitung)
+        self._counts = Counter()       # (jenis, event) -> jumlah
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Nilai untuk `key` (dihitung sebagai hit/miss), atau `default`."""
+        with self._lock:
+            value = self._lookup(key)
+            self._counts[_kind(key), "misses" if value is _MISSING else "hits"] += 1
+        return default if value is _MISSING else value
+
+    def put(self, key, value):
+        """Simpan nilai; nilai yang lebih besar dari seluruh batas tidak disimpan."""
+        size = estimate_size(value)
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, _ = next(iter(self._entries.items()))
+                self._discard(old_key)
+                self._counts[_kind(old_key), "evictions"] += 1
+
+    def get_or_compute(self, key, compute):
+        """Nilai dari cache, atau hasil `compute()` (sekali per kunci walau dipanggil bersamaan)."""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self._counts[_kind(key), "hits"] += 1
+                return value
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+                self._counts[_kind(key), "misses"] += 1
+            else:
+                self._counts[_kind(key), "hits"] += 1
+        if not owner:
+            return pending.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        self.put(key, value)
+        with self._lock:
+            del self._pending[key]
+        pending.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Ringkasan: jumlah entri, bytes terpakai, dan counter per jenis kunci."""
+        with self._lock:
+            kinds = {}
+            for (kind, event), count in self._counts.items():
+                kinds.setdefault(kind, Counter())[event] = count
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "kinds": {kind: dict(counts) for kind, counts in sorted(kinds.items())},
+            }
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, _, stored = entry
+        if self.ttl_seconds and time.monotonic() - stored > self.ttl_seconds:
+            self._discard(key)
+            self._counts[_kind(key), "expired"] += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+def shared_cache_limits() -> dict:
+    """Batas cache dari env: KASBON_SHARED_CACHE_MB, KASBON_SHARED_CACHE_TTL (detik, 0 = tanpa TTL)."""
+    return {
+        "max_bytes": int(os.environ.get("KASBON_SHARED_CACHE_MB", "512")) * 1024 * 1024,
+        "ttl_seconds": float(os.environ.get("KASBON_SHARED_CACHE_TTL", "3600")),
+    }
+
+
+# satu instance per proses server, dipakai semua session
+compute_cache = SharedCache(**shared_cache_limits())
@@ -0,0 +1,144 @@
+"""
+Distinct count aproksimasi (HyperLogLog) untuk user & company unik.
+
+Sketch disimpan sebagai tabel register jarang: satu baris per
+(kunci grup..., reg) dengan `rho` maksimum. Dua sketch digabung cukup dengan
+concat + max per register, jadi sketch bisa di-merge lintas segmen, bulan,
+maupun file tanpa menyimpan himpunan user-nya.
+
+Presisi p -> 2^p register, standard error relatif ~ 1.04 / sqrt(2^p).
+Sketch dibangun langsung dari data baris per potongan (tanpa tabel per user)
+dan disimpan di presisi SKETCH_PRECISION; presisi lebih rendah diturunkan
+dengan `fold` (hasilnya sama persis dengan membangun ulang di presisi itu).
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+HLL_PRECISION = int(os.environ.get("KASBON_HLL_PRECISION", "12"))
+PRECISION_CHOICES = [10, 12, 14, 16]
+# presisi sketch yang disimpan (cube, histori); pilihan di bawahnya lewat fold
+SKETCH_PRECISION = int(os.environ.get("KASBON_SKETCH_PRECISION", str(max(PRECISION_CHOICES))))
+# baris data per potongan saat membangun sketch (batas memori hash + groupby)
+CHUNK_ROWS = 256 * 1024
+
+REGISTER = "reg"
+RHO = "rho"
+
+
+def relative_error(precision: int) -> float:
+    """Standard error relatif HLL untuk presisi p."""
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Bit length uint64 per elemen (0 untuk 0), tepat tanpa pembulatan float."""
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    # frexp(x)[1] == bit length untuk bilangan bulat < 2^53
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+def _hashes(values: pd.Series):
+    """(hash uint64 per baris, mask nilai tidak kosong); categorical di-hash per kategori."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        per_category = pd.util.hash_pandas_object(
+            pd.Series(values.cat.categories), index=False
+        ).to_numpy()
+        mask = codes >= 0
+        return per_category[np.where(mask, codes, 0)], mask
+    mask = values.notna().to_numpy()
+    hashes = np.zeros(len(values), dtype=np.uint64)
+    hashes[mask] = pd.util.hash_pandas_object(values[mask], index=False).to_numpy()
+    return hashes, mask
+
+
+def _registers(hashes: np.ndarray, precision: int):
+    """(reg, rho) per hash."""
+    reg = (hashes >> np.uint64(64 - precision)).astype(np.uint16)
+    rest = hashes << np.uint64(precision)
+    # posisi bit 1 pertama pada sisa hash (1-based), maksimum 64 - p + 1
+    rho = (64 - _bit_length(rest) + 1).clip(max=64 - precision + 1).astype(np.uint8)
+    return reg, rho
+
+
+def register_table(values: pd.Series, keys: list, precision: int = HLL_PRECISION,
+                   chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Sketch HLL untuk `values`, per kombinasi `keys` (list Series sejajar values).
+    Nilai kosong diabaikan, sama seperti nunique. Baris diproses per
+    `chunk_rows`; register tiap potongan langsung di-merge.
+    """
+    hashes, mask = _hashes(values)
+    names = [key.name for key in keys]
+    table = None
+    for start in range(0, max(len(values), 1), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        keep = mask[rows]
+        reg, rho = _registers(hashes[rows][keep], precision)
+        # kolom kunci tetap dtype aslinya (categorical tidak jadi object)
+        frame = pd.DataFrame({key.name: key.iloc[rows][keep].reset_index(drop=True) for key in keys})
+        frame[REGISTER] = reg
+        frame[RHO] = rho
+        frames = [frame] if table is None else [table, frame]
+        table = merge_registers(frames, names)
+    return table
+
+
+def fold(table: pd.DataFrame, keys: list, precision: int, target: int) -> pd.DataFrame:
+    """
+    Turunkan sketch presisi `precision` ke `target` (<= precision): register
+    baru = `target` bit teratas, rho dihitung ulang dari bit yang tergeser.
+    """
+    if target >= precision:
+        return table
+    shift = precision - target
+    reg = table[REGISTER].to_numpy()
+    low = (reg & ((1 << shift) - 1)).astype(np.uint64)
+    rho = np.where(
+        low != 0,
+        shift - _bit_length(low) + 1,
+        shift + table[RHO].to_numpy().astype(np.int64),
+    )
+    frame = table[keys].assign(**{
+        REGISTER: (reg >> shift).astype(np.uint16),
+        RHO: rho.astype(np.uint8),
+    })
+    return merge_registers([frame], keys)
+
+
+def merge_registers(frames: list, keys: list) -> pd.DataFrame:
+    """Gabungkan beberapa sketch (register yang sama -> rho maksimum)."""
+    combined = pd.concat(frames, ignore_index=True)
+    return (
+        combined.groupby(keys + [REGISTER], observed=True, sort=False)[RHO]
+        .max()
+        .reset_index()
+    )
+
+
+def estimate(table: pd.DataFrame, by=None, precision: int = HLL_PRECISION) -> pd.Series:
+    """
+    Estimasi distinct count dari sketch. Dengan `by`, satu estimasi per nilai
+    kolom itu (register grup lain ikut di-merge); tanpa `by`, satu angka total.
+    """
+    m = 1 << precision
+    if by is None:
+        codes, groups = np.zeros(len(table), dtype=np.intp), pd.Index([0])
+    else:
+        codes, groups = pd.factorize(table[by], sort=True)
+
+    registers = np.zeros((len(groups), m), dtype=np.uint8)
+    np.maximum.at(registers, (codes, table[REGISTER].to_numpy()), table[RHO].to_numpy())
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.exp2(-registers.astype(np.float64)).sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    # koreksi rentang kecil (linear counting)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    result = pd.Series(np.where(small, linear, raw).round().astype(np.int64), index=groups)
+    return result if by is not None else result.iloc[0]
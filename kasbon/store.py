@@ -0,0 +1,110 @@
+"""
+Penyimpanan dataset bersih antar session dalam format Arrow IPC (Feather v2).
+
+File ditulis tanpa kompresi supaya bisa dibuka ulang lewat memory map:
+kolom numerik/tanggal dan teks (string[pyarrow]) langsung menunjuk ke
+halaman file, sehingga beberapa dashboard atas data yang sama berbagi
+page cache OS alih-alih masing-masing memegang salinan sendiri.
+"""
+import os
+import re
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+DATA_DIR = os.environ.get("KASBON_DATA_DIR", "data")
+
+DATASET_EXT = ".arrow"
+
+# metadata schema: hash file asal (kunci cache ingestion)
+_KEY_METADATA = b"kasbon.key"
+
+_STRING_TYPES = {
+    pa.string(): pd.StringDtype("pyarrow"),
+    pa.large_string(): pd.StringDtype("pyarrow"),
+}
+
+# dataset yang sudah dibuka dipakai bersama oleh semua session di proses ini
+_opened = {}
+_opened_lock = threading.Lock()
+
+
+def dataset_name(text: str) -> str:
+    """Normalisasi nama dataset jadi nama file yang aman."""
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", text).strip("._")
+    return name or "dataset"
+
+
+def dataset_path(name: str, data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, dataset_name(name) + DATASET_EXT)
+
+
+def list_datasets(data_dir: str = DATA_DIR) -> list:
+    """Nama dataset tersimpan, terbaru di depan."""
+    if not os.path.isdir(data_dir):
+        return []
+    entries = [
+        (os.path.getmtime(os.path.join(data_dir, f)), f[: -len(DATASET_EXT)])
+        for f in os.listdir(data_dir)
+        if f.endswith(DATASET_EXT)
+    ]
+    return [name for _, name in sorted(entries, reverse=True)]
+
+
+def stored_key(name: str, data_dir: str = DATA_DIR):
+    """Baca hash dataset dari metadata file (tanpa membaca datanya)."""
+    path = dataset_path(name, data_dir)
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    key = metadata.get(_KEY_METADATA)
+    return key.decode() if key else None
+
+
+def save_dataset(df: pd.DataFrame, name: str, key: str, data_dir: str = DATA_DIR) -> str:
+    """
+    Simpan DataFrame bersih ke <data_dir>/<name>.arrow (tanpa kompresi).
+    Kalau file dengan hash yang sama sudah ada, tidak ditulis ulang.
+    """
+    path = dataset_path(name, data_dir)
+    if stored_key(name, data_dir) == key:
+        return path
+
+    os.makedirs(data_dir, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_KEY_METADATA] = key.encode()
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = path + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def open_dataset(name: str, data_dir: str = DATA_DIR):
+    """
+    Buka dataset tersimpan lewat memory map, kembalikan (key, df).
+    DataFrame yang sama dipakai ulang selama file tidak berubah.
+    """
+    path = dataset_path(name, data_dir)
+    mtime = os.path.getmtime(path)
+
+    with _opened_lock:
+        cached = _opened.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+
+    # memory map sengaja tidak ditutup: buffer DataFrame menunjuk ke sana
+    source = pa.memory_map(path)
+    table = pa.ipc.open_file(source).read_all()
+    key = (table.schema.metadata or {}).get(_KEY_METADATA, b"").decode() or None
+    df = table.to_pandas(split_blocks=True, types_mapper=_STRING_TYPES.get)
+
+    with _opened_lock:
+        _opened[path] = (mtime, key, df)
+    return key, df
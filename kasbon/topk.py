@@ -0,0 +1,165 @@
+"""
+Top-K streaming untuk leaderboard Top 10 Karyawan (nominal & qty).
+
+Tabel per user tidak pernah di-sort penuh: user dipartisi (hash ID user) ke
+bucket berisi maksimal BUCKET_USERS user unik, total per user dihitung per
+bucket, lalu hanya K kandidat teratas per ranking yang disimpan. Satu user
+selalu jatuh di bucket yang sama, jadi hasilnya exact, dan memori dibatasi
+ukuran bucket + K.
+
+Nilai seri diurutkan menurut kunci grup (nama, user, perusahaan) naik.
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+TOP_K = 10
+AMOUNT = "Total_Kasbon"
+QTY = "Qty_EWA_PPOB"
+RANKINGS = (AMOUNT, QTY)
+
+# target jumlah user unik per bucket (= baris tabel total per user yang dibuat sekaligus)
+BUCKET_USERS = int(os.environ.get("KASBON_TOPK_BUCKET_USERS", "20000"))
+
+
+class TopK:
+    """
+    Leaderboard terbatas untuk beberapa ranking sekaligus.
+
+    `push` menerima total per user (kolom group_cols + ranking) yang sudah
+    LENGKAP: semua baris milik seorang user harus ada di push yang sama dan
+    user itu tidak boleh muncul lagi di push lain (mis. satu bucket dari
+    `user_buckets`). Kalau total satu user terpecah ke beberapa push,
+    masing-masing pecahan diranking sendiri dan hasilnya salah; TopK tidak
+    menyimpan daftar user yang sudah lewat, jadi syarat ini tidak dicek.
+    """
+
+    def __init__(self, group_cols: list, k: int = TOP_K, rankings=RANKINGS):
+        self.group_cols = list(group_cols)
+        self.k = k
+        self._top = {ranking: None for ranking in rankings}
+
+    def push(self, users: pd.DataFrame):
+        """Tambahkan total per user satu bucket (lihat syarat di docstring kelas)."""
+        if users.empty:
+            return
+        for ranking, current in self._top.items():
+            # keep="all": seri di batas K ikut semua, _select yang memilih menurut kunci
+            candidates = _plain(users.nlargest(self.k, ranking, keep="all"))
+            if current is not None:
+                candidates = pd.concat([current, candidates], ignore_index=True)
+            self._top[ranking] = self._select(candidates, ranking)
+
+    def _select(self, candidates: pd.DataFrame, ranking: str) -> pd.DataFrame:
+        # ~2K baris (+ seri): urut kunci dulu lalu stable sort nilai (seri tetap urut kunci)
+        return (
+            candidates.sort_values(self.group_cols, kind="stable")
+            .sort_values(ranking, ascending=False, kind="stable")
+            .head(self.k)
+        )
+
+    def result(self, ranking: str) -> pd.DataFrame:
+        top = self._top[ranking]
+        if top is None:
+            return pd.DataFrame(columns=self.group_cols + [QTY, AMOUNT])
+        return top.reset_index(drop=True)
+
+
+def _plain(candidates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Kandidat (maksimal K baris) dengan kolom categorical jadi nilai biasa:
+    concat antar push tidak perlu menyamakan kategori seluruh user.
+    """
+    categorical = [
+        c for c in candidates.columns if isinstance(candidates[c].dtype, pd.CategoricalDtype)
+    ]
+    return candidates.astype({c: object for c in categorical})
+
+
+def _codes(values: pd.Series):
+    """(kode integer per baris, label per kode); urutan kode = urutan kategori / nilai."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values, sort=True)
+
+
+def user_buckets(codes: np.ndarray, labels, users_per_bucket: int = BUCKET_USERS):
+    """
+    Posisi baris per bucket, dipartisi dengan hash ID user (`codes` / `labels`
+    dari kolom user): satu user = satu bucket, ~users_per_bucket user unik per bucket.
+    """
+    n_users = int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+    n_buckets = max(1, math.ceil(n_users / users_per_bucket))
+    if n_buckets == 1:
+        yield np.arange(len(codes))
+        return
+    # hash per label sekali, lalu dipetakan lewat kode (tanpa hash per baris)
+    label_buckets = pd.util.hash_pandas_object(pd.Index(labels), index=False).to_numpy() % n_buckets
+    # user kosong (kode -1) ikut bucket 0
+    bucket_ids = np.where(codes >= 0, label_buckets[codes], 0)
+    order = np.argsort(bucket_ids, kind="stable")
+    bounds = np.searchsorted(bucket_ids[order], np.arange(1, n_buckets))
+    yield from np.split(order, bounds)
+
+
+def _bucket_totals(part: pd.DataFrame, keys: list, user_col: str, users_per_bucket: int):
+    """
+    (kode per kolom, total per kunci satu bucket) untuk tiap bucket user; total
+    masih berkunci kode integer, baris berkunci kosong (kode -1) dibuang.
+    """
+    # groupby atas kode integer; label hanya dipasang ke kandidat per bucket
+    codes = {col: _codes(part[col]) for col in keys}
+    qty = part["count"].to_numpy()
+    amount = part["sum"].to_numpy()
+    for rows in user_buckets(*codes[user_col], users_per_bucket):
+        totals = (
+            pd.DataFrame({col: codes[col][0][rows] for col in keys})
+            .assign(**{QTY: qty[rows], AMOUNT: amount[rows]})
+            .groupby(keys, sort=True)
+            .sum()
+            .reset_index()
+        )
+        # kunci kosong tidak ikut, sama seperti groupby atas nilai
+        yield codes, totals[(totals[keys] >= 0).all(axis=1)]
+
+
+def _decode(users: pd.DataFrame, group_cols: list, codes: dict) -> pd.DataFrame:
+    users = users.copy()
+    for col in group_cols:
+        users[col] = codes[col][1].take(users[col].to_numpy())
+    return users
+
+
+def top_users(part: pd.DataFrame, group_cols: list, user_col: str, k: int = TOP_K,
+              users_per_bucket: int = BUCKET_USERS):
+    """
+    Top-K user dari tabel parsial (kolom count & sum); `user_col` = kolom ID
+    user untuk partisi bucket (harus salah satu group_cols).
+    Return (top_by_amount, top_by_qty) dengan kolom group_cols + Qty_EWA_PPOB, Total_Kasbon.
+    """
+    topk = TopK(group_cols, k)
+    for codes, users in _bucket_totals(part, group_cols, user_col, users_per_bucket):
+        topk.push(_decode(users, group_cols, codes))
+    return topk.result(AMOUNT), topk.result(QTY)
+
+
+def segment_top_users(part: pd.DataFrame, group_cols: list, user_col: str, segment_col: str,
+                      k: int = TOP_K, users_per_bucket: int = BUCKET_USERS) -> dict:
+    """
+    Top-K per nilai `segment_col` plus gabungan semua segmen, dalam satu pass
+    bucket (tabel parsial atau data baris berkolom count & sum).
+    Return {segmen: (top_by_amount, top_by_qty)}, kunci None = gabungan.
+    """
+    keys = group_cols + [segment_col]
+    tops = {None: TopK(group_cols, k)}
+    for codes, totals in _bucket_totals(part, keys, user_col, users_per_bucket):
+        labels = codes[segment_col][1]
+        # bucket berisi user lengkap -> total gabungan per user juga lengkap
+        users = totals.groupby(group_cols, sort=True)[[QTY, AMOUNT]].sum().reset_index()
+        tops[None].push(_decode(users, group_cols, codes))
+        for code, users in totals.groupby(segment_col, sort=False):
+            topk = tops.setdefault(labels[code], TopK(group_cols, k))
+            topk.push(_decode(users.drop(columns=segment_col), group_cols, codes))
+    return {seg: (topk.result(AMOUNT), topk.result(QTY)) for seg, topk in tops.items()}
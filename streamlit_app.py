@@ -1,56 +1,256 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick
-from fpdf import FPDF
 import os
+import pandas as pd
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from kasbon.altair_charts import build_charts, rollup_chart
+from kasbon.analytics import AGG_BACKEND, AGG_BACKENDS, SEGMENT_ALL, company_column
+from kasbon.artifacts import ArtifactStore, session_store_limits
+from kasbon.bundle import BUNDLE_FILE_NAME, start_bundle_job
+from kasbon.charts import chart_cache_key, create_chart_pool, submit_charts
+from kasbon.cube import CUBE_EXT, PARTIALS_EXT, Cube, CubeError
+from kasbon.filters import FilterIndex, filter_key
+from kasbon.formatting import format_int, format_rupiah, format_singkat
+from kasbon.incremental import (
+    analyze_history,
+    append_delta,
+    history_exists,
+    list_histories,
+    load_history,
+)
+from kasbon.ingest import (
+    INPUT_TYPES,
+    IngestError,
+    combine_datasets,
+    create_ingest_pool,
+    file_hash,
+    load_datasets,
+)
+from kasbon.profiling import Profiler, activate, configure_logging, stage
+from kasbon.report import REPORT_CHART_KEYS, REPORT_FILE_NAME, start_report_job
+from kasbon.rollups import ROLLUP_LEVELS, ROLLUP_WEEK
+from kasbon.shared_cache import compute_cache
+from kasbon.sketch import HLL_PRECISION, PRECISION_CHOICES, relative_error
+from kasbon.store import dataset_name, list_datasets, open_dataset, save_dataset
 
 # --- Konfigurasi Halaman ---
 st.set_page_config(page_title="Pro Analitik Kasbon Dashboard", layout="wide")
+# timing per tahap juga ditulis sebagai JSON log line (logger kasbon.perf)
+configure_logging()
 
-# --- Fungsi Helper Formatting ---
-def format_rupiah(value: float) -> str:
-    try:
-        return f"Rp {value:,.0f}".replace(",", ".")
-    except Exception:
-        return "Rp 0"
+# --- Helper Session & Chart ---
+def get_artifact_store() -> ArtifactStore:
+    """
+    Artifact store milik session ini: PNG chart yang sudah tampil dan hasil
+    PDF / ZIP, di memori dengan spill ke temp dir (KASBON_ARTIFACT_*_MB).
+    """
+    if "artifacts" not in st.session_state:
+        st.session_state["artifacts"] = ArtifactStore(**session_store_limits())
+    return st.session_state["artifacts"]
 
-def format_int(num) -> str:
-    """Format integer dengan pemisah ribuan '.' (contoh: 50.579)"""
-    try:
-        return f"{int(num):,}".replace(",", ".")
-    except Exception:
-        return "0"
+def chart_artifact(seg: str, key: str) -> str:
+    """Nama artefak PNG chart `key` segmen `seg` di artifact store session."""
+    return f"{seg}/{key}.png"
 
-def format_singkat(num: float) -> str:
-    """Mengubah angka besar menjadi format pendek (2M, 500jt, 10k)"""
-    try:
-        n = float(num)
-    except Exception:
-        return "0"
-    if n >= 1_000_000_000:
-        return f"{n/1_000_000_000:.1f}M"
-    elif n >= 1_000_000:
-        return f"{n/1_000_000:.0f}jt"
-    elif n >= 1000:
-        return f"{n/1000:.0f}k"
-    return f"{n:,.0f}".replace(",", ".")
-
-def create_chart_image(fig, filename: str) -> str:
-    """Simpan figure ke folder charts dan kembalikan path-nya."""
-    charts_dir = "charts"
-    os.makedirs(charts_dir, exist_ok=True)
-    path = os.path.join(charts_dir, filename)
-    fig.tight_layout()
-    fig.savefig(path, bbox_inches="tight")
-    plt.close(fig)
-    return path
+@st.cache_resource
+def get_chart_pool():
+    """Process pool render chart, dipakai bersama semua session di server ini."""
+    return create_chart_pool()
+
+@st.cache_resource
+def get_ingest_pool():
+    """Process pool parsing workbook multi-file, dipakai bersama semua session."""
+    return create_ingest_pool()
+
+def show_chart(results: dict, charts: dict, key: str):
+    """
+    Tampilkan chart segmen. Backend Altair: spesifikasi + tabel agregat
+    dirender di browser. Backend matplotlib: PNG hasil worker (atau dari cache
+    bersama server), disalin ke artifact store session untuk PDF: cache bersama
+    boleh mengevict PNG-nya sebelum PDF dibuat.
+    """
+    if altair_backend:
+        st.altair_chart(charts[key], width="stretch")
+        return
+    artifact_name, future = charts[key]
+    # waktu tunggu sampai PNG dari worker siap
+    with stage(f"chart:{artifact_name}"):
+        png = future.result()
+    st.image(png, width="stretch")
+    get_artifact_store().put(chart_artifact(results["name"], key), png)
+
+def segment_charts(view_key, seg: str, results: dict) -> dict:
+    """
+    Chart satu segmen, di-cache di session: pindah segmen lalu kembali lagi
+    tidak membangun / merender ulang chart. PNG matplotlib juga disimpan di
+    cache bersama, jadi session lain dengan dataset & opsi sama tidak merender ulang.
+    """
+    cache = st.session_state.setdefault("segment_charts", {})
+    cache_key = (view_key, seg, altair_backend)
+    if cache_key not in cache:
+        # hanya simpan chart (dan artefak session) untuk dataset yang sedang dibuka
+        stale = [k for k in cache if k[0] != view_key]
+        for k in stale:
+            del cache[k]
+        if stale:
+            get_artifact_store().clear()
+        if altair_backend:
+            cache[cache_key] = build_charts({seg: results})[seg]
+        else:
+            cache[cache_key] = submit_charts(
+                {seg: results}, get_chart_pool(), cache=compute_cache, cache_key=view_key
+            )[seg]
+    return cache[cache_key]
+
+def cached_analysis(dataset_key: str, build):
+    """
+    Analisis lazy (kasbon.analytics.LazyAnalysis) untuk dataset + opsi analisis
+    (distinct, backend) saat ini. Rerun memakai objek yang sama, jadi segmen yang sudah dihitung
+    tidak dihitung ulang; results per segmen juga dibagi ke session lain lewat
+    cache bersama (`build(cache=..., cache_key=view_key)`). Return (view_key, analysis).
+    """
+    view_key = (dataset_key, tuple(sorted(analysis_options.items())))
+    cached = st.session_state.get("analysis")
+    if cached is None or cached[0] != view_key:
+        cached = (view_key, build(cache=compute_cache, cache_key=view_key))
+        st.session_state["analysis"] = cached
+    return cached
+
+@st.cache_resource
+def get_report_executor():
+    """Thread pool untuk job PDF di background, dipakai bersama semua session."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="kasbon-report")
+
+def wait_for_job(job):
+    """
+    Pantau progress job background sampai selesai. Interaksi widget lain tetap
+    bisa memotong loop ini, job-nya sendiri tetap jalan di background.
+    """
+    progress_bar = st.empty()
+    while not job.done():
+        fraction, message = job.status()
+        progress_bar.progress(fraction, text=message)
+        time.sleep(0.3)
+    progress_bar.empty()
+
+def finished_artifact(state_key: str, job, name: str, label: str):
+    """
+    Bytes hasil job background (PDF / ZIP) untuk tombol download. Hasil job yang
+    baru selesai dipindah ke artifact store session dan job-nya dilepas dari
+    session state; rerun berikutnya dilayani dari store. None kalau gagal.
+    """
+    artifacts = get_artifact_store()
+    if job is not None:
+        wait_for_job(job)
+        try:
+            artifacts.put(name, job.result())
+        except Exception as e:
+            st.error(f"Gagal membuat {label}: {e}")
+            return None
+        entry = st.session_state[state_key]
+        st.session_state[state_key] = (entry[0], None) + entry[2:]
+    data = artifacts.get(name)
+    if data is None:
+        st.info(f"File {label} sudah tidak tersimpan di session ini, silakan generate ulang.")
+    return data
+
+@st.fragment
+def render_report_section():
+    """
+    Section PDF sebagai fragment: klik tombol hanya merender ulang bagian ini,
+    PDF dibangun di background dari hasil yang sudah ada di session state.
+    """
+    st.subheader("📄 Download Laporan PDF")
+    inputs = st.session_state["report_inputs"]
+
+    if st.button("Generate Laporan Lengkap (PDF)"):
+        # fragment rerun tidak lewat script utama -> aktifkan profiler run terakhir
+        profiler = st.session_state.get("profiler") or Profiler()
+        with activate(profiler):
+            # segmen yang belum pernah dibuka dihitung sekarang (dari parsial, cepat)
+            analysis = inputs["analysis"]
+            results_all = analysis[SEGMENT_ALL]
+            # PNG yang belum ada (backend Altair / segmen belum dibuka) dirender di dalam job
+            artifacts = get_artifact_store()
+            images = {
+                key: (
+                    artifacts.get(chart_artifact(SEGMENT_ALL, key))
+                    or compute_cache.get(chart_cache_key(inputs["key"], SEGMENT_ALL, key))
+                )
+                for key in REPORT_CHART_KEYS
+            }
+            job = start_report_job(
+                get_report_executor(),
+                results_all,
+                analysis.get("EWA"),
+                analysis.get("PPOB"),
+                images=images,
+                chart_executor=get_chart_pool(),
+            )
+        st.session_state["report_job"] = (inputs["key"], job, profiler)
+
+    job_key, job, profiler = st.session_state.get("report_job", (None, None, None))
+    if job_key != inputs["key"]:
+        return
+    pdf_bytes = finished_artifact("report_job", job, REPORT_FILE_NAME, "PDF")
+    if pdf_bytes is None:
+        return
+
+    st.success("PDF berhasil dibuat!")
+    if show_performance:
+        pdf_records = [r for r in profiler.snapshot() if r["stage"] == "pdf"]
+        if pdf_records:
+            st.caption(f"⏱️ PDF dibangun dalam {pdf_records[-1]['seconds']:.2f} detik")
+    st.download_button(
+        label="📥 Download PDF",
+        data=pdf_bytes,
+        file_name=REPORT_FILE_NAME,
+        mime="application/pdf",
+    )
+
+@st.fragment
+def render_bundle_section():
+    """
+    Paket PDF per company (ZIP): tiap company dirender di process pool chart,
+    thread script hanya memantau progress.
+    """
+    inputs = st.session_state["report_inputs"]
+    analysis = inputs["analysis"]
+    st.subheader("🏢 Paket Laporan per Company")
+
+    if st.button("Generate Laporan per Company (ZIP)"):
+        # periode persis per company tersimpan di cube (mode histori: dari kunci bulan)
+        cached = st.session_state.get("cube")
+        periods = (
+            cached[1].meta.get("company_periods")
+            if cached is not None and cached[0] == inputs["key"][0] else None
+        )
+        job = start_bundle_job(
+            get_report_executor(), analysis, periods, process_pool=get_chart_pool()
+        )
+        st.session_state["bundle_job"] = (inputs["key"], job)
+
+    job_key, job = st.session_state.get("bundle_job", (None, None))
+    if job_key != inputs["key"]:
+        return
+    zip_bytes = finished_artifact("bundle_job", job, BUNDLE_FILE_NAME, "paket laporan")
+    if zip_bytes is None:
+        return
+
+    st.success("Paket laporan per company berhasil dibuat!")
+    st.download_button(
+        label="📥 Download ZIP",
+        data=zip_bytes,
+        file_name=BUNDLE_FILE_NAME,
+        mime="application/zip",
+    )
 
 # --- Header ---
 st.title("🚀 Dashboard Analitik EWA & PPOB")
 st.markdown(
     """
-    1. Upload file Excel (`.xlsx`) berisi data kasbon.  
+    1. Upload file Excel (`.xlsx`), CSV, atau Parquet berisi data kasbon.  
     2. Sistem akan otomatis membaca data & menampilkan dashboard.  
     3. Analitik tersedia untuk **gabungan (EWA + PPOB)**, khusus **EWA saja**, dan khusus **PPOB saja**.  
     4. Di akhir, kamu bisa **generate laporan PDF** lengkap untuk manajemen.
@@ -58,63 +258,126 @@ st.markdown(
     """
 )
 
-# --- Upload File ---
-uploaded_file = st.file_uploader(
-    "Upload File Excel (misalnya: Analitics.xlsx)",
-    type=["xlsx"]
+# --- Upload File (boleh banyak: mis. satu export per company per bulan) ---
+uploaded_files = st.file_uploader(
+    "Upload File Excel / CSV / Parquet (misalnya: Analitics.xlsx), boleh lebih dari satu",
+    type=INPUT_TYPES,
+    accept_multiple_files=True,
+)
+# nama default dataset / cube hasil upload
+upload_name = None
+if uploaded_files:
+    upload_name = (
+        os.path.splitext(uploaded_files[0].name)[0]
+        if len(uploaded_files) == 1 else f"gabungan_{len(uploaded_files)}_file"
+    )
+
+# --- Dataset Tersimpan (Arrow IPC, dibuka via memory map) ---
+st.sidebar.header("💾 Dataset Tersimpan")
+stored_names = list_datasets()
+stored_choice = st.sidebar.selectbox(
+    "Buka dataset tersimpan (tanpa upload)",
+    ["-"] + stored_names,
+)
+stored_choice = None if stored_choice == "-" else stored_choice
+cube_files = st.sidebar.file_uploader(
+    "Atau buka cube agregat (.cube.arrow, tanpa data baris), opsional bersama "
+    "parsial exact-nya (.partials.arrow)",
+    type=["arrow"],
+    accept_multiple_files=True,
+)
+persist_dataset = st.sidebar.checkbox("Simpan dataset hasil upload", value=False)
+if uploaded_files and persist_dataset:
+    persist_name = st.sidebar.text_input("Nama dataset", value=dataset_name(upload_name))
+
+# --- Distinct count: exact atau sketch HyperLogLog ---
+st.sidebar.header("🔢 User & Company Unik")
+approx_distinct = st.sidebar.checkbox("Aproksimasi (HyperLogLog)", value=False)
+distinct_options = {"distinct": "exact"}
+if approx_distinct:
+    distinct_options = {
+        "distinct": "hll",
+        "precision": st.sidebar.select_slider(
+            "Presisi sketch",
+            options=PRECISION_CHOICES,
+            value=HLL_PRECISION,
+            format_func=lambda p: f"p={p} (±{relative_error(p):.1%})",
+        ),
+    }
+
+# --- Backend agregasi: pandas atau pyarrow.compute (hasil sama) ---
+st.sidebar.header("⚙️ Agregasi")
+agg_backend = st.sidebar.radio(
+    "Mesin agregasi",
+    AGG_BACKENDS,
+    index=AGG_BACKENDS.index(AGG_BACKEND),
+    horizontal=True,
+    help="arrow: group_by pyarrow multi-thread atas kolom dictionary; hasil identik dengan pandas.",
+)
+analysis_options = {**distinct_options, "backend": agg_backend}
+
+# --- Backend chart: browser (Altair) atau server (matplotlib PNG) ---
+st.sidebar.header("📊 Chart")
+chart_backend = st.sidebar.radio(
+    "Renderer chart",
+    ["Browser (Altair)", "Server (matplotlib PNG)"],
+    help="Altair hanya mengirim tabel agregat kecil; matplotlib tetap dipakai untuk gambar PDF.",
 )
+altair_backend = chart_backend == "Browser (Altair)"
+
+# --- Mode Data: file lengkap atau append delta harian ke histori ---
+st.sidebar.header("📥 Mode Data")
+data_mode = st.sidebar.radio("Sumber analisis", ["File lengkap", "Append harian (delta)"])
+delta_mode = data_mode != "File lengkap"
+if delta_mode:
+    history_names = list_histories()
+    history_name = st.sidebar.text_input(
+        "Nama histori", value=history_names[0] if history_names else "kasbon"
+    )
+
+show_performance = st.sidebar.checkbox("⏱️ Tampilkan panel Performance", value=False)
 
-def render_segment(seg_name: str, seg_df: pd.DataFrame, main_segment: bool = False):
+@st.fragment
+def render_rollup_section(seg_name: str, rollups: dict, distinct_error=None):
+    """
+    Pilihan granularitas untuk rollup yang sudah dihitung (kasbon.rollups):
+    pindah level hanya memilih tabel lain, tanpa agregasi ulang.
+    Selalu dirender dengan Altair (tidak ada versi PNG/PDF-nya).
+    """
+    levels = [level for level in ROLLUP_LEVELS if level in rollups]
+    if distinct_error is not None:
+        st.caption(f"User & company unik di rollup: estimasi sketch harian (≈ ±{distinct_error:.1%}).")
+    level = st.segmented_control(
+        "Granularitas",
+        levels,
+        default=ROLLUP_WEEK if ROLLUP_WEEK in levels else levels[0],
+        key=f"rollup_level_{seg_name}",
+    ) or levels[0]
+    rollup = rollups[level]
+    st.altair_chart(rollup_chart(rollup, level, seg_name), width="stretch")
+    with st.expander(f"Tabel {level.lower()}"):
+        st.dataframe(rollup.drop(columns="Mulai"), hide_index=True, width="stretch")
+
+
+def render_segment(seg_name: str, results: dict, charts: dict, main_segment: bool = False):
     """
     Render analitik untuk satu segmen:
     - seg_name: nama segmen (Gabungan, EWA, PPOB)
-    - seg_df: dataframe terfilter
+    - results: hasil agregasi segmen dari kasbon.analytics.analyze
+    - charts: chart segmen ini dari kasbon.charts.submit_charts
     - main_segment: kalau True, tampilkan KPI cards besar
-    Return dict berisi hasil penting untuk PDF.
+    Return dict yang sama, dilengkapi path chart untuk PDF.
     """
-    results = {
-        "name": seg_name,
-        "has_data": False,
-        "total_kasbon": 0.0,
-        "total_trx": 0,
-        "total_user": 0,
-        "avg_ticket": 0.0,
-        "max_ticket": 0.0,
-        "monthly_stats": None,
-        "top_users_amount": None,
-        "top_users_qty": None,
-        "path_chart1": None,
-        "path_chart1b": None,   # tren user & company unik
-        "path_chart3": None,
-        "path_chart4": None,
-        "weekend_amount": 0.0,
-        "weekend_trx": 0,
-        "weekend_amount_pct": 0.0,
-        "weekend_trx_pct": 0.0,
-    }
-
-    if seg_df is None or seg_df.empty:
+    if not results["has_data"]:
         st.info(f"Segmen **{seg_name}**: tidak ada data.")
         return results
 
-    # pastikan copy terurut
-    df_seg = seg_df.sort_values("Tanggal Approved").copy()
-
     # ---- METRIK UTAMA ----
-    total_kasbon = float(df_seg["Total Kasbon"].sum())
-    total_trx = int(len(df_seg))
-    total_user = int(df_seg["Username/ ID User"].nunique())
-    avg_ticket = float(df_seg["Total Kasbon"].mean())
-    max_ticket = float(df_seg["Total Kasbon"].max())
-
-    results.update(
-        total_kasbon=total_kasbon,
-        total_trx=total_trx,
-        total_user=total_user,
-        avg_ticket=avg_ticket,
-        max_ticket=max_ticket,
-        has_data=True,
-    )
+    total_kasbon = results["total_kasbon"]
+    total_trx = results["total_trx"]
+    total_user = results["total_user"]
+    avg_ticket = results["avg_ticket"]
+    max_ticket = results["max_ticket"]
 
     if main_segment:
         st.markdown("### 💰 Ringkasan Performa (Gabungan EWA + PPOB)")
@@ -122,279 +385,53 @@ def render_segment(seg_name: str, seg_df: pd.DataFrame, main_segment: bool = Fal
         k1.metric("Total Pencairan", format_singkat(total_kasbon))
         k2.metric("Total Transaksi", format_int(total_trx))
         k3.metric("Rata-rata Pengambilan", format_singkat(avg_ticket))
-        k4.metric("User Unik", format_int(total_user))
+        user_label = "User Unik"
+        if results["distinct_error"] is not None:
+            user_label += f" (≈ ±{results['distinct_error']:.1%})"
+        k4.metric(user_label, format_int(total_user))
         st.markdown("---")
     else:
         st.markdown(f"### 📂 Ringkasan Segmen: {seg_name}")
+        approx = "≈" if results["distinct_error"] is not None else ""
         st.write(
             f"- Total EWA: **{format_rupiah(total_kasbon)}** dari **{format_int(total_trx)}** transaksi "
-            f"oleh **{format_int(total_user)}** user unik.  \n"
+            f"oleh **{approx}{format_int(total_user)}** user unik.  \n"
             f"- Rata-rata pengajuan: **{format_rupiah(avg_ticket)}**, pengajuan terbesar: **{format_rupiah(max_ticket)}**."
         )
 
     # ==============================================================
     # 1. Tren Keuangan Bulanan
     # ==============================================================
-    df_seg["Bulan_Str"] = df_seg["Tanggal Approved"].dt.strftime("%b-%y")
-
     st.subheader(f"1. Tren Bulanan – {seg_name}")
-    monthly_stats = (
-        df_seg.groupby("Bulan_Str", sort=False)["Total Kasbon"]
-        .agg(["sum", "count"])
-        .reset_index()
-    )
-    results["monthly_stats"] = monthly_stats
-
-    fig1, ax1 = plt.subplots(figsize=(11, 6))
+    show_chart(results, charts, "chart1")
 
-    bars = ax1.bar(
-        monthly_stats["Bulan_Str"],
-        monthly_stats["sum"],
-        color="#6baed6",
-        alpha=0.8,
-        label="Nominal (Rp)",
-    )
-    ax1.set_ylabel("Total Nominal (Rp)", color="#6baed6", fontweight="bold")
-    ax1.tick_params(axis="y", labelcolor="#6baed6")
-
-    for bar in bars:
-        height = bar.get_height()
-        ax1.text(
-            bar.get_x() + bar.get_width() / 2.0,
-            height,
-            format_singkat(height),
-            ha="center",
-            va="bottom",
-            fontsize=9,
-            fontweight="bold",
-            color="#3182bd",
-        )
-
-    ax2 = ax1.twinx()
-    ax2.plot(
-        monthly_stats["Bulan_Str"],
-        monthly_stats["count"],
-        color="#d62728",
-        marker="o",
-        linewidth=2,
-        label="Jumlah Transaksi",
-    )
-    ax2.set_ylabel("Jumlah Transaksi", color="#d62728", fontweight="bold")
-    ax2.tick_params(axis="y", labelcolor="#d62728")
-
-    for i, txt in enumerate(monthly_stats["count"]):
-        ax2.text(
-            i,
-            txt,
-            str(txt),
-            ha="center",
-            va="bottom",
-            fontsize=9,
-            color="white",
-            bbox=dict(
-                facecolor="#d62728", edgecolor="none", boxstyle="round,pad=0.2"
-            ),
-        )
-
-    plt.xticks(rotation=45)
-    plt.title(f"Total Nominal Kasbon vs Jumlah Transaksi per Bulan – {seg_name}", pad=20)
-    st.pyplot(fig1)
-    path_chart1 = create_chart_image(fig1, f"trend_keuangan_{seg_name}.png")
-    results["path_chart1"] = path_chart1
-
-    # ==============================================================
-    # 1.a Tren User & Company Unik per Bulan
-    # ==============================================================
     # ==============================================================
     # 1.a Tren User & Company Unik per Bulan
     # ==============================================================
     st.markdown(f"#### 1.a Tren User & Company Unik per Bulan – {seg_name}")
 
-    # cari kolom company (fleksibel nama kolom, termasuk 'Nama Perushaan')
-    company_col = None
-    for c in ["Nama Perushaan", "Nama Perusahaan", "Company", "Nama Company"]:
-        if c in df_seg.columns:
-            company_col = c
-            break
-
-    # Hitung user unik per bulan
-    user_per_month = (
-        df_seg.groupby("Bulan_Str")["Username/ ID User"]
-        .nunique()
-        .reset_index(name="User Unik")
-    )
-
-    # Hitung company unik per bulan (kalau kolomnya ada)
-    if company_col:
-        comp_per_month = (
-            df_seg.groupby("Bulan_Str")[company_col]
-            .nunique()
-            .reset_index(name="Company Unik")
-        )
-        monthly_uc = pd.merge(
-            user_per_month, comp_per_month, on="Bulan_Str", how="outer"
-        ).fillna(0)
-    else:
-        monthly_uc = user_per_month.copy()
-
-    # 🔒 Pastikan bulan di grafik user/company PERSIS sama dengan grafik keuangan
-    # (ambil urutan bulan dari monthly_stats yang sudah dipakai di grafik 1)
-    base_months = monthly_stats["Bulan_Str"].tolist()
-    monthly_uc = (
-        monthly_uc.set_index("Bulan_Str")
-        .reindex(base_months, fill_value=0)
-        .reset_index()
-    )
-
-    # Pakai index numerik untuk X agar mudah ditambah label
-    x = list(range(len(monthly_uc)))
+    # urutan bulan sudah PERSIS sama dengan grafik keuangan (monthly_stats)
+    show_chart(results, charts, "chart1b")
 
-    fig1b, axu = plt.subplots(figsize=(11, 4))
-    axu.plot(
-        x,
-        monthly_uc["User Unik"],
-        marker="o",
-        linewidth=2,
-        label="User Unik",
-    )
-
-    if "Company Unik" in monthly_uc.columns:
-        axu.plot(
-            x,
-            monthly_uc["Company Unik"],
-            marker="s",
-            linestyle="--",
-            linewidth=2,
-            label="Company Unik",
-        )
-
-    # Label sumbu X pakai nama bulan
-    axu.set_xticks(x)
-    axu.set_xticklabels(monthly_uc["Bulan_Str"], rotation=45)
-
-    axu.set_ylabel("Jumlah Unik")
-    axu.set_title(f"Tren User & Company Unik per Bulan – {seg_name}")
-    axu.grid(axis="y", linestyle="--", alpha=0.3)
-    axu.legend()
-
-    # === Tambah value label di atas titik User Unik ===
-    max_user = monthly_uc["User Unik"].max() if len(monthly_uc) > 0 else 0
-    offset_user = max_user * 0.05 if max_user > 0 else 0.3
-    for i, val in enumerate(monthly_uc["User Unik"]):
-        axu.text(
-            x[i],
-            val + offset_user,
-            str(int(val)),
-            ha="center",
-            va="bottom",
-            fontsize=9,
-        )
-
-    # === Tambah value label untuk Company Unik (kalau ada) ===
-    if "Company Unik" in monthly_uc.columns:
-        max_comp = monthly_uc["Company Unik"].max()
-        offset_comp = max_comp * 0.05 if max_comp > 0 else 0.3
-        for i, val in enumerate(monthly_uc["Company Unik"]):
-            axu.text(
-                x[i] + 0.1,        # geser dikit supaya nggak numpuk
-                val + offset_comp,
-                str(int(val)),
-                ha="left",
-                va="bottom",
-                fontsize=9,
-            )
-
-    st.pyplot(fig1b)
-    path_chart1b = create_chart_image(fig1b, f"trend_user_company_{seg_name}.png")
-    results["path_chart1b"] = path_chart1b
+    # ==============================================================
+    # 1.b Tren Harian / Mingguan / Bulanan
+    # ==============================================================
+    st.markdown(f"#### 1.b Tren Harian / Mingguan / Bulanan – {seg_name}")
+    render_rollup_section(seg_name, results["rollups"], results["rollup_error"])
 
     # ==============================================================
     # 2. Top 10 Karyawan (Nominal & Frekuensi)
     # ==============================================================
     st.subheader(f"2. Top 10 Karyawan – {seg_name}")
 
-    # Tentukan kolom nama karyawan & nama perusahaan
-    nama_karyawan_col = (
-        "Nama Karyawan" if "Nama Karyawan" in df_seg.columns else "Username/ ID User"
-    )
-    if "Nama Perusahaan" in df_seg.columns:
-        nama_perusahaan_col = "Nama Perusahaan"
-    elif "Nama Perushaan" in df_seg.columns:  # typo safe
-        nama_perusahaan_col = "Nama Perushaan"
-    else:
-        nama_perusahaan_col = None
-
-    group_cols = [nama_karyawan_col]
-    if "Username/ ID User" in df_seg.columns and "Username/ ID User" not in group_cols:
-        group_cols.append("Username/ ID User")
-    if nama_perusahaan_col and nama_perusahaan_col not in group_cols:
-        group_cols.append(nama_perusahaan_col)
-
-    agg_users = (
-        df_seg.groupby(group_cols)["Total Kasbon"]
-        .agg(Qty_EWA_PPOB="count", Total_Kasbon="sum")
-        .reset_index()
-    )
-
-    top_users_amount = (
-        agg_users.sort_values("Total_Kasbon", ascending=False)
-        .head(10)
-        .reset_index(drop=True)
-    )
-    top_users_qty = (
-        agg_users.sort_values("Qty_EWA_PPOB", ascending=False)
-        .head(10)
-        .reset_index(drop=True)
-    )
-
-    results["top_users_amount"] = top_users_amount
-    results["top_users_qty"] = top_users_qty
+    nama_karyawan_col = results["nama_karyawan_col"]
+    nama_perusahaan_col = results["nama_perusahaan_col"]
+    top_users_amount = results["top_users_amount"]
+    top_users_qty = results["top_users_qty"]
 
     # Chart Top 10 berdasarkan nominal
-    if not top_users_amount.empty:
-        fig3, ax3 = plt.subplots(figsize=(12, 7))
-        y_pos = range(len(top_users_amount))
-        bars_h = ax3.barh(
-            y_pos,
-            top_users_amount["Total_Kasbon"],
-            color="#0ea5e9",
-            alpha=0.9,
-        )
-
-        ax3.set_yticks(y_pos)
-        ax3.set_yticklabels(top_users_amount[nama_karyawan_col], fontsize=10)
-        ax3.invert_yaxis()
-
-        ax3.set_xlabel("Total Nilai Pinjaman (Rp)", fontsize=11)
-        ax3.set_title(
-            f"Top Amount 10 Karyawan (Nominal) – {seg_name}",
-            fontsize=14,
-            pad=15,
-        )
-
-        ax3.xaxis.set_major_formatter(
-            mtick.FuncFormatter(lambda x, pos: format_singkat(x))
-        )
-        ax3.grid(axis="x", linestyle="--", alpha=0.3)
-
-        max_val_amt = float(top_users_amount["Total_Kasbon"].max())
-        for bar in bars_h:
-            width = bar.get_width()
-            label_x = width + (max_val_amt * 0.01 if max_val_amt > 0 else 0)
-            ax3.text(
-                label_x,
-                bar.get_y() + bar.get_height() / 2,
-                format_singkat(width),
-                va="center",
-                fontsize=10,
-                fontweight="bold",
-                color="#111111",
-            )
-
-        plt.tight_layout()
-        st.pyplot(fig3)
-        path_chart3 = create_chart_image(fig3, f"top_users_{seg_name}.png")
-        results["path_chart3"] = path_chart3
+    if "chart3" in charts:
+        show_chart(results, charts, "chart3")
     else:
         st.info(f"Tidak ada data Top 10 karyawan untuk segmen {seg_name}.")
 
@@ -428,7 +465,7 @@ def render_segment(seg_name: str, seg_df: pd.DataFrame, main_segment: bool = Fal
             display_cols.append("Nama Perusahaan")
         display_cols += ["Qty", "Total Amount"]
 
-        st.dataframe(table_df[display_cols], use_container_width=True)
+        st.dataframe(table_df[display_cols], width="stretch")
 
     _render_top_table(
         top_users_amount, f"Detail Top Amount 10 Karyawan – {seg_name}"
@@ -443,71 +480,15 @@ def render_segment(seg_name: str, seg_df: pd.DataFrame, main_segment: bool = Fal
     # ==============================================================
     st.subheader(f"3. Analisis Hari & Weekend – {seg_name}")
 
-    trx_per_day = (
-        df_seg["Hari"]
-        .value_counts()
-        .reindex(
-            [
-                "Monday",
-                "Tuesday",
-                "Wednesday",
-                "Thursday",
-                "Friday",
-                "Saturday",
-                "Sunday",
-            ]
-        )
-        .fillna(0)
-        .astype(int)
-        .reset_index()
-    )
-    trx_per_day.columns = ["Hari", "Jumlah"]
-
-    fig4, ax4 = plt.subplots(figsize=(10, 5))
-    colors = [
-        "#b3cde3" if x < 5 else "#fdb462"
-        for x in range(len(trx_per_day))
-    ]
-    bars_d = ax4.bar(trx_per_day["Hari"], trx_per_day["Jumlah"], color=colors)
-
-    max_trx = trx_per_day["Jumlah"].max()
-    for bar in bars_d:
-        height = bar.get_height()
-        ax4.text(
-            bar.get_x() + bar.get_width() / 2.0,
-            height + (max_trx * 0.03 if max_trx > 0 else 0.1),
-            format_int(height),
-            ha="center",
-            va="bottom",
-            fontsize=10,
-        )
-
-    ax4.set_title(f"Volume Transaksi per Hari – {seg_name}")
-    if max_trx > 0:
-        ax4.set_ylim(top=max_trx * 1.25)
-
-    st.pyplot(fig4)
-    path_chart4 = create_chart_image(fig4, f"daily_trx_{seg_name}.png")
-    results["path_chart4"] = path_chart4
+    show_chart(results, charts, "chart4")
 
     # Weekend contribution
-    weekend_mask = df_seg["Hari"].isin(["Saturday", "Sunday"])
-    weekend_amount = float(df_seg.loc[weekend_mask, "Total Kasbon"].sum())
-    weekend_trx = int(weekend_mask.sum())
+    weekend_amount = results["weekend_amount"]
+    weekend_trx = results["weekend_trx"]
     total_amount_all = float(total_kasbon)
     total_trx_all = int(total_trx)
-
-    weekend_amount_pct = (
-        weekend_amount / total_amount_all * 100 if total_amount_all > 0 else 0.0
-    )
-    weekend_trx_pct = (
-        weekend_trx / total_trx_all * 100 if total_trx_all > 0 else 0.0
-    )
-
-    results["weekend_amount"] = weekend_amount
-    results["weekend_trx"] = weekend_trx
-    results["weekend_amount_pct"] = weekend_amount_pct
-    results["weekend_trx_pct"] = weekend_trx_pct
+    weekend_amount_pct = results["weekend_amount_pct"]
+    weekend_trx_pct = results["weekend_trx_pct"]
 
     st.markdown(
         f"📌 **Kontribusi Akhir Pekan (Sabtu & Minggu) – {seg_name}**: "
@@ -520,290 +501,350 @@ def render_segment(seg_name: str, seg_df: pd.DataFrame, main_segment: bool = Fal
     return results
 
 
-if uploaded_file is not None:
-    try:
-        df = pd.read_excel(uploaded_file)
+@st.fragment
+def render_segment_view():
+    """
+    Satu segmen per tampilan, sebagai fragment: pindah segmen hanya merender
+    ulang bagian ini. Results & chart segmen dihitung saat pertama dibuka,
+    lalu dipakai ulang dari cache session.
+    """
+    view_key, analysis = st.session_state["segment_view"]
+    segments = list(analysis)
+    seg_name = SEGMENT_ALL
+    if len(segments) > 1:
+        seg_name = st.radio("Segmen", segments, horizontal=True, key="segment_choice")
+
+    with activate(st.session_state.get("profiler") or Profiler()):
+        results = analysis[seg_name]
+        with stage(f"render:{seg_name}"):
+            render_segment(
+                seg_name,
+                results,
+                segment_charts(view_key, seg_name, results),
+                main_segment=seg_name == SEGMENT_ALL,
+            )
+
+
+def render_dashboard(view_key, analysis):
+    """Render segmen yang dipilih + section PDF dari hasil kasbon.analytics."""
+    if "EWA" not in analysis:
+        st.warning(
+            "Kolom jenis EWA (EWA/PPOB) tidak ditemukan. "
+            "Analisis hanya dilakukan sebagai gabungan (EWA+PPOB)."
+        )
+
+    st.session_state["segment_view"] = (view_key, analysis)
+    render_segment_view()
 
-        required_columns = ["Tanggal Approved", "Username/ ID User", "Total Kasbon"]
-        if not all(col in df.columns for col in required_columns):
-            st.error(
-                "Kolom wajib tidak ditemukan! "
-                f"Pastikan ada kolom: {', '.join(required_columns)}"
+    # ==============================================================
+    # PDF REPORT (berbasis gabungan + ringkasan per jenis)
+    # ==============================================================
+    st.markdown("---")
+    # Analisis disimpan di session supaya job PDF tidak menghitung ulang apa pun
+    st.session_state["report_inputs"] = {"key": view_key, "analysis": analysis}
+    render_report_section()
+    if company_column(analysis.cols):
+        if analysis.partials is not None:
+            render_bundle_section()
+        else:
+            st.info(
+                "Paket laporan per company butuh parsial exact per user: matikan "
+                "aproksimasi HyperLogLog, atau buka cube bersama file .partials.arrow-nya."
             )
+
+
+def filter_index(dataset_key: str, df: pd.DataFrame) -> FilterIndex:
+    """Index filter dataset aktif; dibangun sekali per dataset per session."""
+    cached = st.session_state.get("filter_index")
+    if cached is None or cached[0] != dataset_key:
+        with stage("filter_index", rows=len(df)):
+            cached = (dataset_key, FilterIndex(df))
+        st.session_state["filter_index"] = cached
+    return cached[1]
+
+
+def sidebar_filters(index: FilterIndex) -> dict:
+    """Widget filter di sidebar; return hanya filter yang aktif."""
+    st.sidebar.header("🔎 Filter")
+    first, last = index.date_range
+    picked = st.sidebar.date_input(
+        "Rentang Tanggal Approved", value=(first, last), min_value=first, max_value=last
+    )
+    filters = {}
+    # saat memilih, date_input sempat berisi satu tanggal saja
+    if isinstance(picked, (list, tuple)) and len(picked) == 2:
+        start, end = picked
+        if start > first:
+            filters["start"] = start
+        if end < last:
+            filters["end"] = end
+
+    if index.companies is not None:
+        companies = st.sidebar.multiselect(
+            f"Perusahaan ({index.company_col})", sorted(index.companies, key=str)
+        )
+        if companies:
+            filters["companies"] = companies
+    if index.jenis is not None and len(index.jenis) > 1:
+        jenis = st.sidebar.multiselect("Jenis", list(index.jenis))
+        if jenis:
+            filters["jenis"] = jenis
+    return filters
+
+
+def read_uploads() -> list:
+    """
+    Parsing semua file upload (paralel, di-cache per hash isi file), tampilkan
+    timing per file & file yang gagal. Return entri kasbon.ingest.load_datasets.
+    """
+    files = [(f.name, f.getvalue()) for f in uploaded_files]
+    pool = get_ingest_pool() if len(files) > 1 else None
+    entries = load_datasets(files, pool)
+
+    for entry in entries:
+        if entry["error"] is not None:
+            st.warning(f"`{entry['name']}` dilewati: {entry['error']}")
+    if len(entries) > 1:
+        with st.expander(f"📄 {len(entries)} file diproses", expanded=False):
+            st.dataframe(
+                pd.DataFrame({
+                    "File": [e["name"] for e in entries],
+                    "Baris": [e["rows"] for e in entries],
+                    "Parsing (detik)": [round(e["seconds"], 2) for e in entries],
+                    "Sumber": [
+                        "gagal" if e["error"] else "cache" if e["cached"] else "parsing"
+                        for e in entries
+                    ],
+                }),
+                width="stretch",
+                hide_index=True,
+            )
+    return entries
+
+
+def dataset_cube(dataset_key: str, build, with_partials: bool = False) -> Cube:
+    """
+    Cube agregat dataset aktif; dibangun sekali per dataset (dan filter) per
+    server, session lain memakai cube yang sama dari cache bersama.
+    with_partials: cube harus membawa parsial exact per user (`build(True)`);
+    cube tanpa parsial dibangun ulang sekali saat beralih ke mode exact.
+    """
+    cached = st.session_state.get("cube")
+    if (
+        cached is None or cached[0] != dataset_key
+        or (with_partials and not cached[1].has_partials)
+    ):
+        cube = compute_cache.get_or_compute(
+            ("cube", dataset_key, with_partials), lambda: build(with_partials)
+        )
+        cached = (dataset_key, cube)
+        st.session_state["cube"] = cached
+    return cached[1]
+
+
+def cube_export_button(cube: Cube, name: str):
+    """Download cube (Arrow IPC) + parsial exact-nya; bytes baru dibuat saat tombol diklik."""
+    st.sidebar.download_button(
+        "📦 Export cube agregat",
+        data=cube.to_bytes,
+        file_name=dataset_name(name) + CUBE_EXT,
+        mime="application/vnd.apache.arrow.file",
+        help=f"{format_int(cube.num_cells)} sel agregat; bisa dibuka lagi tanpa data baris.",
+    )
+    if cube.has_partials:
+        st.sidebar.download_button(
+            "📦 Export parsial exact (opsional)",
+            data=cube.partials_bytes,
+            file_name=dataset_name(name) + PARTIALS_EXT,
+            mime="application/vnd.apache.arrow.file",
+            help="Parsial per user untuk user unik exact & paket laporan per company; "
+            "dibuka bersama cube di atas.",
+        )
+
+
+def load_cube_file():
+    """Mode cube: file cube hasil export (+ parsial exact) -> (view_key, analysis), tanpa data baris."""
+    partial_files = [f for f in cube_files if f.name.endswith(PARTIALS_EXT)]
+    main_files = [f for f in cube_files if not f.name.endswith(PARTIALS_EXT)]
+    if len(main_files) != 1 or len(partial_files) > 1:
+        raise IngestError("Buka tepat satu file cube, opsional dengan satu file .partials.arrow-nya.")
+    data = main_files[0].getvalue()
+    partials = partial_files[0].getvalue() if partial_files else None
+    cube_key = "cube:" + file_hash(data)
+    if partials is not None:
+        cube_key += "+" + file_hash(partials)
+    try:
+        cube = dataset_cube(cube_key, lambda _: Cube.from_bytes(data, partials))
+    except CubeError as e:
+        raise IngestError(str(e))
+
+    meta = cube.meta
+    st.success("✅ Cube agregat dimuat. Melakukan analisis...")
+    st.caption(
+        f"Cube: {format_int(cube.num_cells)} sel agregat dari "
+        f"{format_int(meta['total_rows'])} transaksi (dibuat {meta['created']}). "
+        "Filter tanggal/company tidak tersedia tanpa data baris."
+    )
+    if not cube.has_partials and analysis_options["distinct"] == "exact":
+        st.caption(
+            "Tanpa file parsial exact: user unik diestimasi dari sketch cube, "
+            "company unik tetap exact."
+        )
+    return cached_analysis(cube_key, lambda **shared: cube.analysis(**analysis_options, **shared))
+
+
+def load_full_dataset():
+    """Mode file lengkap: upload, cube, atau dataset tersimpan -> (view_key, analysis)."""
+    if not uploaded_files and bool(cube_files):
+        return load_cube_file()
+
+    with stage("ingest") as record:
+        if uploaded_files:
+            # Parsing + cleaning di-cache berdasarkan hash isi file, lalu digabung
+            dataset_key, df = combine_datasets(read_uploads())
         else:
-            if df.empty:
-                st.warning("File terbaca, tapi tidak ada data di dalamnya.")
-            else:
-                st.success("✅ Data berhasil dimuat. Melakukan analisis...")
+            dataset_key, df = open_dataset(stored_choice)
+        record["rows"] = len(df)
+
+    if uploaded_files and persist_dataset:
+        saved_path = save_dataset(df, persist_name, dataset_key)
+        st.sidebar.caption(f"Tersimpan di `{saved_path}`")
 
-                # Cleaning tanggal
-                df["Tanggal Approved"] = pd.to_datetime(
-                    df["Tanggal Approved"], errors="coerce"
+    st.success("✅ Data berhasil dimuat. Melakukan analisis...")
+
+    memory_report = df.attrs.get("memory_report")
+    if memory_report:
+        st.caption(
+            f"Memori data: {memory_report['before_bytes'] / 1e6:,.1f} MB → "
+            f"{memory_report['after_bytes'] / 1e6:,.1f} MB (categorical + downcast)"
+        )
+
+    index = filter_index(dataset_key, df)
+    filters = sidebar_filters(index)
+    if filters:
+        with stage("filter") as record:
+            df = index.apply(**filters)
+            record["rows"] = len(df)
+        if df.empty:
+            raise IngestError("Tidak ada transaksi yang cocok dengan filter.", "warning")
+        st.caption(f"Filter aktif: {format_int(len(df))} transaksi.")
+        dataset_key = f"{dataset_key}?{filter_key(filters)}"
+
+    # Satu pass agregasi ke cube; semua view & PDF dijawab dari cube. Parsial
+    # per user hanya dibangun kalau user unik exact dibutuhkan.
+    cube = dataset_cube(
+        dataset_key,
+        lambda with_partials: Cube.build(
+            df, backend=analysis_options["backend"], source=dataset_key,
+            partials=with_partials,
+        ),
+        with_partials=analysis_options["distinct"] == "exact",
+    )
+    name = upload_name if uploaded_files else stored_choice
+    cube_export_button(cube, name + ("_filter" if filters else ""))
+
+    # metrik per segmen dihitung saat segmen dibuka
+    return cached_analysis(dataset_key, lambda **shared: cube.analysis(**analysis_options, **shared))
+
+
+def load_delta_history():
+    """Mode append: delta harian digabung ke histori -> (view_key, analysis)."""
+    if uploaded_files:
+        with stage("ingest") as record:
+            entries = [e for e in read_uploads() if e["df"] is not None]
+            record["rows"] = sum(e["rows"] for e in entries)
+        if not entries:
+            raise IngestError("Tidak ada file yang berhasil dibaca.")
+        # delta digabung berurutan (urut nama file, mis. tanggal extract)
+        for entry in sorted(entries, key=lambda e: e["name"]):
+            with stage("append_delta", rows=entry["rows"]):
+                state, report = append_delta(history_name, entry["df"], entry["key"])
+            if report["already_applied"]:
+                st.info(
+                    f"`{entry['name']}` sudah pernah digabung ke histori, tidak diproses ulang."
                 )
-                df = df[df["Tanggal Approved"].notna()].copy()
+            else:
+                st.success(
+                    f"✅ `{entry['name']}` digabung: {format_int(report['new_rows'])} baris baru, "
+                    f"{format_int(report['duplicate_rows'])} duplikat dilewati."
+                )
+    else:
+        state = load_history(history_name)
+
+    meta = state["meta"]
+    st.caption(
+        f"Histori `{dataset_name(history_name)}`: {format_int(meta['total_rows'])} transaksi "
+        f"dari {format_int(len(meta['files']))} file (update terakhir {meta['updated']})."
+    )
+    return cached_analysis(
+        f"{dataset_name(history_name)}:{len(meta['files'])}",
+        lambda **shared: analyze_history(state, **analysis_options, **shared),
+    )
+
+
+def render_performance_panel(profiler: Profiler):
+    """Tabel timing per tahap untuk rerun ini (juga tercatat di log JSON)."""
+    records = profiler.snapshot()
+    with st.expander("⏱️ Performance", expanded=True):
+        if not records:
+            st.info("Belum ada tahap yang tercatat.")
+            return
+        table = pd.DataFrame(records)[["stage", "seconds", "rss_peak_delta_mb", "rows"]]
+        table.columns = ["Tahap", "Detik", "Δ Peak RSS (MB)", "Baris"]
+        table["Baris"] = table["Baris"].astype("Int64")
+        st.dataframe(table, width="stretch", hide_index=True)
+        top_level = sum(r["seconds"] for r in records if "/" not in r["stage"])
+        st.caption(
+            f"Run `{profiler.run_id}` – total tahap level atas {top_level:.2f} detik. "
+            "Chart = waktu tunggu PNG dari worker; PDF tercatat setelah job selesai."
+        )
+        cache_stats = compute_cache.stats()
+        counters = ", ".join(
+            f"{kind} {counts.get('hits', 0)} hit / {counts.get('misses', 0)} miss"
+            for kind, counts in cache_stats["kinds"].items()
+        )
+        st.caption(
+            f"Cache bersama server: {cache_stats['entries']} entri, "
+            f"{cache_stats['bytes'] / 1e6:,.1f} / {cache_stats['max_bytes'] / 1e6:,.0f} MB"
+            + (f" – {counters}" if counters else "")
+        )
+
 
-                if df.empty:
-                    st.warning(
-                        "Semua baris memiliki 'Tanggal Approved' yang tidak valid. "
-                        "Cek format tanggal di file Excel."
-                    )
+if delta_mode:
+    ready = bool(uploaded_files) or history_exists(history_name)
+else:
+    ready = bool(uploaded_files) or bool(cube_files) or stored_choice is not None
+
+if ready:
+    profiler = Profiler()
+    st.session_state["profiler"] = profiler
+    try:
+        with activate(profiler):
+            try:
+                view_key, analysis = (
+                    load_delta_history() if delta_mode else load_full_dataset()
+                )
+            except IngestError as e:
+                if e.level == "warning":
+                    st.warning(str(e))
                 else:
-                    df["Hari"] = df["Tanggal Approved"].dt.day_name()
-
-                    # Deteksi kolom jenis EWA (EWA / PPOB)
-                    jenis_candidates = [
-                        "Jenis EWA",
-                        "JENIS EWA",
-                        "Jenis",
-                        "JENIS",
-                        "Jenis Transaksi",
-                        "Jenis_Kasbon",
-                    ]
-                    jenis_col = None
-                    for c in jenis_candidates:
-                        if c in df.columns:
-                            jenis_col = c
-                            break
-
-                    if jenis_col is None:
-                        st.warning(
-                            "Kolom jenis EWA (EWA/PPOB) tidak ditemukan. "
-                            "Analisis hanya dilakukan sebagai gabungan (EWA+PPOB)."
-                        )
-
-                    # Bangun segmen
-                    segments = {}
-                    segments["Gabungan (EWA+PPOB)"] = df
-
-                    if jenis_col is not None:
-                        jenis_upper = df[jenis_col].astype(str).str.upper()
-                        df_ewa = df[jenis_upper == "EWA"].copy()
-                        df_ppob = df[jenis_upper == "PPOB"].copy()
-                        segments["EWA"] = df_ewa
-                        segments["PPOB"] = df_ppob
-
-                    # Render gabungan dulu
-                    results_all = render_segment(
-                        "Gabungan (EWA+PPOB)", segments["Gabungan (EWA+PPOB)"], main_segment=True
-                    )
-
-                    # Jika ada kolom jenis, render EWA & PPOB
-                    results_ewa = None
-                    results_ppob = None
-                    if "EWA" in segments:
-                        st.markdown("---")
-                        results_ewa = render_segment("EWA", segments["EWA"], main_segment=False)
-                    if "PPOB" in segments:
-                        st.markdown("---")
-                        results_ppob = render_segment("PPOB", segments["PPOB"], main_segment=False)
-
-                    # ==============================================================
-                    # PDF REPORT (berbasis gabungan + ringkasan per jenis)
-                    # ==============================================================
-                    st.markdown("---")
-                    st.subheader("📄 Download Laporan PDF")
-
-                    if st.button("Generate Laporan Lengkap (PDF)"):
-
-                        # Sanitize text agar aman untuk FPDF (latin-1)
-                        def pdf_safe(text: str) -> str:
-                            if not isinstance(text, str):
-                                text = str(text)
-                            # ganti karakter "aneh" yang sering bikin error
-                            text = (
-                                text.replace("–", "-")
-                                    .replace("—", "-")
-                                    .replace("•", "-")
-                            )
-                            return text.encode("latin-1", "replace").decode("latin-1")
-
-                        class PDF(FPDF):
-                            def header(self):
-                                self.set_font("Arial", "B", 16)
-                                self.cell(
-                                    0,
-                                    10,
-                                    pdf_safe("Laporan Analitik Kasbon"),
-                                    0,
-                                    1,
-                                    "C",
-                                )
-                                self.set_font("Arial", "I", 10)
-                                self.cell(
-                                    0,
-                                    10,
-                                    pdf_safe("Generated by Dashboard Analitik Kasbon"),
-                                    0,
-                                    1,
-                                    "C",
-                                )
-                                self.line(10, 30, 200, 30)
-                                self.ln(10)
-
-                            def chapter_title(self, title: str):
-                                self.set_font("Arial", "B", 14)
-                                self.set_fill_color(230, 230, 230)
-                                self.cell(0, 10, pdf_safe(title), 0, 1, "L", 1)
-                                self.ln(4)
-
-                            def chapter_body(self, body: str):
-                                self.set_font("Arial", "", 11)
-                                self.multi_cell(0, 6, pdf_safe(body))
-                                self.ln()
-
-                        pdf = PDF()
-                        pdf.set_auto_page_break(auto=True, margin=15)
-                        pdf.add_page()
-
-                        # -----------------------------
-                        # Ambil data utama (Gabungan)
-                        # -----------------------------
-                        total_kasbon = results_all["total_kasbon"]
-                        total_trx = results_all["total_trx"]
-                        total_user = results_all["total_user"]
-                        avg_ticket = results_all["avg_ticket"]
-                        max_ticket = results_all["max_ticket"]
-                        monthly_stats = results_all["monthly_stats"]
-                        path_chart1_all = results_all["path_chart1"]
-                        path_chart1b_all = results_all.get("path_chart1b")
-                        path_chart3_all = results_all["path_chart3"]
-                        path_chart4_all = results_all["path_chart4"]
-                        weekend_amount_all = results_all["weekend_amount"]
-                        weekend_trx_all = results_all["weekend_trx"]
-                        weekend_amount_pct_all = results_all["weekend_amount_pct"]
-                        weekend_trx_pct_all = results_all["weekend_trx_pct"]
-                        top_users_amount_all = results_all["top_users_amount"]
-                        top_users_qty_all = results_all["top_users_qty"]
-
-                        # Periode data
-                        periode_start = df["Tanggal Approved"].min()
-                        periode_end = df["Tanggal Approved"].max()
-                        if pd.notna(periode_start) and pd.notna(periode_end):
-                            periode_str = f"{periode_start:%d %b %Y} - {periode_end:%d %b %Y}"
-                        else:
-                            periode_str = "Tidak diketahui"
-
-                        # -----------------------------
-                        # 1. RINGKASAN EKSEKUTIF
-                        # -----------------------------
-                        if monthly_stats is not None and not monthly_stats.empty:
-                            bulan_max = monthly_stats.loc[monthly_stats["sum"].idxmax()]
-                        else:
-                            bulan_max = None
-
-                        # MoM growth (kalau minimal ada 2 bulan)
-                        mom_text = ""
-                        if monthly_stats is not None and len(monthly_stats) >= 2:
-                            last = monthly_stats.iloc[-2]
-                            current = monthly_stats.iloc[-1]
-                            if last["sum"] > 0:
-                                mom_pct = (current["sum"] - last["sum"]) / last["sum"] * 100
-                                arah = "naik" if mom_pct >= 0 else "turun"
-                                mom_text = (
-                                    f"Dibanding bulan sebelumnya, total kasbon {arah} "
-                                    f"{abs(mom_pct):.1f}%."
-                                )
-
-                        ringkasan_lines = [
-                            f"Periode data: {periode_str}.",
-                            f"Total kasbon (gabungan EWA+PPOB): {format_rupiah(total_kasbon)} "
-                            f"dari {total_trx} transaksi oleh {total_user} user unik.",
-                            f"Rata-rata ticket size: {format_rupiah(avg_ticket)} | "
-                            f"Ticket terbesar: {format_rupiah(max_ticket)}.",
-                        ]
-                        if bulan_max is not None:
-                            ringkasan_lines.append(
-                                f"Bulan dengan pencairan tertinggi: {bulan_max['Bulan_Str']} "
-                                f"sebesar {format_rupiah(bulan_max['sum'])} "
-                                f"dari {bulan_max['count']} transaksi."
-                            )
-                        if mom_text:
-                            ringkasan_lines.append(mom_text)
-                        ringkasan_lines.append(
-                            "Kontribusi akhir pekan (Sabtu-Minggu, gabungan): "
-                            f"{format_rupiah(weekend_amount_all)} "
-                            f"({weekend_amount_pct_all:.1f}% dari nominal, "
-                            f"{weekend_trx_pct_all:.1f}% dari jumlah transaksi)."
-                        )
-
-                        # Ringkasan per jenis (Gabungan, EWA, PPOB)
-                        jenis_lines = []
-                        for res in [results_all, results_ewa, results_ppob]:
-                            if not res:
-                                continue
-                            if not res.get("has_data", False):
-                                continue
-                            name = res["name"]
-                            tot = format_rupiah(res["total_kasbon"])
-                            trx = res["total_trx"]
-                            wu = res["weekend_amount_pct"]
-                            wt = res["weekend_trx_pct"]
-                            jenis_lines.append(
-                                f"- {name}: {tot} ({trx} trx, weekend {wu:.1f}% nominal / {wt:.1f}% trx)"
-                            )
-                        if jenis_lines:
-                            ringkasan_lines.append(
-                                "Ringkasan per jenis (Gabungan, EWA, PPOB):\n"
-                                + "\n".join(jenis_lines)
-                            )
-
-                        pdf.chapter_title("1. Ringkasan Eksekutif & Perbandingan Jenis")
-                        pdf.chapter_body("\n".join(ringkasan_lines))
-
-                        # -----------------------------
-                        # 2. TREN BULANAN (GABUNGAN)
-                        # -----------------------------
-                        pdf.chapter_title("2. Tren Keuangan Bulanan - Gabungan (EWA+PPOB)")
-                        if path_chart1_all and os.path.exists(path_chart1_all):
-                            pdf.image(path_chart1_all, w=180)
-                            pdf.ln(5)
-                        pdf.chapter_body(
-                            "Grafik di atas menunjukkan perkembangan total nominal kasbon "
-                            "dan jumlah transaksi per bulan untuk gabungan EWA+PPOB. "
-                            "Pimpinan dapat memonitor pertumbuhan penggunaan kasbon dan "
-                            "mengidentifikasi bulan dengan lonjakan signifikan."
-                        )
-                        # --- 2.a Tren User & Company Unik per Bulan (Gabungan) ---
-                        pdf.chapter_title("2.a Tren User & Company Unik per Bulan - Gabungan")
-                        if path_chart1b_all and os.path.exists(path_chart1b_all):
-                            pdf.image(path_chart1b_all, w=180)
-                            pdf.ln(5)
-
-                        pdf.chapter_body(
-                            "Grafik ini menunjukkan perkembangan jumlah user unik dan company unik "
-                            "yang aktif menggunakan kasbon per bulan. Tren kenaikan mengindikasikan "
-                            "adopsi yang semakin luas, baik dari sisi karyawan maupun perusahaan."
-                        )
-
-                        # -----------------------------
-                        # 3. TOP 10 PALING BOROS
-                        # -----------------------------
-                        pdf.chapter_title("3. Top Amount 10 Karyawan - Gabungan")
-                        if path_chart3_all and os.path.exists(path_chart3_all):
-                            pdf.image(path_chart3_all, w=180)
-                            pdf.ln(5)
-                        pdf.chapter_body(
-                            "Grafik di atas menunjukkan 10 karyawan dengan total "
-                            "pencairan kasbon tertinggi. Informasi ini membantu manajemen "
-                            "mengidentifikasi pengguna kasbon terbesar dan potensi risiko."
-                        )
-
-                        pdf_output_path = "Laporan_Analitik_Lengkap.pdf"
-                        pdf.output(pdf_output_path)
-
-                        with open(pdf_output_path, "rb") as f:
-                            pdf_bytes = f.read()
-                            
-                        st.success("PDF berhasil dibuat!")
-                        st.download_button(
-                            label="📥 Download PDF",
-                            data=pdf_bytes,
-                            file_name="Laporan_Analitik_Lengkap.pdf",
-                            mime="application/pdf",
-                        )
+                    st.error(str(e))
+            else:
+                render_dashboard(view_key, analysis)
 
     except Exception as e:
         st.error(f"Terjadi error: {e}")
 
+    if show_performance:
+        render_performance_panel(profiler)
+
+elif delta_mode:
+    st.info(
+        "Histori belum ada. Upload extract harian pertama untuk memulai histori "
+        f"`{dataset_name(history_name)}`."
+    )
 else:
-    st.info("Silakan upload file Excel terlebih dahulu untuk memulai analisis.")
+    st.info(
+        "Silakan upload file Excel / CSV / Parquet terlebih dahulu (atau buka dataset tersimpan / "
+        "cube agregat di sidebar) untuk memulai analisis."
+    )
@@ -0,0 +1,165 @@
+import pandas as pd
+import pytest
+
+from kasbon.analytics import SEGMENT_ALL, analyze
+from kasbon.ingest import clean_dataframe
+from kasbon.rollups import ROLLUP_DAY
+
+NAMA = "Nama Karyawan"
+USER = "Username/ ID User"
+PT = "Nama Perusahaan"
+
+# (tanggal, user, nama, perusahaan, jenis, nominal); 2025-01-06 = Senin
+ROWS = [
+    ("2025-01-06 08:00", "u1", "Ani", "PT A", "EWA", 100000),
+    ("2025-01-06 09:00", "u2", "Budi", "PT A", "PPOB", 50000),
+    ("2025-01-11 10:00", "u1", "Ani", "PT A", "EWA", 250000),
+    ("2025-01-12 11:00", "u3", "Citra", "PT B", "EWA", 300000),
+    ("2025-01-15 12:00", "u3", "Citra", "PT B", "Lainnya", 15000),
+    ("2025-01-20 13:00", "u1", "Ani", "PT A", "Lainnya", 10000),
+    ("2025-02-03 08:00", "u2", "Budi", "PT A", "EWA", 150000),
+    ("2025-02-04 09:00", "u2", "Budi", "PT A", "PPOB", 70000),
+    ("2025-02-04 10:00", "u2", "Budi", "PT A", "PPOB", 40000),
+    ("2025-02-08 11:00", "u4", "Dedi", "PT B", "PPOB", 400000),
+    ("2025-02-10 12:00", "u1", "Ani", "PT A", "EWA", 30000),
+    ("2025-02-11 13:00", "u3", "Citra", "PT B", "EWA", 70000),
+    ("2025-02-13 14:00", "u1", "Ani", "PT A", "Lainnya", 20000),
+    # tanggal rusak: dibuang saat cleaning
+    ("bukan tanggal", "u1", "Ani", "PT A", "EWA", 999999),
+]
+
+HARI = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# dihitung manual dari ROWS; "Lainnya" hanya masuk Gabungan
+EXPECTED = {
+    SEGMENT_ALL: {
+        "total_kasbon": 1505000,
+        "total_trx": 13,
+        "total_user": 4,
+        "max_ticket": 400000,
+        "monthly": [("Jan-25", 725000, 6, 3, 2), ("Feb-25", 780000, 7, 4, 2)],
+        "daily": [
+            ("06 Jan 25", 150000, 2, 2),
+            ("11 Jan 25", 250000, 1, 1),
+            ("12 Jan 25", 300000, 1, 1),
+            ("15 Jan 25", 15000, 1, 1),
+            ("20 Jan 25", 10000, 1, 1),
+            ("03 Feb 25", 150000, 1, 1),
+            ("04 Feb 25", 110000, 2, 1),
+            ("08 Feb 25", 400000, 1, 1),
+            ("10 Feb 25", 30000, 1, 1),
+            ("11 Feb 25", 70000, 1, 1),
+            ("13 Feb 25", 20000, 1, 1),
+        ],
+        "per_day": [5, 3, 1, 1, 0, 2, 1],
+        "weekend_amount": 950000,
+        "weekend_trx": 3,
+        "top_amount": [
+            ("Ani", "u1", "PT A", 5, 410000),
+            ("Dedi", "u4", "PT B", 1, 400000),
+            ("Citra", "u3", "PT B", 3, 385000),
+            ("Budi", "u2", "PT A", 4, 310000),
+        ],
+        "top_qty": [
+            ("Ani", "u1", "PT A", 5, 410000),
+            ("Budi", "u2", "PT A", 4, 310000),
+            ("Citra", "u3", "PT B", 3, 385000),
+            ("Dedi", "u4", "PT B", 1, 400000),
+        ],
+    },
+    "EWA": {
+        "total_kasbon": 900000,
+        "total_trx": 6,
+        "total_user": 3,
+        "max_ticket": 300000,
+        "monthly": [("Jan-25", 650000, 3, 2, 2), ("Feb-25", 250000, 3, 3, 2)],
+        "daily": [
+            ("06 Jan 25", 100000, 1, 1),
+            ("11 Jan 25", 250000, 1, 1),
+            ("12 Jan 25", 300000, 1, 1),
+            ("03 Feb 25", 150000, 1, 1),
+            ("10 Feb 25", 30000, 1, 1),
+            ("11 Feb 25", 70000, 1, 1),
+        ],
+        "per_day": [3, 1, 0, 0, 0, 1, 1],
+        "weekend_amount": 550000,
+        "weekend_trx": 2,
+        "top_amount": [
+            ("Ani", "u1", "PT A", 3, 380000),
+            ("Citra", "u3", "PT B", 2, 370000),
+            ("Budi", "u2", "PT A", 1, 150000),
+        ],
+        "top_qty": [
+            ("Ani", "u1", "PT A", 3, 380000),
+            ("Citra", "u3", "PT B", 2, 370000),
+            ("Budi", "u2", "PT A", 1, 150000),
+        ],
+    },
+    "PPOB": {
+        "total_kasbon": 560000,
+        "total_trx": 4,
+        "total_user": 2,
+        "max_ticket": 400000,
+        "monthly": [("Jan-25", 50000, 1, 1, 1), ("Feb-25", 510000, 3, 2, 2)],
+        "daily": [
+            ("06 Jan 25", 50000, 1, 1),
+            ("04 Feb 25", 110000, 2, 1),
+            ("08 Feb 25", 400000, 1, 1),
+        ],
+        "per_day": [1, 2, 0, 0, 0, 1, 0],
+        "weekend_amount": 400000,
+        "weekend_trx": 1,
+        "top_amount": [
+            ("Dedi", "u4", "PT B", 1, 400000),
+            ("Budi", "u2", "PT A", 3, 160000),
+        ],
+        "top_qty": [
+            ("Budi", "u2", "PT A", 3, 160000),
+            ("Dedi", "u4", "PT B", 1, 400000),
+        ],
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def results():
+    raw = pd.DataFrame(ROWS, columns=["Tanggal Approved", USER, NAMA, PT, "Jenis EWA", "Total Kasbon"])
+    return analyze(clean_dataframe(raw))
+
+
+def _rows(table, columns):
+    return [tuple(row) for row in table[columns].itertuples(index=False)]
+
+
+@pytest.mark.parametrize("seg", list(EXPECTED))
+def test_totals(results, seg):
+    res, exp = results[seg], EXPECTED[seg]
+    assert res["has_data"]
+    assert res["total_kasbon"] == exp["total_kasbon"]
+    assert res["total_trx"] == exp["total_trx"]
+    assert res["total_user"] == exp["total_user"]
+    assert res["max_ticket"] == exp["max_ticket"]
+    assert res["avg_ticket"] == pytest.approx(exp["total_kasbon"] / exp["total_trx"])
+    assert res["weekend_amount"] == exp["weekend_amount"]
+    assert res["weekend_trx"] == exp["weekend_trx"]
+    assert res["weekend_amount_pct"] == pytest.approx(exp["weekend_amount"] / exp["total_kasbon"] * 100)
+    assert res["weekend_trx_pct"] == pytest.approx(exp["weekend_trx"] / exp["total_trx"] * 100)
+
+
+@pytest.mark.parametrize("seg", list(EXPECTED))
+def test_series(results, seg):
+    res, exp = results[seg], EXPECTED[seg]
+    monthly = res["monthly_stats"].merge(res["monthly_uc"], on="Bulan_Str", sort=False)
+    assert _rows(monthly, ["Bulan_Str", "sum", "count", "User Unik", "Company Unik"]) == exp["monthly"]
+    daily = res["rollups"][ROLLUP_DAY]
+    assert _rows(daily, ["Periode", "sum", "count", "User Unik"]) == exp["daily"]
+    assert _rows(res["trx_per_day"], ["Hari", "Jumlah"]) == list(zip(HARI, exp["per_day"]))
+
+
+@pytest.mark.parametrize("seg", list(EXPECTED))
+def test_top10(results, seg):
+    res, exp = results[seg], EXPECTED[seg]
+    columns = [NAMA, USER, PT, "Qty_EWA_PPOB", "Total_Kasbon"]
+    assert list(res["top_users_amount"].columns) == columns
+    assert _rows(res["top_users_amount"], columns) == exp["top_amount"]
+    assert _rows(res["top_users_qty"], columns) == exp["top_qty"]
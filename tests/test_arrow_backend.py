@@ -0,0 +1,28 @@
+import pytest
+
+from bench.synth import generate_dataframe
+from bench.verify import compare_results
+from kasbon.analytics import DISTINCT_MODES, analyze
+from kasbon.ingest import clean_dataframe
+
+VARIANTS = {
+    "lengkap": [],
+    "tanpa_jenis": ["Jenis EWA"],
+    "tanpa_company": ["Nama Perusahaan"],
+}
+
+
+@pytest.fixture(scope="module", params=list(VARIANTS))
+def df(request):
+    raw = generate_dataframe(3000, seed=7, months=4)
+    return clean_dataframe(raw.drop(columns=VARIANTS[request.param]))
+
+
+@pytest.mark.parametrize("distinct", DISTINCT_MODES)
+def test_arrow_matches_pandas(df, distinct):
+    expected = analyze(df, distinct=distinct, backend="pandas")
+    actual = analyze(df, distinct=distinct, backend="arrow")
+    assert list(actual) == list(expected)
+    for seg in expected:
+        assert expected[seg]["has_data"]
+        assert compare_results(expected[seg], actual[seg]) == [], seg
@@ -0,0 +1,35 @@
+import json
+import os
+
+from bench.synth import generate_dataframe, write_dataset
+from kasbon.analytics import SEGMENT_ALL
+from kasbon.cli import main, output_stems
+
+
+def test_output_stems_suffix_on_collision(tmp_path):
+    paths = ["a/x.csv", "a/x.xlsx", "b/x.xlsx", "b/y.parquet"]
+    stems = output_stems(paths, str(tmp_path))
+    assert [os.path.basename(stems[p]) for p in paths] == ["x", "x-2", "x-3", "y"]
+
+
+def test_same_stem_inputs_write_distinct_outputs(tmp_path):
+    # isi berbeda per file supaya output yang tertimpa ketahuan
+    inputs = [
+        write_dataset(generate_dataframe(300, seed=1), str(tmp_path / "in" / "x.csv"))[0],
+        write_dataset(generate_dataframe(400, seed=2), str(tmp_path / "in" / "x.parquet"))[0],
+        write_dataset(generate_dataframe(500, seed=3), str(tmp_path / "in2" / "x.csv"))[0],
+    ]
+    out = tmp_path / "out"
+    code = main(inputs + ["-o", str(out), "-j", "2", "--cubes", "--cube-partials"])
+    assert code == 0
+
+    with open(out / "summary.json", encoding="utf-8") as f:
+        entries = json.load(f)["files"]
+    assert [e["status"] for e in entries] == ["ok"] * 3
+    for key in ("report", "cube", "partials"):
+        written = [e[key] for e in entries]
+        assert len(set(written)) == 3
+        assert all(os.path.exists(p) for p in written)
+    # tiap entry menunjuk output dari file-nya sendiri
+    totals = [e["segments"][SEGMENT_ALL]["total_trx"] for e in entries]
+    assert len(set(totals)) == 3
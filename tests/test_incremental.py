@@ -0,0 +1,108 @@
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import kasbon.incremental as incremental
+from kasbon.analytics import DISTINCT_MODES, analyze
+from kasbon.incremental import MONTHS_DIR, analyze_history, append_delta, history_dir, load_history
+from kasbon.ingest import clean_dataframe
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(2)
+    n = 3000
+    users = rng.integers(0, 200, n)
+    seconds = np.sort(rng.choice(180 * 86400, n, replace=False))
+    raw = pd.DataFrame({
+        "Tanggal Approved": pd.Timestamp("2025-01-01") + pd.to_timedelta(seconds, unit="s"),
+        "Username/ ID User": [f"U{u:04d}" for u in users],
+        "Nama Karyawan": [f"Karyawan {u}" for u in users],
+        "Nama Perusahaan": [f"PT {u % 7}" for u in users],
+        "Jenis EWA": rng.choice(["EWA", "PPOB", "Lainnya"], n, p=[0.6, 0.35, 0.05]),
+        "Total Kasbon": rng.integers(1, 50, n) * 10000,
+    })
+    return clean_dataframe(raw)
+
+
+def _reload(data_dir):
+    # baca ulang dari disk, bukan dari cache state di memori
+    incremental._loaded.clear()
+    return load_history("h", data_dir=data_dir)
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, pd.DataFrame):
+        try:
+            # categorical (partisi disambung) vs string dianggap sama
+            pd.testing.assert_frame_equal(
+                a.astype(object), b.astype(object), check_dtype=False, check_index_type=False
+            )
+        except AssertionError:
+            return False
+        return True
+    if a is None or b is None:
+        return a is b
+    return a == b or (pd.isna(a) and pd.isna(b))
+
+
+def _assert_same_analysis(expected, actual):
+    assert list(actual) == list(expected)
+    for seg in expected:
+        assert [k for k in expected[seg] if not _same(expected[seg][k], actual[seg][k])] == [], seg
+
+
+@pytest.mark.parametrize("distinct", DISTINCT_MODES)
+def test_overlapping_deltas_match_full_rebuild(df, tmp_path, distinct):
+    data_dir = str(tmp_path)
+    _, report = append_delta("h", df.iloc[:1200], "a", data_dir=data_dir)
+    assert report == {"new_rows": 1200, "duplicate_rows": 0, "already_applied": False}
+    # delta kedua & ketiga tumpang tindih dengan yang sebelumnya
+    _, report = append_delta("h", df.iloc[800:2200], "b", data_dir=data_dir)
+    assert report == {"new_rows": 1000, "duplicate_rows": 400, "already_applied": False}
+    _, report = append_delta("h", df.iloc[1500:], "c", data_dir=data_dir)
+    assert report == {"new_rows": 800, "duplicate_rows": 700, "already_applied": False}
+
+    state = _reload(data_dir)
+    assert state["meta"]["total_rows"] == len(df)
+    _assert_same_analysis(analyze(df, distinct=distinct), analyze_history(state, distinct=distinct))
+
+
+def test_same_file_applied_once(df, tmp_path):
+    data_dir = str(tmp_path)
+    append_delta("h", df.iloc[:500], "a", data_dir=data_dir)
+    state, report = append_delta("h", df.iloc[:500], "a", data_dir=data_dir)
+    assert report == {"new_rows": 0, "duplicate_rows": 0, "already_applied": True}
+    assert state["meta"]["files"] == ["a"]
+
+
+def test_failed_save_keeps_history(df, tmp_path, monkeypatch):
+    data_dir = str(tmp_path)
+    state, _ = append_delta("h", df.iloc[:1000], "a", data_dir=data_dir)
+    before = copy.deepcopy(state["meta"])
+
+    def fail(*args, **kwargs):
+        raise OSError("disk penuh")
+
+    with monkeypatch.context() as m:
+        m.setattr(incremental, "_save_history", fail)
+        with pytest.raises(OSError):
+            append_delta("h", df.iloc[1000:], "b", data_dir=data_dir)
+    assert load_history("h", data_dir=data_dir)["meta"] == before
+    assert _reload(data_dir)["meta"] == before
+
+
+def test_duplicate_first_delta_writes_meta_only(df, tmp_path):
+    data_dir = str(tmp_path)
+    _, report = append_delta("h", df.iloc[:0], "kosong", data_dir=data_dir)
+    assert report["new_rows"] == 0
+    assert not os.path.exists(os.path.join(history_dir("h", data_dir), MONTHS_DIR))
+    assert not any(r["has_data"] for r in analyze_history(_reload(data_dir)).values())
+
+    append_delta("h", df, "penuh", data_dir=data_dir)
+    _assert_same_analysis(analyze(df), analyze_history(_reload(data_dir)))
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kasbon.sketch import REGISTER, estimate, fold, merge_registers, register_table, relative_error
+
+
+def _users(start, stop):
+    return pd.Series([f"USR{i:07d}" for i in range(start, stop)], name="user")
+
+
+def _sketch(values, precision, **kwargs):
+    keys = [pd.Series(np.arange(len(values)) % 3, name="g")]
+    return register_table(values, keys, precision, **kwargs)
+
+
+def _sorted(table):
+    return table.sort_values(["g", REGISTER], ignore_index=True)
+
+
+def test_merge_equals_sketch_of_union():
+    a, b = _users(0, 6000), _users(4000, 10000)
+    merged = merge_registers([_sketch(a, 12), _sketch(b, 12)], ["g"])
+    # g ikut posisi baris: bangun union dengan kunci yang sama per nilai
+    union = pd.concat([a, b], ignore_index=True)
+    keys = pd.Series(np.concatenate([np.arange(len(a)) % 3, np.arange(len(b)) % 3]), name="g")
+    expected = register_table(union, [keys], 12)
+    pd.testing.assert_frame_equal(_sorted(merged), _sorted(expected))
+
+
+def test_chunks_equal_single_pass():
+    values = _users(0, 5000)
+    pd.testing.assert_frame_equal(
+        _sorted(_sketch(values, 12, chunk_rows=700)), _sorted(_sketch(values, 12))
+    )
+
+
+@pytest.mark.parametrize("target", [10, 12, 14])
+def test_fold_equals_rebuild(target):
+    values = _users(0, 20000)
+    folded = fold(_sketch(values, 16), ["g"], 16, target)
+    pd.testing.assert_frame_equal(_sorted(folded), _sorted(_sketch(values, target)))
+
+
+@pytest.mark.parametrize("precision", [10, 12, 14, 16])
+def test_estimate_within_error_bound(precision):
+    n = 50000
+    table = register_table(_users(0, n), [pd.Series(np.zeros(n, dtype=int), name="g")], precision)
+    # 3 × standard error: praktis selalu terpenuhi untuk data deterministik ini
+    assert abs(estimate(table, precision=precision) - n) <= 3 * relative_error(precision) * n
+
+
+def test_estimate_by_group_ignores_empty_values():
+    users = _users(0, 3000)
+    values = pd.concat([users, pd.Series([None] * 500)], ignore_index=True).rename("user")
+    groups = pd.Series(np.r_[np.zeros(1000), np.ones(2500)].astype(int), name="g")
+    per_group = estimate(register_table(values, [groups], 12), by="g", precision=12)
+    without_empty = estimate(register_table(users, [groups.iloc[:3000]], 12), by="g", precision=12)
+    pd.testing.assert_series_equal(per_group, without_empty)
+    for group, n in {0: 1000, 1: 2000}.items():
+        assert abs(per_group[group] - n) <= 3 * relative_error(12) * n
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kasbon.topk import AMOUNT, QTY, TopK, segment_top_users, top_users
+
+GROUP = ["nama", "user"]
+
+
+def _users(rows):
+    return pd.DataFrame(rows, columns=GROUP + [QTY, AMOUNT])
+
+
+def _naive(part, k, ranking):
+    users = (
+        part.groupby(GROUP, observed=True)[["count", "sum"]].sum()
+        .rename(columns={"count": QTY, "sum": AMOUNT})
+        .reset_index()
+        .astype({col: object for col in GROUP})
+    )
+    return (
+        users.sort_values([ranking] + GROUP, ascending=[False] + [True] * len(GROUP), kind="stable")
+        .head(k)
+        .reset_index(drop=True)
+    )
+
+
+def _partials(n_rows, n_users, seed):
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, n_users, n_rows)
+    return pd.DataFrame({
+        "nama": [f"Karyawan {i}" for i in ids],
+        "user": [f"U{i:04d}" for i in ids],
+        "seg": rng.choice(["EWA", "PPOB"], n_rows),
+        # nilai kecil supaya banyak seri
+        "count": rng.integers(1, 4, n_rows),
+        "sum": rng.integers(1, 4, n_rows) * 1000,
+    })
+
+
+def test_ties_won_by_smallest_key():
+    topk = TopK(GROUP, k=2)
+    topk.push(_users([("C", "u3", 5, 100), ("A", "u1", 5, 100), ("B", "u2", 5, 100)]))
+    assert topk.result(AMOUNT)["nama"].tolist() == ["A", "B"]
+    # seri dengan kandidat push sebelumnya juga diurutkan menurut kunci
+    topk.push(_users([("0", "u0", 5, 100)]))
+    assert topk.result(QTY)["nama"].tolist() == ["0", "A"]
+
+
+def test_later_push_evicts_candidates():
+    topk = TopK(GROUP, k=3)
+    topk.push(_users([("A", "u1", 1, 300), ("B", "u2", 9, 200), ("C", "u3", 2, 100)]))
+    topk.push(_users([("D", "u4", 3, 400), ("E", "u5", 8, 50)]))
+    assert topk.result(AMOUNT)["nama"].tolist() == ["D", "A", "B"]
+    assert topk.result(QTY)["nama"].tolist() == ["B", "E", "D"]
+    assert topk.result(AMOUNT)[AMOUNT].tolist() == [400, 300, 200]
+
+
+def test_empty_result_has_columns():
+    topk = TopK(GROUP)
+    topk.push(_users([]))
+    assert list(topk.result(AMOUNT).columns) == GROUP + [QTY, AMOUNT]
+
+
+@pytest.mark.parametrize("users_per_bucket", [1, 7, 10_000])
+@pytest.mark.parametrize("categorical", [False, True])
+def test_top_users_matches_full_sort(users_per_bucket, categorical):
+    part = _partials(2000, 150, seed=users_per_bucket)
+    if categorical:
+        # kategori sengaja tidak urut nilai (seperti export yang sudah categorical)
+        for col in GROUP:
+            part[col] = pd.Categorical(part[col], categories=part[col].unique())
+    by_amount, by_qty = top_users(part, GROUP, "user", k=10, users_per_bucket=users_per_bucket)
+    pd.testing.assert_frame_equal(by_amount, _naive(part, 10, AMOUNT), check_dtype=False)
+    pd.testing.assert_frame_equal(by_qty, _naive(part, 10, QTY), check_dtype=False)
+
+
+def test_segment_top_users_matches_per_segment():
+    part = _partials(2000, 150, seed=3)
+    tops = segment_top_users(part, GROUP, "user", "seg", k=5, users_per_bucket=20)
+    assert set(tops) == {None, "EWA", "PPOB"}
+    for seg, (by_amount, by_qty) in tops.items():
+        rows = part if seg is None else part[part["seg"] == seg]
+        pd.testing.assert_frame_equal(by_amount, _naive(rows, 5, AMOUNT), check_dtype=False)
+        pd.testing.assert_frame_equal(by_qty, _naive(rows, 5, QTY), check_dtype=False)